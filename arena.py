@@ -0,0 +1,746 @@
+##############################
+#                            #
+#          AST ARENA         #
+#                            #
+##############################
+import marshal
+from array import array
+
+import ast_
+from callstack import CallStack
+from constants import *
+from main import Interpreter, binary_result_type, unary_result_type
+from symbol import ScopedSymbolTable, VarSymbol, ProcedureSymbol
+from tokenizer import Token
+from visitor import NodeVisitor
+
+# Node kinds, stored in Arena.kinds
+KIND_PROGRAM = 0
+KIND_BLOCK = 1
+KIND_VAR_DECL = 2
+KIND_TYPE = 3
+KIND_PROCEDURE_DECL = 4
+KIND_COMPOUND = 5
+KIND_ASSIGN = 6
+KIND_NO_OP = 7
+KIND_VAR = 8
+KIND_NUM = 9
+KIND_UNARY_OP = 10
+KIND_BIN_OP = 11
+KIND_PARAM = 12
+KIND_PROCEDURE_CALL = 13
+KIND_WHILE = 14
+KIND_FOR = 15
+
+KIND_NAMES = (
+    "Program", "Block", "VarDecl", "Type", "ProcedureDecl", "Compound",
+    "Assign", "NoOp", "Var", "Num", "UnaryOp", "BinOp", "Param", "ProcedureCall",
+    "While", "For",
+)
+
+# Operators are stored as an index into OPERATORS
+OPERATORS = (
+    PLUS, MINUS, MULTIPLY, INTEGER_DIV, FLOAT_DIV,
+    EQUAL, NOT_EQUAL, LESS_THAN, LESS_EQUAL, GREATER_THAN, GREATER_EQUAL,
+    AND, OR, NOT,
+)
+OPERATOR_INDEX = {op: index for index, op in enumerate(OPERATORS)}
+(
+    OP_PLUS, OP_MINUS, OP_MULTIPLY, OP_INTEGER_DIV, OP_FLOAT_DIV,
+    OP_EQUAL, OP_NOT_EQUAL, OP_LESS_THAN, OP_LESS_EQUAL, OP_GREATER_THAN, OP_GREATER_EQUAL,
+    OP_AND, OP_OR, OP_NOT,
+) = range(len(OPERATORS))
+
+OPERATOR_TEXT = {
+    PLUS: "+", MINUS: "-", MULTIPLY: "*", INTEGER_DIV: "DIV", FLOAT_DIV: "/",
+    EQUAL: "=", NOT_EQUAL: "<>", LESS_THAN: "<", LESS_EQUAL: "<=",
+    GREATER_THAN: ">", GREATER_EQUAL: ">=", AND: "AND", OR: "OR", NOT: "NOT",
+}
+
+
+class Arena:
+    """Flat AST: node i is described by kinds[i] and the operands a[i],
+    b[i], c[i]. Child lists live contiguously in children and are
+    referenced by (start, count), or by start alone when the list is
+    stored with its count in front; names and numbers live in consts.
+
+    Operand layout per kind:
+        Program        a=const(name)  b=block
+        Block          a,b=declarations (start, count)  c=compound
+        VarDecl        a=var  b=type
+        Type           a=const(type name)
+        ProcedureDecl  a=const(name)  b=block  c=params (counted list)
+        Param          a=var  b=type
+        ProcedureCall  a=const(name)  b,c=arguments (start, count)
+        Compound       a,b=children (start, count)
+        Assign         a=var  b=expr  c=1 if an INTEGER value goes into a REAL variable (after analysis)
+        Var            a=const(name)  b=scope level  c=slot (after analysis)
+        Num            a=const(value)
+        UnaryOp        a=operator  b=expr
+        BinOp          a=operator  b=left  c=right
+        While          a=condition  b=body
+        For            a=var  b=body  c=start, stop, down flag (start of three children)
+
+    The constructor-named methods (Program, BinOp, ...) take the same
+    arguments as the ast_ classes and return node indices, so an Arena
+    can be passed to Parser as its node factory.
+    """
+
+    __slots__ = ("kinds", "a", "b", "c", "children", "consts", "_const_index", "scopes", "calls", "root")
+
+    def __init__(self) -> None:
+        self.kinds = array("B")
+        self.a = array("q")
+        self.b = array("q")
+        self.c = array("q")
+        self.children = array("q")
+        self.consts = []
+        self._const_index = {}
+        # ScopedSymbolTable of Program/ProcedureDecl nodes and the
+        # ProcedureSymbol of ProcedureCall nodes, set by analysis
+        self.scopes = {}
+        self.calls = {}
+        self.root = -1
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def to_bytes(self):
+        """Serialize the arena (without analysis scopes) with marshal"""
+        return marshal.dumps((
+            self.kinds.tobytes(), self.a.tobytes(), self.b.tobytes(), self.c.tobytes(),
+            self.children.tobytes(), self.consts, self.root,
+        ))
+
+    @classmethod
+    def from_bytes(cls, data):
+        kinds, a, b, c, children, consts, root = marshal.loads(data)
+        arena = cls()
+        arena.kinds.frombytes(kinds)
+        arena.a.frombytes(a)
+        arena.b.frombytes(b)
+        arena.c.frombytes(c)
+        arena.children.frombytes(children)
+        arena.consts = consts
+        arena._const_index = {(type(value), value): index for index, value in enumerate(consts)}
+        arena.root = root
+        return arena
+
+    def add(self, kind, a=0, b=0, c=0):
+        self.kinds.append(kind)
+        self.a.append(a)
+        self.b.append(b)
+        self.c.append(c)
+        return len(self.kinds) - 1
+
+    def const(self, value):
+        # 1 and 1.0 compare equal, keep them apart in the pool
+        key = (type(value), value)
+        index = self._const_index.get(key)
+        if index is None:
+            index = len(self.consts)
+            self.consts.append(value)
+            self._const_index[key] = index
+        return index
+
+    def add_list(self, nodes):
+        start = len(self.children)
+        self.children.extend(nodes)
+        return start, len(nodes)
+
+    def child_list(self, start, count):
+        return self.children[start:start + count]
+
+    def add_counted_list(self, nodes):
+        start = len(self.children)
+        self.children.append(len(nodes))
+        self.children.extend(nodes)
+        return start
+
+    def counted_list(self, start):
+        return self.children[start + 1:start + 1 + self.children[start]]
+
+    def Program(self, name, block):
+        self.root = self.add(KIND_PROGRAM, self.const(name), block)
+        return self.root
+
+    def Block(self, declarations, compound_statement):
+        start, count = self.add_list(declarations)
+        return self.add(KIND_BLOCK, start, count, compound_statement)
+
+    def VarDecl(self, var_node, type_node):
+        return self.add(KIND_VAR_DECL, var_node, type_node)
+
+    def Type(self, token):
+        return self.add(KIND_TYPE, self.const(token.value))
+
+    def ProcedureDecl(self, proc_name, params, block_node):
+        return self.add(KIND_PROCEDURE_DECL, self.const(proc_name), block_node, self.add_counted_list(params))
+
+    def Param(self, var_node, type_node):
+        return self.add(KIND_PARAM, var_node, type_node)
+
+    def ProcedureCall(self, proc_name, actual_params, token):
+        start, count = self.add_list(actual_params)
+        return self.add(KIND_PROCEDURE_CALL, self.const(proc_name), start, count)
+
+    def Compound(self, children=None):
+        start, count = self.add_list(children or [])
+        return self.add(KIND_COMPOUND, start, count)
+
+    def Assign(self, left, op, right):
+        return self.add(KIND_ASSIGN, left, right)
+
+    def NoOp(self):
+        return self.add(KIND_NO_OP)
+
+    def Var(self, token):
+        return self.add(KIND_VAR, self.const(token.value), -1, -1)
+
+    def Num(self, token):
+        return self.add(KIND_NUM, self.const(token.value))
+
+    def UnaryOp(self, op, expr):
+        return self.add(KIND_UNARY_OP, OPERATOR_INDEX[op.type], expr)
+
+    def BinOp(self, left, op, right):
+        return self.add(KIND_BIN_OP, OPERATOR_INDEX[op.type], left, right)
+
+    def While(self, condition, body):
+        return self.add(KIND_WHILE, condition, body)
+
+    def LazyBlock(self, tokens, offsets, location=None):
+        # a body kept as tokens has no place in the flat node arrays
+        raise Exception("Lazily parsed procedure bodies are not supported by the Arena, parse with lazy=False")
+
+    def For(self, var, start, stop, down, body):
+        bounds, _ = self.add_list([start, stop, int(down)])
+        return self.add(KIND_FOR, var, body, bounds)
+
+
+class ArenaEncoder(NodeVisitor):
+    """Copy an object tree into an Arena"""
+
+    def __init__(self, arena=None) -> None:
+        self.arena = arena if arena is not None else Arena()
+
+    def visit_Program(self, node):
+        return self.arena.Program(node.name, self.visit(node.block))
+
+    def visit_Block(self, node):
+        declarations = [self.visit(declaration) for declaration in node.declarations]
+        return self.arena.Block(declarations, self.visit(node.compound_statement))
+
+    def visit_VarDecl(self, node):
+        return self.arena.VarDecl(self.visit(node.var_node), self.visit(node.type_node))
+
+    def visit_Type(self, node):
+        return self.arena.Type(node.token)
+
+    def visit_ProcedureDecl(self, node):
+        params = [self.visit(param) for param in node.params]
+        return self.arena.ProcedureDecl(node.proc_name, params, self.visit(node.block_node))
+
+    def visit_Param(self, node):
+        return self.arena.Param(self.visit(node.var_node), self.visit(node.type_node))
+
+    def visit_ProcedureCall(self, node):
+        args = [self.visit(arg) for arg in node.actual_params]
+        return self.arena.ProcedureCall(node.proc_name, args, node.token)
+
+    def visit_Compound(self, node):
+        return self.arena.Compound([self.visit(child) for child in node.children])
+
+    def visit_Assign(self, node):
+        return self.arena.Assign(self.visit(node.left), node.op, self.visit(node.right))
+
+    def visit_NoOp(self, node):
+        return self.arena.NoOp()
+
+    def visit_Var(self, node):
+        return self.arena.Var(node.token)
+
+    def visit_Num(self, node):
+        return self.arena.Num(node.token)
+
+    def visit_UnaryOp(self, node):
+        return self.encode_expression(node)
+
+    def visit_BinOp(self, node):
+        return self.encode_expression(node)
+
+    def visit_Hoisted(self, node):
+        return self.encode_expression(node)
+
+    def encode_expression(self, node):
+        """Encode an expression bottom-up with an explicit stack, so deep
+        trees don't recurse once per level"""
+        arena = self.arena
+        results = []
+        todo = [(node, False)]
+        while todo:
+            item, expanded = todo.pop()
+            kind = type(item)
+            if kind is ast_.BinOp:
+                if expanded:
+                    right = results.pop()
+                    results.append(arena.BinOp(results.pop(), item.op, right))
+                else:
+                    todo.append((item, True))
+                    todo.append((item.right, False))
+                    todo.append((item.left, False))
+            elif kind is ast_.UnaryOp:
+                if expanded:
+                    results.append(arena.UnaryOp(item.op, results.pop()))
+                else:
+                    todo.append((item, True))
+                    todo.append((item.expr, False))
+            elif kind is ast_.Hoisted:
+                # hoisting is redone by the ConstantFolder after decoding
+                todo.append((item.expr, False))
+            else:
+                results.append(self.visit(item))
+        return results.pop()
+
+    def visit_While(self, node):
+        condition = self.visit(node.condition)
+        return self.arena.While(condition, self.visit(node.body))
+
+    def visit_For(self, node):
+        var = self.visit(node.var)
+        start = self.visit(node.start)
+        stop = self.visit(node.stop)
+        return self.arena.For(var, start, stop, node.down, self.visit(node.body))
+
+
+def to_arena(tree):
+    """Convert an object tree rooted at a Program into an Arena"""
+    encoder = ArenaEncoder()
+    encoder.visit(tree)
+    return encoder.arena
+
+
+class ArenaVisitor:
+    """Walk an Arena by node index, dispatching on the node kind to the
+    visit_<KindName>(index) methods of the subclass"""
+
+    def __init__(self) -> None:
+        self.arena = None
+        self._visitors = [
+            getattr(self, "visit_" + name, self.generic_visit) for name in KIND_NAMES
+        ]
+
+    def visit(self, index):
+        return self._visitors[self.arena.kinds[index]](index)
+
+    def generic_visit(self, index):
+        raise Exception(f"No visit_{KIND_NAMES[self.arena.kinds[index]]} method")
+
+
+class ArenaDecoder(ArenaVisitor):
+    """Rebuild the object tree from an Arena"""
+
+    def visit_Program(self, index):
+        arena = self.arena
+        return ast_.Program(arena.consts[arena.a[index]], self.visit(arena.b[index]))
+
+    def visit_Block(self, index):
+        arena = self.arena
+        declarations = [self.visit(child) for child in arena.child_list(arena.a[index], arena.b[index])]
+        return ast_.Block(declarations, self.visit(arena.c[index]))
+
+    def visit_VarDecl(self, index):
+        arena = self.arena
+        return ast_.VarDecl(self.visit(arena.a[index]), self.visit(arena.b[index]))
+
+    def visit_Type(self, index):
+        name = self.arena.consts[self.arena.a[index]]
+        return ast_.Type(Token(name, name))
+
+    def visit_ProcedureDecl(self, index):
+        arena = self.arena
+        params = [self.visit(param) for param in arena.counted_list(arena.c[index])]
+        return ast_.ProcedureDecl(arena.consts[arena.a[index]], params, self.visit(arena.b[index]))
+
+    def visit_Param(self, index):
+        arena = self.arena
+        return ast_.Param(self.visit(arena.a[index]), self.visit(arena.b[index]))
+
+    def visit_ProcedureCall(self, index):
+        arena = self.arena
+        name = arena.consts[arena.a[index]]
+        args = [self.visit(arg) for arg in arena.child_list(arena.b[index], arena.c[index])]
+        return ast_.ProcedureCall(name, args, Token(ID, name))
+
+    def visit_Compound(self, index):
+        arena = self.arena
+        return ast_.Compound([self.visit(child) for child in arena.child_list(arena.a[index], arena.b[index])])
+
+    def visit_Assign(self, index):
+        arena = self.arena
+        return ast_.Assign(self.visit(arena.a[index]), Token(ASSIGN, ":="), self.visit(arena.b[index]))
+
+    def visit_NoOp(self, index):
+        return ast_.NoOp()
+
+    def visit_Var(self, index):
+        return ast_.Var(Token(ID, self.arena.consts[self.arena.a[index]]))
+
+    def visit_Num(self, index):
+        value = self.arena.consts[self.arena.a[index]]
+        token_type = INTEGER_CONST if isinstance(value, int) else REAL_CONST
+        return ast_.Num(Token(token_type, value))
+
+    def _op_token(self, index):
+        op = OPERATORS[self.arena.a[index]]
+        return Token(op, OPERATOR_TEXT[op])
+
+    def visit_UnaryOp(self, index):
+        return self.decode_expression(index)
+
+    def visit_BinOp(self, index):
+        return self.decode_expression(index)
+
+    def decode_expression(self, index):
+        """Decode an expression bottom-up with an explicit stack, so deep
+        trees don't recurse once per level"""
+        arena = self.arena
+        kinds = arena.kinds
+        results = []
+        todo = [(index, False)]
+        while todo:
+            item, expanded = todo.pop()
+            kind = kinds[item]
+            if kind == KIND_BIN_OP:
+                if expanded:
+                    right = results.pop()
+                    results.append(ast_.BinOp(results.pop(), self._op_token(item), right))
+                else:
+                    todo.append((item, True))
+                    todo.append((arena.c[item], False))
+                    todo.append((arena.b[item], False))
+            elif kind == KIND_UNARY_OP:
+                if expanded:
+                    results.append(ast_.UnaryOp(self._op_token(item), results.pop()))
+                else:
+                    todo.append((item, True))
+                    todo.append((arena.b[item], False))
+            else:
+                results.append(self.visit(item))
+        return results.pop()
+
+    def visit_While(self, index):
+        arena = self.arena
+        return ast_.While(self.visit(arena.a[index]), self.visit(arena.b[index]))
+
+    def visit_For(self, index):
+        arena = self.arena
+        start, stop, down = arena.child_list(arena.c[index], 3)
+        return ast_.For(
+            self.visit(arena.a[index]), self.visit(start), self.visit(stop), bool(down),
+            self.visit(arena.b[index]),
+        )
+
+
+def from_arena(arena, index=None):
+    """Convert an Arena (or the subtree at index) back into an object tree"""
+    decoder = ArenaDecoder()
+    decoder.arena = arena
+    return decoder.visit(arena.root if index is None else index)
+
+
+class ArenaSemanticAnalyzer(ArenaVisitor):
+    """SemanticAnalyzer over an Arena. Resolved Var nodes get their scope
+    level and slot written into b and c. Expressions are typed with the
+    same rules as main.SemanticAnalyzer: their visit methods return the
+    static type."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.current_scope = None
+        # (scope level, slot) of the FOR loop variables being analysed
+        self._loop_variables = set()
+
+    def analyze(self, arena):
+        self.arena = arena
+        self.visit(arena.root)
+
+    def visit_Program(self, index):
+        global_scope = ScopedSymbolTable(scope_name="global", scope_level=1, enclosing_scpe=self.current_scope)
+        self.current_scope = global_scope
+        self.visit(self.arena.b[index])
+        self.arena.scopes[index] = global_scope
+        self.current_scope = self.current_scope.enclosing_scope
+
+    def visit_Block(self, index):
+        arena = self.arena
+        for declaration in arena.child_list(arena.a[index], arena.b[index]):
+            self.visit(declaration)
+        self.visit(arena.c[index])
+
+    def visit_VarDecl(self, index):
+        arena = self.arena
+        type_name = arena.consts[arena.a[arena.b[index]]]
+        type_symbol = self.current_scope.lookup(type_name)
+        var_name = arena.consts[arena.a[arena.a[index]]]
+        if self.current_scope.lookup(var_name, current_scope_only=True) is not None:
+            raise Exception(f"Error: Duplicate identifier {var_name} found")
+        self.current_scope.insert(VarSymbol(var_name, type_symbol))
+
+    def visit_ProcedureDecl(self, index):
+        arena = self.arena
+        proc_name = arena.consts[arena.a[index]]
+        if self.current_scope.lookup(proc_name, current_scope_only=True) is not None:
+            raise Exception(f"Error: Duplicate identifier {proc_name} found")
+        proc_symbol = ProcedureSymbol(proc_name)
+        self.current_scope.insert(proc_symbol)
+        procedure_scope = ScopedSymbolTable(proc_name, self.current_scope.scope_level + 1, self.current_scope)
+        proc_symbol.scope = procedure_scope
+        proc_symbol.block_ast = arena.b[index]
+        self.current_scope = procedure_scope
+        for param in arena.counted_list(arena.c[index]):
+            type_symbol = procedure_scope.lookup(arena.consts[arena.a[arena.b[param]]])
+            param_name = arena.consts[arena.a[arena.a[param]]]
+            if procedure_scope.lookup(param_name, current_scope_only=True) is not None:
+                raise Exception(f"Error: Duplicate identifier {param_name} found")
+            var_symbol = VarSymbol(param_name, type_symbol)
+            procedure_scope.insert(var_symbol)
+            proc_symbol.params.append(var_symbol)
+        self.visit(arena.b[index])
+        arena.scopes[index] = procedure_scope
+        self.current_scope = self.current_scope.enclosing_scope
+
+    def visit_Compound(self, index):
+        arena = self.arena
+        for child in arena.child_list(arena.a[index], arena.b[index]):
+            self.visit(child)
+
+    def visit_Assign(self, index):
+        arena = self.arena
+        value_type = self.visit(arena.b[index])
+        var = arena.a[index]
+        var_type = self.visit(var)
+        var_name = arena.consts[arena.a[var]]
+        if (arena.b[var], arena.c[var]) in self._loop_variables:
+            raise Exception(f"Error: Illegal assignment to FOR loop variable {var_name}")
+        if value_type == BOOLEAN or (var_type == INTEGER and value_type == REAL):
+            raise Exception(
+                f"Error: Incompatible types in assignment to {var_name}: got {value_type}, expected {var_type}"
+            )
+        arena.c[index] = var_type == REAL and value_type == INTEGER
+
+    def visit_ProcedureCall(self, index):
+        arena = self.arena
+        proc_name = arena.consts[arena.a[index]]
+        proc_symbol = self.current_scope.lookup(proc_name)
+        if proc_symbol is None:
+            raise NameError(repr(proc_name))
+        if not isinstance(proc_symbol, ProcedureSymbol):
+            raise Exception(f"Error: {proc_name} is not a procedure")
+        if arena.c[index] != len(proc_symbol.params):
+            raise Exception(
+                f"Error: Wrong number of arguments for {proc_name}: got {arena.c[index]}, expected {len(proc_symbol.params)}"
+            )
+        for param, arg in zip(proc_symbol.params, arena.child_list(arena.b[index], arena.c[index])):
+            arg_type = self.visit(arg)
+            if arg_type == BOOLEAN or (param.type.name == INTEGER and arg_type == REAL):
+                raise Exception(
+                    f"Error: Incompatible types in argument {param.name} of {proc_name}: got {arg_type}, expected {param.type.name}"
+                )
+        arena.calls[index] = proc_symbol
+
+    def visit_NoOp(self, index):
+        pass
+
+    def visit_Var(self, index):
+        arena = self.arena
+        var_name = arena.consts[arena.a[index]]
+        var_symbol = self.current_scope.lookup(var_name)
+        if var_symbol is None:
+            raise NameError(repr(var_name))
+        if not isinstance(var_symbol, VarSymbol):
+            raise Exception(f"Error: {var_name} is not a variable")
+        arena.b[index] = var_symbol.scope_level
+        arena.c[index] = var_symbol.slot
+        return var_symbol.type.name
+
+    def visit_Num(self, index):
+        return INTEGER if isinstance(self.arena.consts[self.arena.a[index]], int) else REAL
+
+    def visit_UnaryOp(self, index):
+        arena = self.arena
+        return unary_result_type(OPERATORS[arena.a[index]], self.visit(arena.b[index]))
+
+    def visit_BinOp(self, index):
+        arena = self.arena
+        left = self.visit(arena.b[index])
+        return binary_result_type(OPERATORS[arena.a[index]], left, self.visit(arena.c[index]))
+
+    def visit_While(self, index):
+        if self.visit(self.arena.a[index]) != BOOLEAN:
+            raise Exception("Error: WHILE condition must be BOOLEAN")
+        self.visit(self.arena.b[index])
+
+    def visit_For(self, index):
+        arena = self.arena
+        start, stop, _ = arena.child_list(arena.c[index], 3)
+        var = arena.a[index]
+        var_name = arena.consts[arena.a[var]]
+        if self.visit(var) != INTEGER:
+            raise Exception(f"Error: FOR loop variable {var_name} must be INTEGER")
+        loop_variable = (arena.b[var], arena.c[var])
+        if loop_variable in self._loop_variables:
+            raise Exception(f"Error: FOR loop variable {var_name} is already in use")
+        if self.visit(start) != INTEGER or self.visit(stop) != INTEGER:
+            raise Exception(f"Error: FOR loop bounds of {var_name} must be INTEGER")
+        self._loop_variables.add(loop_variable)
+        self.visit(arena.b[index])
+        self._loop_variables.discard(loop_variable)
+
+
+class ArenaInterpreter(ArenaVisitor):
+    """Interpreter over an analysed Arena, using the same frame layout as
+    main.Interpreter"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.display = []
+        self.global_scope = None
+        self.call_stack = CallStack()
+
+    @property
+    def GLOBAL_SCOPE(self):
+        """Assigned global variables by name"""
+        if self.global_scope is None:
+            return {}
+        frame = self.display[self.global_scope.scope_level]
+        return {
+            symbol.name: frame[symbol.slot]
+            for symbol in self.global_scope.slots
+            if frame[symbol.slot] is not UNDEFINED
+        }
+
+    to_real = Interpreter.to_real
+
+    def interpret(self, arena):
+        self.arena = arena
+        return self.visit(arena.root)
+
+    def visit_Program(self, index):
+        scope = self.arena.scopes[index]
+        self.global_scope = scope
+        self.display = [None] * (scope.scope_level + 1)
+        self.call_stack.reset()
+        self.call_stack.push(scope, self.display)
+        self.visit(self.arena.b[index])
+
+    def visit_Block(self, index):
+        self.visit(self.arena.c[index])
+
+    def visit_Compound(self, index):
+        arena = self.arena
+        for child in arena.child_list(arena.a[index], arena.b[index]):
+            self.visit(child)
+
+    def visit_NoOp(self, index):
+        pass
+
+    def visit_Assign(self, index):
+        arena = self.arena
+        var = arena.a[index]
+        value = self.visit(arena.b[index])
+        if arena.c[index]:
+            # INTEGER value into a REAL variable
+            value = self.to_real(value)
+        self.display[arena.b[var]][arena.c[var]] = value
+
+    def visit_ProcedureCall(self, index):
+        arena = self.arena
+        proc_symbol = arena.calls[index]
+        values = [self.visit(arg) for arg in arena.child_list(arena.b[index], arena.c[index])]
+        display = self.display
+        frame = self.call_stack.push(proc_symbol.scope, display).frame
+        for param, value in zip(proc_symbol.params, values):
+            if param.type.name == REAL:
+                value = self.to_real(value)
+            frame[param.slot] = value
+        try:
+            self.visit(arena.c[proc_symbol.block_ast])
+        finally:
+            self.call_stack.pop(display)
+
+    def visit_Var(self, index):
+        arena = self.arena
+        val = self.display[arena.b[index]][arena.c[index]]
+        if val is UNDEFINED:
+            raise NameError(repr(arena.consts[arena.a[index]]))
+        return val
+
+    def visit_Num(self, index):
+        return self.arena.consts[self.arena.a[index]]
+
+    def visit_UnaryOp(self, index):
+        value = self.visit(self.arena.b[index])
+        op = self.arena.a[index]
+        if op == OP_MINUS:
+            return -value
+        elif op == OP_NOT:
+            return not value
+        return +value
+
+    def visit_BinOp(self, index):
+        arena = self.arena
+        op = arena.a[index]
+        left = self.visit(arena.b[index])
+        # AND/OR only evaluate the right operand when it decides the result
+        if op == OP_AND:
+            return left and self.visit(arena.c[index])
+        elif op == OP_OR:
+            return left or self.visit(arena.c[index])
+        right = self.visit(arena.c[index])
+        if op == OP_PLUS:
+            return left + right
+        elif op == OP_MINUS:
+            return left - right
+        elif op == OP_MULTIPLY:
+            return left * right
+        elif op == OP_INTEGER_DIV:
+            return left // right
+        elif op == OP_FLOAT_DIV:
+            return left / right
+        elif op == OP_EQUAL:
+            return left == right
+        elif op == OP_NOT_EQUAL:
+            return left != right
+        elif op == OP_LESS_THAN:
+            return left < right
+        elif op == OP_LESS_EQUAL:
+            return left <= right
+        elif op == OP_GREATER_THAN:
+            return left > right
+        elif op == OP_GREATER_EQUAL:
+            return left >= right
+
+    def visit_While(self, index):
+        arena = self.arena
+        condition = arena.a[index]
+        body = arena.b[index]
+        visit = self.visit
+        while visit(condition):
+            visit(body)
+
+    def visit_For(self, index):
+        arena = self.arena
+        start, stop, down = arena.child_list(arena.c[index], 3)
+        start = self.visit(start)
+        stop = self.visit(stop)
+        var = arena.a[index]
+        frame = self.display[arena.b[var]]
+        slot = arena.c[var]
+        frame[slot] = start
+        counts = range(start, stop - 1, -1) if down else range(start, stop + 1)
+        body = arena.b[index]
+        visit = self.visit
+        for count in counts:
+            frame[slot] = count
+            visit(body)
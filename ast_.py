@@ -1,14 +1,22 @@
+from constants import INTEGER, INTEGER_CONST, REAL, UNDEFINED
+
+
 class AST:
-    pass
+    # Every node class declares __slots__ so large programs don't pay for
+    # a per-instance __dict__
+    __slots__ = ()
 
 class Compound(AST):
     """Represents a 'BEGIN ... END' block"""
+    __slots__ = ("children",)
 
-    def __init__(self) -> None:
-        self.children = []
+    def __init__(self, children=None) -> None:
+        self.children = children if children is not None else []
 
 
 class Assign(AST):
+    __slots__ = ("left", "token", "op", "right")
+
     def __init__(self, left, op, right) -> None:
         self.left = left
         self.token = self.op = op
@@ -16,42 +24,62 @@ class Assign(AST):
 
 
 class Var(AST):
+    __slots__ = ("token", "value", "symbol", "type")
+
     def __init__(self, token) -> None:
         self.token = token
         self.value = token.value
+        # VarSymbol and static type resolved by the SemanticAnalyzer
+        self.symbol = None
+        self.type = None
 
 
 class NoOp(AST):
-    pass
+    __slots__ = ()
 
 
 class UnaryOp(AST):
+    __slots__ = ("token", "op", "expr", "type")
+
     def __init__(self, op, expr) -> None:
         self.token = self.op = op
         self.expr = expr
+        # INTEGER or REAL, set by the SemanticAnalyzer
+        self.type = None
 
 
 class BinOp(AST):
+    __slots__ = ("left", "token", "op", "right", "type")
+
     def __init__(self, left, op, right) -> None:
         self.left = left
         self.token = self.op = op
         self.right = right
+        # INTEGER or REAL, set by the SemanticAnalyzer
+        self.type = None
 
 
 class Num(AST):
+    __slots__ = ("token", "value", "type")
+
     def __init__(self, token) -> None:
         self.token = token
         self.value = token.value
+        self.type = INTEGER if token.type == INTEGER_CONST else REAL
 
 
 class Program(AST):
+    __slots__ = ("name", "block", "scope")
 
     def __init__(self, name, block) -> None:
         self.name = name
         self.block = block
+        # ScopedSymbolTable attached by the SemanticAnalyzer
+        self.scope = None
 
 
 class Block(AST):
+    __slots__ = ("declarations", "compound_statement")
 
     def __init__(self, declarations, compound_statement) -> None:
         self.declarations = declarations
@@ -59,6 +87,7 @@ class Block(AST):
 
 
 class VarDecl(AST):
+    __slots__ = ("var_node", "type_node")
 
     def __init__(self, var_node, type_node) -> None:
         self.var_node = var_node
@@ -66,6 +95,7 @@ class VarDecl(AST):
 
 
 class Type(AST):
+    __slots__ = ("token", "value")
 
     def __init__(self, token) -> None:
         self.token = token
@@ -73,13 +103,85 @@ class Type(AST):
 
 
 class ProcedureDecl(AST):
+    __slots__ = ("proc_name", "params", "block_node", "scope")
+
     def __init__(self, proc_name, params, block_node) -> None:
         self.proc_name = proc_name
         self.params = params
         self.block_node = block_node
+        # ScopedSymbolTable attached by the SemanticAnalyzer
+        self.scope = None
+
+
+class LazyBlock(AST):
+    """Block of a procedure whose tokens the parser skipped. It is
+    parsed, analysed and folded on the first call, see main.load_block."""
+    __slots__ = ("tokens", "offsets", "location", "scope", "visible", "block")
+
+    def __init__(self, tokens, offsets, location=None) -> None:
+        self.tokens = tokens
+        # source offset of each token and the lexer's offset to
+        # (line, column) mapping, for syntax errors
+        self.offsets = offsets
+        self.location = location
+        # procedure scope and SymbolTable.visible() at the declaration,
+        # set by the SemanticAnalyzer
+        self.scope = None
+        self.visible = None
+        # the Block, once loaded
+        self.block = None
 
 
 class Param(AST):
+    __slots__ = ("var_node", "type_node")
+
     def __init__(self, var_node, type_node) -> None:
         self.var_node = var_node
-        self.type_node = type_node
\ No newline at end of file
+        self.type_node = type_node
+
+
+class ProcedureCall(AST):
+    __slots__ = ("proc_name", "actual_params", "token", "proc_symbol")
+
+    def __init__(self, proc_name, actual_params, token) -> None:
+        self.proc_name = proc_name
+        self.actual_params = actual_params
+        self.token = token
+        # ProcedureSymbol resolved by the SemanticAnalyzer
+        self.proc_symbol = None
+
+
+class While(AST):
+    __slots__ = ("condition", "body", "hoisted")
+
+    def __init__(self, condition, body) -> None:
+        self.condition = condition
+        self.body = body
+        # Hoisted nodes reset on every entry into the loop, see optimizer
+        self.hoisted = []
+
+
+class For(AST):
+    __slots__ = ("var", "start", "stop", "down", "body", "hoisted")
+
+    def __init__(self, var, start, stop, down, body) -> None:
+        self.var = var
+        self.start = start
+        self.stop = stop
+        # True for DOWNTO
+        self.down = down
+        self.body = body
+        # Hoisted nodes reset on every entry into the loop, see optimizer
+        self.hoisted = []
+
+
+class Hoisted(AST):
+    """Loop-invariant expression. Its value is computed on first use
+    after the loop owning it is entered and reused until the loop is
+    entered again."""
+    __slots__ = ("expr", "value", "type")
+
+    def __init__(self, expr) -> None:
+        self.expr = expr
+        self.value = UNDEFINED
+        self.type = expr.type
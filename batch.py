@@ -0,0 +1,192 @@
+##############################
+#                            #
+#       BATCH EXECUTION      #
+#                            #
+##############################
+import argparse
+import itertools
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from lexer import BufferLexer
+from main import Interpreter
+from parser import Parser
+
+
+class ProgramTimeout(Exception):
+    pass
+
+
+class BatchResult:
+    """Outcome of one program: its final GLOBAL_SCOPE or the error"""
+
+    __slots__ = ("index", "name", "scope", "error", "elapsed")
+
+    def __init__(self, index, name, scope=None, error=None, elapsed=0.0) -> None:
+        self.index = index
+        self.name = name
+        self.scope = scope
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "scope": self.scope,
+            "error": self.error,
+            "elapsed": self.elapsed,
+        }
+
+    def __str__(self) -> str:
+        return f"BatchResult({self.name}, scope={self.scope}, error={self.error})"
+
+    __repr__ = __str__
+
+
+def run_program(text):
+    """Run one program with the reference interpreter, return GLOBAL_SCOPE"""
+    interpreter = Interpreter(Parser(BufferLexer(text)))
+    interpreter.interpret()
+    return interpreter.GLOBAL_SCOPE
+
+
+def _raise_timeout(signum, frame):
+    raise ProgramTimeout("Program timed out")
+
+
+def _run_chunk(chunk, timeout):
+    """Worker side: run (index, name, text) items, each under its own
+    SIGALRM based timeout where the platform supports it"""
+    use_alarm = timeout is not None and hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+    results = []
+    for index, name, text in chunk:
+        start = time.perf_counter()
+        try:
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL, timeout)
+            try:
+                scope = run_program(text)
+            finally:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            results.append(BatchResult(index, name, scope=scope, elapsed=time.perf_counter() - start))
+        except Exception as e:
+            results.append(BatchResult(index, name, error=f"{type(e).__name__}: {e}", elapsed=time.perf_counter() - start))
+    return results
+
+
+def iter_sources(source):
+    """Yield (name, text) pairs from a directory of .pas files (sorted by
+    name) or from an iterable of texts or (name, text) pairs"""
+    if isinstance(source, (str, os.PathLike)):
+        for entry in sorted(os.listdir(source)):
+            if entry.endswith(".pas"):
+                with open(os.path.join(source, entry)) as f:
+                    yield entry, f.read()
+        return
+    for number, item in enumerate(source):
+        if isinstance(item, str):
+            yield f"program{number}", item
+        else:
+            yield item
+
+
+def run_batch(source, workers=None, chunk_size=64, timeout=None, ordered=True, max_pending=None):
+    """Run many programs on a process pool and yield BatchResults.
+
+    Programs are sent to workers in chunks of chunk_size, and at most
+    max_pending chunks (default 2 per worker) are in flight at once, so
+    arbitrarily long source streams are consumed lazily. timeout is a
+    per-program limit in seconds. With ordered=True results come back
+    in input order; otherwise each chunk's results are yielded as soon
+    as that chunk finishes.
+
+    A worker that dies outright (killed, out of memory, a crash in C
+    code) breaks the whole pool. Every program of the chunks in flight
+    at that moment is reported as a failed BatchResult, since there is
+    no telling which one was responsible, and the remaining chunks go
+    to a fresh pool.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    items = ((index, name, text) for index, (name, text) in enumerate(iter_sources(source)))
+    chunks = iter(lambda: list(itertools.islice(items, chunk_size)), [])
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        # future -> the chunk it runs
+        pending = {}
+        finished = {}
+        next_index = 0
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    continue
+                try:
+                    future = executor.submit(_run_chunk, chunk, timeout)
+                except BrokenProcessPool:
+                    executor.shutdown(wait=False)
+                    executor = ProcessPoolExecutor(max_workers=workers)
+                    future = executor.submit(_run_chunk, chunk, timeout)
+                pending[future] = chunk
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = pending.pop(future)
+                try:
+                    results = future.result()
+                except BrokenProcessPool as e:
+                    error = f"{type(e).__name__}: {e}"
+                    results = [BatchResult(index, name, error=error) for index, name, _ in chunk]
+                for result in results:
+                    if ordered:
+                        finished[result.index] = result
+                    else:
+                        yield result
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+    finally:
+        executor.shutdown()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Run a directory of .pas programs, printing one JSON line per program with its final global scope")
+    parser.add_argument("directory")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--timeout", type=float)
+    parser.add_argument("--unordered", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run_batch(
+        args.directory,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        timeout=args.timeout,
+        ordered=not args.unordered,
+    )
+    failed = 0
+    for result in results:
+        failed += not result.ok
+        print(json.dumps(result.to_dict()))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
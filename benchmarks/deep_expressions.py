@@ -0,0 +1,73 @@
+"""Benchmark deep expression trees through the explicit-stack paths.
+
+For each depth, builds three programs whose single assignment is
+  chain:   a + a + ... + a        (left-deep BinOp chain)
+  nested:  ((a + 1) + 1) ... + 1  (one parenthesis level per node)
+  unary:   - - ... - a            (UnaryOp chain)
+and times parsing, semantic analysis, tree evaluation and bytecode
+compilation plus VM execution separately. None of these stages recurse
+per nesting level, so depths far beyond sys.getrecursionlimit() work.
+
+Run from the repository root:  python -m benchmarks.deep_expressions [depth ...]
+"""
+import contextlib
+import os
+import sys
+import time
+
+from compiler import Compiler
+from lexer import BufferLexer
+from main import Interpreter, SemanticAnalyzer
+from parser import Parser
+from vm import VM
+
+DEPTHS = (10 ** 3, 10 ** 5, 10 ** 6)
+
+
+def chain(depth):
+    return " + ".join(["a"] * depth)
+
+
+def nested(depth):
+    return "(" * depth + "a" + " + 1)" * depth
+
+
+def unary(depth):
+    return "- " * depth + "a"
+
+
+SHAPES = (("chain", chain), ("nested", nested), ("unary", unary))
+
+
+def program(expression):
+    return f"PROGRAM deep; VAR a : INTEGER; x : INTEGER; BEGIN a := 1; x := {expression} END."
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run(text):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        tree, parse_time = timed(Parser(BufferLexer(text)).parse)
+        _, analyze_time = timed(SemanticAnalyzer().visit, tree)
+        interpreter = Interpreter(None)
+        _, eval_time = timed(interpreter.visit, tree)
+        code_obj, compile_time = timed(Compiler().compile, tree)
+        scope, vm_time = timed(VM().run, code_obj)
+    assert scope == interpreter.GLOBAL_SCOPE
+    return parse_time, analyze_time, eval_time, compile_time + vm_time
+
+
+def main(depths):
+    print(f"{'shape':<8}{'depth':>10}{'parse':>10}{'analyze':>10}{'evaluate':>10}{'vm':>10}   (seconds)")
+    for depth in depths:
+        for name, shape in SHAPES:
+            times = run(program(shape(depth)))
+            print(f"{name:<8}{depth:>10}" + "".join(f"{t:>10.3f}" for t in times))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEPTHS)
@@ -0,0 +1,76 @@
+"""Micro-benchmark for NodeVisitor dispatch.
+
+Compares the old string-building getattr dispatch with the cached
+per-class dispatch table on a deep BinOp tree.
+
+Run from the repository root:  python -m benchmarks.dispatch
+"""
+import sys
+import time
+
+from ast_ import BinOp, Num
+from constants import TokenType
+from tokenizer import Token
+from visitor import NodeVisitor
+
+
+class LegacyNodeVisitor:
+    """NodeVisitor.visit as it was before the dispatch table"""
+
+    def visit(self, node):
+        method_name = "visit_" + type(node).__name__
+        visitor = getattr(self, method_name, self.generic_visit)
+        return visitor(node)
+
+    def generic_visit(self, node):
+        raise Exception(f"No visit_{type(node).__name__} method")
+
+
+class EvalMixin:
+
+    def visit_BinOp(self, node):
+        return self.visit(node.left) + self.visit(node.right)
+
+    def visit_Num(self, node):
+        return node.value
+
+
+class LegacyEvaluator(EvalMixin, LegacyNodeVisitor):
+    pass
+
+
+class CachedEvaluator(EvalMixin, NodeVisitor):
+    pass
+
+
+def build_tree(depth):
+    """Balanced BinOp tree with 2**depth Num leaves"""
+    plus = Token(TokenType.PLUS.value, "+")
+    one = Token(TokenType.INTEGER_CONST.value, 1)
+    if depth == 0:
+        return Num(one)
+    return BinOp(build_tree(depth - 1), plus, build_tree(depth - 1))
+
+
+def measure(visitor, tree, nodes, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        visitor.visit(tree)
+        best = min(best, time.perf_counter() - start)
+    return nodes / best
+
+
+def main(depth=18, repeat=5):
+    tree = build_tree(depth)
+    nodes = 2 ** (depth + 1) - 1
+    legacy = measure(LegacyEvaluator(), tree, nodes, repeat)
+    cached = measure(CachedEvaluator(), tree, nodes, repeat)
+    print(f"BinOp tree depth {depth}, {nodes} nodes, best of {repeat}")
+    print(f"  getattr dispatch: {legacy:14,.0f} visits/s")
+    print(f"  cached dispatch:  {cached:14,.0f} visits/s")
+    print(f"  speedup:          {cached / legacy:14.2f}x")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
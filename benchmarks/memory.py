@@ -0,0 +1,75 @@
+"""Memory footprint of parsed programs.
+
+Parses a generated reference program under tracemalloc and reports the
+bytes retained per AST node (tokens and lists owned by the nodes are
+included). With --check the run fails when the figure exceeds
+MAX_BYTES_PER_NODE, so regressions in the slotted representations of
+Token, the AST classes and symbols show up.
+
+Run from the repository root:  python -m benchmarks.memory [--check]
+"""
+import contextlib
+import io
+import sys
+import tracemalloc
+
+from ast_ import AST
+from lexer import BufferLexer
+from parser import Parser
+
+# About 93 bytes with slotted Token/AST classes and shared keyword and
+# punctuation tokens, plus headroom. tests/test_memory.py enforces it.
+MAX_BYTES_PER_NODE = 120
+
+
+def reference_program(statements=2000):
+    lines = ["PROGRAM reference;", "VAR", "    a, b, c : INTEGER;", "    x, y : REAL;", "BEGIN"]
+    for i in range(statements):
+        lines.append(f"    a := {i} + b * (c - {i % 7}) DIV 3;")
+        lines.append(f"    x := -y / {i}.5 + a;")
+    lines.append("    b := a")
+    lines.append("END.")
+    return "\n".join(lines)
+
+
+def count_nodes(tree):
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, AST):
+            count += 1
+            if hasattr(node, "__dict__"):
+                stack.extend(vars(node).values())
+            for cls in type(node).__mro__:
+                for name in getattr(cls, "__slots__", ()):
+                    stack.append(getattr(node, name, None))
+    return count
+
+
+def bytes_per_node(text):
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser = Parser(BufferLexer(text))
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tree = parser.parse()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    nodes = count_nodes(tree)
+    return retained / nodes, nodes
+
+
+def main(argv):
+    per_node, nodes = bytes_per_node(reference_program())
+    print(f"{nodes} AST nodes, {per_node:.1f} bytes per node (limit {MAX_BYTES_PER_NODE})")
+    if "--check" in argv and per_node > MAX_BYTES_PER_NODE:
+        print("Memory regression: bytes per node above limit")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,139 @@
+"""Benchmark suite over generated workloads with a regression gate.
+
+Times lexing, parsing, semantic analysis (including constant folding)
+and execution separately for every workload in benchmarks.workloads,
+taking the best of --repeat runs. Results can be saved as the baseline
+and later runs compared against it: a stage that is slower than the
+baseline by more than --tolerance (a fraction) and by at least
+--min-seconds fails the run, and so does a workload with no baseline.
+
+Baselines are machine specific; re-record with --save-baseline after
+moving to new hardware.
+
+Run from the repository root:
+  python -m benchmarks.suite [--scale F] [--repeat N] [--only NAME]
+                             [--save-baseline] [--check] [--tolerance F] [--min-seconds F]
+                             [--baseline PATH] [--output PATH]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from benchmarks.workloads import WORKLOADS
+from lexer import BufferLexer
+from main import Interpreter, SemanticAnalyzer
+from optimizer import ConstantFolder
+from parser import Parser
+
+STAGES = ("lex", "parse", "semantic", "execute")
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def run_stages(text):
+    timings = {}
+
+    start = time.perf_counter()
+    tokens = list(BufferLexer(text))
+    timings["lex"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tree = Parser(tokens).parse()
+    timings["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    SemanticAnalyzer().visit(tree)
+    tree = ConstantFolder().fold(tree)
+    timings["semantic"] = time.perf_counter() - start
+
+    interpreter = Interpreter(None)
+    start = time.perf_counter()
+    interpreter.visit(tree)
+    timings["execute"] = time.perf_counter() - start
+    return timings
+
+
+def measure(names, scale, repeat):
+    results = {}
+    for name in names:
+        generate, size = WORKLOADS[name]
+        text = generate(max(1, int(size * scale)))
+        best = None
+        for _ in range(repeat):
+            timings = run_stages(text)
+            if best is None:
+                best = timings
+            else:
+                best = {stage: min(best[stage], timings[stage]) for stage in STAGES}
+        results[name] = best
+    return results
+
+
+def compare(results, baseline, tolerance, min_seconds):
+    """Return the list of (workload, stage, seconds, baseline seconds)
+    that regressed beyond tolerance. Differences under min_seconds are
+    treated as noise."""
+    regressions = []
+    for name, timings in results.items():
+        for stage in STAGES:
+            reference = baseline.get(name, {}).get(stage)
+            if reference is None or timings[stage] - reference < min_seconds:
+                continue
+            if timings[stage] > reference * (1 + tolerance):
+                regressions.append((name, stage, timings[stage], reference))
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Pipeline benchmarks on generated Pascal workloads")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", action="append", choices=sorted(WORKLOADS))
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--min-seconds", type=float, default=0.005)
+    parser.add_argument("--output")
+    args = parser.parse_args(argv)
+
+    results = measure(args.only or list(WORKLOADS), args.scale, args.repeat)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{'workload':<20}" + "".join(f"{stage:>13}" for stage in STAGES) + "   (seconds)")
+    for name, timings in results.items():
+        cells = []
+        for stage in STAGES:
+            reference = baseline.get(name, {}).get(stage)
+            cell = f"{timings[stage]:.3f}"
+            if reference:
+                cell += f" {(timings[stage] / reference - 1) * 100:+.0f}%"
+            cells.append(cell.rjust(13))
+        print(f"{name:<20}" + "".join(cells))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+    if args.check:
+        # a workload without a baseline would otherwise pass unchecked
+        missing = [name for name in results if name not in baseline]
+        for name in missing:
+            print(f"NO BASELINE {name}: record one with --save-baseline")
+        regressions = compare(results, baseline, args.tolerance, args.min_seconds)
+        for name, stage, seconds, reference in regressions:
+            print(f"REGRESSION {name}.{stage}: {seconds:.3f}s vs baseline {reference:.3f}s")
+        return 1 if regressions or missing else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,66 @@
+"""Benchmark the Python transpiler backend against the Interpreter.
+
+Transpiles every workload once, checks that running the compiled code
+object gives the same GLOBAL_SCOPE as Interpreter.visit on the same
+folded tree, and reports the execution times of both. Workloads the
+backend rejects are listed with the reason.
+
+Run from the repository root:  python -m benchmarks.transpile [scale] [repeat]
+"""
+import sys
+import time
+
+from benchmarks.workloads import WORKLOADS
+from lexer import BufferLexer
+from main import Interpreter, SemanticAnalyzer
+from optimizer import ConstantFolder
+from parser import Parser
+from transpiler import transpile
+
+
+def analysed_tree(text):
+    tree = Parser(BufferLexer(text)).parse()
+    SemanticAnalyzer().visit(tree)
+    return ConstantFolder().fold(tree)
+
+
+def best_of(run, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_interpreter(tree):
+    interpreter = Interpreter(None)
+    interpreter.visit(tree)
+    return interpreter.GLOBAL_SCOPE
+
+
+def main(scale=1.0, repeat=5):
+    print(f"best of {repeat}, seconds")
+    print(f"{'workload':<20} {'transpile':>10} {'interpreter':>12} {'python':>10} {'speedup':>8}")
+    for name, (generate, size) in WORKLOADS.items():
+        tree = analysed_tree(generate(max(1, int(size * scale))))
+        start = time.perf_counter()
+        try:
+            program = transpile(tree)
+        except Exception as e:
+            print(f"{name:<20} unsupported: {e}")
+            continue
+        # the first run also executes the module defining program()
+        program.run()
+        transpiled = time.perf_counter() - start
+        interpreted, expected = best_of(lambda: run_interpreter(tree), repeat)
+        executed, result = best_of(program.run, repeat)
+        if result != expected:
+            raise AssertionError(f"{name}: python backend gave {result}, interpreter {expected}")
+        print(f"{name:<20} {transpiled:10.4f} {interpreted:12.4f} {executed:10.4f} {interpreted / executed:7.1f}x")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(float(args[0]) if args else 1.0, *map(int, args[1:2]))
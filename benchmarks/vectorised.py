@@ -0,0 +1,85 @@
+"""Benchmark a parameter sweep: one program run with many initial values.
+
+Compares N runs of the tree-walking Interpreter, one per set of inputs,
+with a single VectorInterpreter run over NumPy columns of all N inputs.
+
+Run from the repository root:  python -m benchmarks.vectorised [runs]
+"""
+import random
+import sys
+import time
+
+from constants import UNDEFINED
+from lexer import BufferLexer
+from main import Interpreter, SemanticAnalyzer
+from optimizer import ConstantFolder
+from parser import Parser
+from vectorize import VectorInterpreter, np
+
+SOURCE = """
+PROGRAM sweep;
+VAR
+    a, b, c : INTEGER;
+    x, y : REAL;
+BEGIN
+    c := a * 3 DIV (b + 1) - -a;
+    x := a / 7 + b * 0.5;
+    y := x * x - c;
+    BEGIN
+        c := c + a * b;
+        x := y / 2.5 - x
+    END;
+    y := y * x + c DIV 2
+END.
+"""
+
+
+def analysed_tree():
+    tree = Parser(BufferLexer(SOURCE)).parse()
+    SemanticAnalyzer().visit(tree)
+    return ConstantFolder().fold(tree)
+
+
+class SeededInterpreter(Interpreter):
+    """Interpreter whose global frame starts out with the given values"""
+
+    def __init__(self, inputs) -> None:
+        super().__init__(None)
+        self.inputs = inputs
+
+    def visit_Program(self, node):
+        scope = node.scope
+        self.global_scope = scope
+        self.display = [None] * (scope.scope_level + 1)
+        frame = self.display[scope.scope_level] = [UNDEFINED] * scope.frame_size
+        for symbol in scope.slots:
+            frame[symbol.slot] = self.inputs.get(symbol.name, UNDEFINED)
+        self.visit(node.block)
+
+
+def main(runs=100000):
+    if np is None:
+        print("numpy is not installed")
+        return 1
+    tree = analysed_tree()
+    a = [random.randint(-1000, 1000) for _ in range(runs)]
+    b = [random.randint(0, 1000) for _ in range(runs)]
+
+    start = time.perf_counter()
+    for inputs in zip(a, b):
+        SeededInterpreter(dict(zip("ab", inputs))).visit(tree)
+    looped = time.perf_counter() - start
+
+    start = time.perf_counter()
+    VectorInterpreter().run(tree, {"a": a, "b": b})
+    vectorised = time.perf_counter() - start
+
+    print(f"{runs} runs of a {SOURCE.count(':=')} statement program")
+    print(f"  Interpreter per run: {looped:8.3f}s")
+    print(f"  VectorInterpreter:   {vectorised:8.3f}s")
+    print(f"  speedup:             {looped / vectorised:8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*map(int, sys.argv[1:])))
@@ -0,0 +1,170 @@
+"""Generators for parameterised Pascal benchmark programs.
+
+Each generator takes a size and returns program source that stresses
+one part of the pipeline.
+"""
+
+
+def wide_vars(size):
+    """A VAR section with `size` declarations and a short body"""
+    lines = ["PROGRAM widevars;", "VAR"]
+    for i in range(0, size, 10):
+        names = ", ".join(f"v{j}" for j in range(i, min(i + 10, size)))
+        lines.append(f"    {names} : {'INTEGER' if i % 20 == 0 else 'REAL'};")
+    lines.append("BEGIN")
+    lines.append("    v0 := 1;")
+    lines.append(f"    v{size - 1} := v0 * 2")
+    lines.append("END.")
+    return "\n".join(lines)
+
+
+def long_statements(size):
+    """`size` simple INTEGER assignments in one compound statement"""
+    lines = ["PROGRAM longstatements;", "VAR", "    a, b, c : INTEGER;", "BEGIN", "    a := 1; b := 2; c := 3;"]
+    for i in range(size):
+        lines.append(f"    a := b + {i % 97}; b := c - a; c := a * 2 DIV 3;")
+    lines.append("    a := b")
+    lines.append("END.")
+    return "\n".join(lines)
+
+
+def deep_expressions(size):
+    """Assignments whose expressions nest `size` levels deep"""
+    nested = "(" * size + "x" + " + 1)" * size
+    chain = " + ".join(["x"] * size)
+    unary = "- " * size + "x"
+    return (
+        "PROGRAM deepexpressions;\nVAR x, y : INTEGER;\nBEGIN\n"
+        f"    x := 1;\n    y := {nested};\n    y := {chain};\n    y := {unary}\nEND."
+    )
+
+
+def nested_procedures(size):
+    """`size` procedures, each declared inside the previous one"""
+    head = ["PROGRAM nestedprocedures;", "VAR g : INTEGER;"]
+    opening = []
+    closing = []
+    for i in range(size):
+        opening.append(f"PROCEDURE p{i};")
+        opening.append(f"VAR l{i}, g : REAL;")
+        closing.append(f"BEGIN l{i} := g * 2.0; g := l{i} END;")
+    body = ["BEGIN", "    g := 1", "END."]
+    return "\n".join(head + opening + list(reversed(closing)) + body)
+
+
+def real_arithmetic(size):
+    """`size` statements of mixed REAL arithmetic"""
+    lines = ["PROGRAM realarithmetic;", "VAR", "    x, y, z : REAL;", "BEGIN", "    x := 1.5; y := 2.25; z := 0.0;"]
+    for i in range(size):
+        lines.append(f"    z := z + x * y / {i % 13 + 1}.5 - -x;")
+        lines.append("    x := x * 1.0001 + z / 1000000.0; y := y - x / 3.0;")
+    lines.append("    z := z / 2.0")
+    lines.append("END.")
+    return "\n".join(lines)
+
+
+def recursive_calls(size):
+    """fib(`size`) by naive recursion, summed into a global: every call
+    with n >= 2 calls itself for n - 1 and n - 2. The language has no IF,
+    so each branch is a WHILE that runs at most once."""
+    return "\n".join([
+        "PROGRAM recursivecalls;",
+        "VAR total : INTEGER;",
+        "PROCEDURE fib(n : INTEGER);",
+        "VAR pending : INTEGER;",
+        "BEGIN",
+        "    pending := 1;",
+        "    WHILE (n < 2) AND (pending = 1) DO BEGIN total := total + n; pending := 0 END;",
+        "    WHILE pending = 1 DO BEGIN fib(n - 1); fib(n - 2); pending := 0 END",
+        "END;",
+        "BEGIN",
+        "    total := 0;",
+        f"    fib({size})",
+        "END.",
+    ])
+
+
+def recursive_call_count(size):
+    """Number of calls recursive_calls(size) makes"""
+    below, calls = 1, 1
+    for _ in range(size - 1):
+        below, calls = calls, calls + below + 1
+    return calls
+
+
+def deep_calls(size):
+    """`size` nested procedures, each calling the one declared inside it,
+    run `size` times: call chains `size` deep that touch the frames of
+    every enclosing scope"""
+    head = ["PROGRAM deepcalls;", "VAR g : INTEGER;"]
+    opening = []
+    closing = []
+    for i in range(size):
+        opening.append(f"PROCEDURE p{i}(n : INTEGER);")
+        opening.append(f"VAR l{i} : INTEGER;")
+        call = f"; p{i + 1}(l{i})" if i + 1 < size else ""
+        closing.append(f"BEGIN l{i} := n + g; g := g + 1{call} END;")
+    body = ["BEGIN", "    g := 0;"] + [f"    p0({i});" for i in range(size)] + ["    g := g", "END."]
+    return "\n".join(head + opening + list(reversed(closing)) + body)
+
+
+def loop_kernel(size):
+    """Nested FOR loops running `size` * `size` iterations of a body with
+    loop-invariant subexpressions, and a WHILE loop counting down"""
+    return "\n".join([
+        "PROGRAM loopkernel;",
+        "VAR i, j, n, acc, k : INTEGER; scale, sum : REAL;",
+        "BEGIN",
+        f"    n := {size}; acc := 0; scale := 1.5; sum := 0.0;",
+        "    FOR i := 1 TO n DO",
+        "        FOR j := n DOWNTO 1 DO",
+        "        BEGIN",
+        "            acc := acc + (n * n - 1) DIV 3 + i * j;",
+        "            sum := sum + scale * (n + 1) / 2.0",
+        "        END;",
+        "    k := n * n;",
+        "    WHILE (k > 0) AND NOT (acc < 0) DO",
+        "        k := k - 1",
+        "END.",
+    ])
+
+
+def many_procedures(size):
+    """`size` procedures with sizeable bodies, of which the main program
+    only calls three"""
+    lines = ["PROGRAM manyprocedures;", "VAR total : INTEGER; scale : REAL;"]
+    for i in range(size):
+        lines.append(f"PROCEDURE p{i}(n : INTEGER; f : REAL);")
+        lines.append("VAR k, m : INTEGER; r : REAL;")
+        lines.append("    PROCEDURE helper(d : INTEGER);")
+        lines.append("    BEGIN total := total + d * 2 - 1 END;")
+        lines.append("BEGIN")
+        lines.append(f"    m := n * {i % 7 + 1}; r := f / 2.0;")
+        lines.append("    FOR k := 1 TO n DO")
+        lines.append("    BEGIN")
+        lines.append(f"        total := total + (k * m + {i}) DIV 3;")
+        lines.append("        r := r * 1.5 - k / 4.0;")
+        lines.append("        helper(k)")
+        lines.append("    END;")
+        lines.append("    scale := scale + r")
+        lines.append("END;")
+    lines.append("BEGIN")
+    lines.append("    total := 0; scale := 0.0;")
+    for i in (0, size // 2, size - 1):
+        lines.append(f"    p{i}(10, 1.0);")
+    lines.append("    total := total + 1")
+    lines.append("END.")
+    return "\n".join(lines)
+
+
+WORKLOADS = {
+    "wide_vars": (wide_vars, 20000),
+    "long_statements": (long_statements, 10000),
+    "deep_expressions": (deep_expressions, 5000),
+    "nested_procedures": (nested_procedures, 150),
+    "real_arithmetic": (real_arithmetic, 10000),
+    "recursive_calls": (recursive_calls, 21),
+    "deep_calls": (deep_calls, 300),
+    "loop_kernel": (loop_kernel, 300),
+    "many_procedures": (many_procedures, 2000),
+}
@@ -0,0 +1,162 @@
+##############################
+#                            #
+#       PROGRAM CACHE        #
+#                            #
+##############################
+import hashlib
+import os
+from collections import OrderedDict
+
+from arena import Arena, to_arena, from_arena
+from compiler import Compiler, CodeObject
+from constants import INTERPRETER_VERSION
+from lexer import BufferLexer
+from main import SemanticAnalyzer
+from optimizer import ConstantFolder
+from parser import Parser
+from transpiler import PythonProgram, transpile
+
+PARSED = "ast"
+COMPILED = "code"
+TRANSPILED = "py"
+
+
+def source_key(text):
+    """Content hash of a program source plus the interpreter version"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(INTERPRETER_VERSION.encode())
+    digest.update(b"\0")
+    digest.update(text.encode())
+    return digest.hexdigest()
+
+
+class ProgramCache:
+    """Two-level cache of parsed and compiled programs.
+
+    Entries are keyed by source_key(text) and stored in a compact marshal
+    format: parsed programs as serialized Arenas, compiled programs as
+    serialized CodeObjects, transpiled programs as PythonProgram source
+    and code object. The in-memory level is an LRU bounded to
+    max_entries. With a directory, entries are also written to disk as
+    <key>.<kind> files; hits refresh the file mtime and the least
+    recently used files are deleted once the directory holds more than
+    max_disk_bytes.
+    """
+
+    def __init__(self, directory=None, max_entries=256, max_disk_bytes=64 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def parse(self, text):
+        """Return a fresh object tree for text, parsing only on a miss"""
+        key = source_key(text)
+        data = self._get(key, PARSED)
+        if data is None:
+            tree = Parser(BufferLexer(text)).parse()
+            self._put(key, PARSED, to_arena(tree).to_bytes())
+            return tree
+        return from_arena(Arena.from_bytes(data))
+
+    def compile(self, text):
+        """Return the checked, folded and compiled CodeObject for text"""
+        key = source_key(text)
+        data = self._get(key, COMPILED)
+        if data is None:
+            tree = self.parse(text)
+            SemanticAnalyzer().visit(tree)
+            tree = ConstantFolder().fold(tree)
+            code_obj = Compiler().compile(tree)
+            self._put(key, COMPILED, code_obj.to_bytes())
+            return code_obj
+        return CodeObject.from_bytes(data)
+
+    def transpile(self, text):
+        """Return the checked, folded and transpiled PythonProgram for text"""
+        key = source_key(text)
+        data = self._get(key, TRANSPILED)
+        if data is None:
+            tree = self.parse(text)
+            SemanticAnalyzer().visit(tree)
+            program = transpile(ConstantFolder().fold(tree))
+            self._put(key, TRANSPILED, program.to_bytes())
+            return program
+        return PythonProgram.from_bytes(data)
+
+    def clear(self):
+        self._memory.clear()
+        if self.directory is not None:
+            for path in self._disk_entries():
+                os.remove(path)
+
+    def _get(self, key, kind):
+        data = self._memory.get((key, kind))
+        if data is not None:
+            self._memory.move_to_end((key, kind))
+            self.hits += 1
+            return data
+        if self.directory is not None:
+            path = self._path(key, kind)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+            except OSError:
+                data = None
+            if data is not None:
+                self._remember(key, kind, data)
+                self.hits += 1
+                return data
+        self.misses += 1
+        return None
+
+    def _put(self, key, kind, data):
+        self._remember(key, kind, data)
+        if self.directory is not None:
+            path = self._path(key, kind)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+
+    def _remember(self, key, kind, data):
+        self._memory[(key, kind)] = data
+        self._memory.move_to_end((key, kind))
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key, kind):
+        return os.path.join(self.directory, f"{key}.{kind}")
+
+    def _disk_entries(self):
+        return [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith((f".{PARSED}", f".{COMPILED}", f".{TRANSPILED}"))
+        ]
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for path in self._disk_entries():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,121 @@
+##############################
+#                            #
+#         CALL STACK         #
+#                            #
+##############################
+from constants import UNDEFINED
+
+# Calls deeper than this are taken for runaway recursion. The Interpreter
+# keeps Pascal calls off the Python stack, so this is the only bound.
+MAX_CALL_DEPTH = 100_000
+
+
+class ActivationRecord:
+    """One executing program or procedure: its scope and the frame that
+    holds the values of the scope's slots"""
+
+    __slots__ = ("scope", "frame", "saved_frame")
+
+    def __init__(self, scope) -> None:
+        self.scope = scope
+        # Sized once from the semantic pass, slots never grow
+        self.frame = [UNDEFINED] * scope.frame_size
+        # display entry of the same level this record's frame replaced
+        self.saved_frame = None
+
+    @property
+    def name(self):
+        return self.scope.scope_name
+
+    @property
+    def nesting_level(self):
+        return self.scope.scope_level
+
+    def members(self):
+        """Assigned variables of the record by name"""
+        frame = self.frame
+        return {
+            symbol.name: frame[symbol.slot]
+            for symbol in self.scope.slots
+            if frame[symbol.slot] is not UNDEFINED
+        }
+
+    def __str__(self) -> str:
+        return f"{self.nesting_level}: {self.name} {self.members()}"
+
+    __repr__ = __str__
+
+
+class FramePool:
+    """Released ActivationRecords of one scope, ready for reuse"""
+
+    __slots__ = ("blank", "free")
+
+    def __init__(self, scope) -> None:
+        self.blank = (UNDEFINED,) * scope.frame_size
+        self.free = []
+
+
+class CallStack:
+    """Stack of ActivationRecords driving the Interpreter's display.
+
+    push(scope, display) installs the frame of a new record as
+    display[level] and remembers the frame it replaced; pop(display)
+    puts that frame back. Since the display only ever holds the frames
+    of the enclosing scopes, nested procedures still reach the variables
+    of their callers' scopes by (scope level, slot).
+
+    Records are pooled per scope. A popped record has its frame reset to
+    UNDEFINED with one slice assignment and is handed to the next call of
+    the same procedure, so once a procedure has been called as deeply as
+    it will be, calling it allocates nothing.
+
+    push raises RecursionError once max_depth records are on the stack.
+    """
+
+    def __init__(self, max_depth=MAX_CALL_DEPTH) -> None:
+        self._records = []
+        self._pools = {}
+        self.max_depth = max_depth
+
+    def __len__(self):
+        return len(self._records)
+
+    def __str__(self) -> str:
+        return "\n".join(str(record) for record in reversed(self._records))
+
+    __repr__ = __str__
+
+    def peek(self):
+        return self._records[-1]
+
+    def push(self, scope, display):
+        if len(self._records) >= self.max_depth:
+            raise RecursionError(f"call depth exceeded {self.max_depth}")
+        pool = self._pools.get(scope)
+        if pool is None:
+            pool = self._pools[scope] = FramePool(scope)
+        if pool.free:
+            record = pool.free.pop()
+        else:
+            record = ActivationRecord(scope)
+        level = scope.scope_level
+        if level >= len(display):
+            display.extend([None] * (level + 1 - len(display)))
+        record.saved_frame = display[level]
+        display[level] = record.frame
+        self._records.append(record)
+        return record
+
+    def pop(self, display):
+        record = self._records.pop()
+        display[record.scope.scope_level] = record.saved_frame
+        record.saved_frame = None
+        pool = self._pools[record.scope]
+        record.frame[:] = pool.blank
+        pool.free.append(record)
+        return record
+
+    def reset(self):
+        """Drop the records left over by a run that did not finish"""
+        self._records.clear()
@@ -0,0 +1,304 @@
+##############################
+#                            #
+#         COMPILER           #
+#                            #
+##############################
+import marshal
+
+import constants
+from ast_ import BinOp, UnaryOp
+from constants import INTEGER, REAL
+from visitor import NodeVisitor
+
+# Opcodes are plain ints so the VM compares small integers
+# instead of strings or enum members on every instruction.
+LOAD_CONST = 0
+LOAD_VAR = 1
+STORE_VAR = 2
+ADD = 3
+SUB = 4
+MUL = 5
+INT_DIV = 6
+FLOAT_DIV = 7
+NEG = 8
+TO_REAL = 9
+EQ = 10
+NE = 11
+LT = 12
+LE = 13
+GT = 14
+GE = 15
+NOT = 16
+DUP_TOP = 17
+POP_TOP = 18
+# Jump arguments are absolute offsets into CodeObject.code
+JUMP = 19
+POP_JUMP_IF_FALSE = 20
+JUMP_IF_FALSE_OR_POP = 21
+JUMP_IF_TRUE_OR_POP = 22
+
+OPNAMES = {
+    LOAD_CONST: "LOAD_CONST",
+    LOAD_VAR: "LOAD_VAR",
+    STORE_VAR: "STORE_VAR",
+    ADD: "ADD",
+    SUB: "SUB",
+    MUL: "MUL",
+    INT_DIV: "INT_DIV",
+    FLOAT_DIV: "FLOAT_DIV",
+    NEG: "NEG",
+    TO_REAL: "TO_REAL",
+    EQ: "EQ",
+    NE: "NE",
+    LT: "LT",
+    LE: "LE",
+    GT: "GT",
+    GE: "GE",
+    NOT: "NOT",
+    DUP_TOP: "DUP_TOP",
+    POP_TOP: "POP_TOP",
+    JUMP: "JUMP",
+    POP_JUMP_IF_FALSE: "POP_JUMP_IF_FALSE",
+    JUMP_IF_FALSE_OR_POP: "JUMP_IF_FALSE_OR_POP",
+    JUMP_IF_TRUE_OR_POP: "JUMP_IF_TRUE_OR_POP",
+}
+
+JUMPS = (JUMP, POP_JUMP_IF_FALSE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP)
+
+HAS_ARG = (LOAD_CONST, LOAD_VAR, STORE_VAR) + JUMPS
+
+# FLOAT_DIV and NOT name opcodes here, so the interned operator token
+# types are reached through the constants module
+BINARY_OPS = {
+    constants.PLUS: ADD,
+    constants.MINUS: SUB,
+    constants.MULTIPLY: MUL,
+    constants.INTEGER_DIV: INT_DIV,
+    constants.FLOAT_DIV: FLOAT_DIV,
+    constants.EQUAL: EQ,
+    constants.NOT_EQUAL: NE,
+    constants.LESS_THAN: LT,
+    constants.LESS_EQUAL: LE,
+    constants.GREATER_THAN: GT,
+    constants.GREATER_EQUAL: GE,
+}
+
+# AND/OR jump over their right operand once the left one decides
+SHORT_CIRCUIT_OPS = {
+    constants.AND: JUMP_IF_FALSE_OR_POP,
+    constants.OR: JUMP_IF_TRUE_OR_POP,
+}
+
+
+class CodeObject:
+    """Compiled program: a flat list of (opcode, arg) pairs, a constants
+    pool and the variable names indexed by slot"""
+
+    def __init__(self, name, code, consts, varnames) -> None:
+        self.name = name
+        self.code = code
+        self.consts = consts
+        self.varnames = varnames
+
+    def to_bytes(self):
+        return marshal.dumps((self.name, self.code, self.consts, self.varnames))
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(*marshal.loads(data))
+
+    def __str__(self) -> str:
+        return f"CodeObject({self.name}, {len(self.code) // 2} instructions)"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+def disassemble(code_obj):
+    """Return a human readable listing of the bytecode"""
+    lines = []
+    code = code_obj.code
+    for pc in range(0, len(code), 2):
+        op, arg = code[pc], code[pc + 1]
+        line = f"{pc // 2:4} {OPNAMES[op]:<10}"
+        if op == LOAD_CONST:
+            line += f" {arg} ({code_obj.consts[arg]!r})"
+        elif op in JUMPS:
+            line += f" {arg // 2}"
+        elif op in HAS_ARG:
+            line += f" {arg} ({code_obj.varnames[arg]})"
+        lines.append(line.rstrip())
+    return "\n".join(lines)
+
+
+class Compiler(NodeVisitor):
+    """Compile a Program AST into a CodeObject for the VM"""
+
+    def __init__(self) -> None:
+        self.code = []
+        self.consts = []
+        self.varnames = []
+        self._const_index = {}
+        self._slots = {}
+
+    def compile(self, tree):
+        self.visit(tree)
+        name = tree.name if hasattr(tree, "name") else None
+        return CodeObject(name, self.code, self.consts, self.varnames)
+
+    def emit(self, op, arg=0):
+        self.code.append(op)
+        self.code.append(arg)
+
+    def emit_jump(self, op, target=None):
+        """Emit a jump and return its offset, for patch() once the target
+        is known"""
+        self.emit(op, target)
+        return len(self.code) - 2
+
+    def patch(self, jump):
+        """Point the jump emitted at offset jump to the next instruction"""
+        self.code[jump + 1] = len(self.code)
+
+    def const(self, value):
+        # 1 and 1.0 compare equal, keep them apart in the pool
+        key = (type(value), value)
+        index = self._const_index.get(key)
+        if index is None:
+            index = len(self.consts)
+            self.consts.append(value)
+            self._const_index[key] = index
+        return index
+
+    def slot(self, name):
+        index = self._slots.get(name)
+        if index is None:
+            index = len(self.varnames)
+            self.varnames.append(name)
+            self._slots[name] = index
+        return index
+
+    def visit_Program(self, node):
+        self.visit(node.block)
+
+    def visit_Block(self, node):
+        for declaration in node.declarations:
+            self.visit(declaration)
+        self.visit(node.compound_statement)
+
+    def visit_VarDecl(self, node):
+        self.slot(node.var_node.value)
+
+    def visit_Type(self, node):
+        pass
+
+    def visit_ProcedureDecl(self, node):
+        pass
+
+    def visit_ProcedureCall(self, node):
+        # CodeObjects are a single flat frame addressed by name, there is
+        # nowhere to put a callee's frame
+        raise Exception(f"Procedure calls are not supported by the compiler: {node.proc_name}")
+
+    def visit_Compound(self, node):
+        for child in node.children:
+            self.visit(child)
+
+    def visit_NoOp(self, node):
+        pass
+
+    def visit_While(self, node):
+        loop = len(self.code)
+        self.visit(node.condition)
+        exit_jump = self.emit_jump(POP_JUMP_IF_FALSE)
+        self.visit(node.body)
+        self.emit(JUMP, loop)
+        self.patch(exit_jump)
+
+    def visit_For(self, node):
+        """The limit stays on the stack for the whole loop. The variable
+        is tested before it is stepped, so after the loop it holds the
+        last value the body saw, like in the Interpreter."""
+        slot = self.slot(node.var.value)
+        step, past_limit, at_limit = (SUB, LE, LT) if node.down else (ADD, GE, GT)
+        self.visit(node.start)
+        self.emit(STORE_VAR, slot)
+        self.visit(node.stop)
+        # limit >= var (TO) or limit <= var (DOWNTO)
+        self.emit(DUP_TOP)
+        self.emit(LOAD_VAR, slot)
+        self.emit(past_limit)
+        skip_jump = self.emit_jump(POP_JUMP_IF_FALSE)
+        loop = len(self.code)
+        self.visit(node.body)
+        self.emit(DUP_TOP)
+        self.emit(LOAD_VAR, slot)
+        self.emit(at_limit)
+        exit_jump = self.emit_jump(POP_JUMP_IF_FALSE)
+        self.emit(LOAD_VAR, slot)
+        self.emit(LOAD_CONST, self.const(1))
+        self.emit(step)
+        self.emit(STORE_VAR, slot)
+        self.emit(JUMP, loop)
+        self.patch(skip_jump)
+        self.patch(exit_jump)
+        self.emit(POP_TOP)
+
+    def visit_Assign(self, node):
+        self.visit(node.right)
+        if node.left.type == REAL and node.right.type == INTEGER:
+            self.emit(TO_REAL)
+        self.emit(STORE_VAR, self.slot(node.left.value))
+
+    def visit_Var(self, node):
+        self.emit(LOAD_VAR, self.slot(node.value))
+
+    def visit_Num(self, node):
+        self.emit(LOAD_CONST, self.const(node.value))
+
+    def visit_UnaryOp(self, node):
+        self.emit_expression(node)
+
+    def visit_BinOp(self, node):
+        self.emit_expression(node)
+
+    def visit_Hoisted(self, node):
+        # the VM has no per-loop value cache, compute it in place
+        self.emit_expression(node.expr)
+
+    def emit_expression(self, node):
+        """Emit postfix code for an expression using an explicit stack.
+        Opcodes are queued behind their operands as plain ints. For
+        AND/OR a list [jump opcode, offset] is queued between the operands:
+        the first time it comes up the jump is emitted, the second time
+        (behind the right operand) the jump is patched to land there."""
+        todo = [node]
+        while todo:
+            item = todo.pop()
+            kind = type(item)
+            if kind is int:
+                self.emit(item)
+            elif kind is list:
+                if item[1] is None:
+                    item[1] = self.emit_jump(item[0])
+                else:
+                    self.patch(item[1])
+            elif kind is BinOp:
+                jump = SHORT_CIRCUIT_OPS.get(item.op.type)
+                if jump is not None:
+                    jump = [jump, None]
+                    todo.append(jump)
+                    todo.append(item.right)
+                    todo.append(jump)
+                else:
+                    todo.append(BINARY_OPS[item.op.type])
+                    todo.append(item.right)
+                todo.append(item.left)
+            elif kind is UnaryOp:
+                if item.op.type == constants.MINUS:
+                    todo.append(NEG)
+                elif item.op.type == constants.NOT:
+                    todo.append(NOT)
+                todo.append(item.expr)
+            else:
+                self.visit(item)
@@ -1,23 +1,36 @@
+import sys
 from enum import Enum
 
 
 class TokenType(Enum):
 
+    AND = "AND"
     ASSIGN = "ASSIGN"
     BEGIN = "BEGIN"
     COLON = "COLON"
     COMMA = "COMMA"
+    DO = "DO"
     DOT = "DOT"
+    DOWNTO = "DOWNTO"
     END = "END"
     EOF = "EOF"
+    EQUAL = "EQUAL"
     FLOAT_DIV = "FLOAT_DIV"
+    FOR = "FOR"
+    GREATER_EQUAL = "GREATER_EQUAL"
+    GREATER_THAN = "GREATER_THAN"
     ID = "ID"
     INTEGER = "INTEGER"
     INTEGER_CONST = "INTEGER_CONST"
     INTEGER_DIV = "INTEGER_DIV"
+    LESS_EQUAL = "LESS_EQUAL"
+    LESS_THAN = "LESS_THAN"
     LPAREN = "LPAREN"
     MINUS = "MINUS"
     MULTIPLY = "MULTIPLY"
+    NOT = "NOT"
+    NOT_EQUAL = "NOT_EQUAL"
+    OR = "OR"
     PLUS = "PLUS"
     PROCEDURE = "PROCEDURE"
     PROGRAM = "PROGRAM"
@@ -25,6 +38,61 @@ class TokenType(Enum):
     REAL_CONST = "REAL_CONST"
     RPAREN = "RPAREN"
     SEMI = "SEMI"
+    TO = "TO"
     VAR = "VAR"
+    WHILE = "WHILE"
     # EOF represents end-of-file token which indicate
     # that there is no more input for Lexical Analysis
+
+# Interned plain-string token types. Hot paths compare Token.type against
+# these module globals instead of going through TokenType.X.value.
+AND = sys.intern(TokenType.AND.value)
+ASSIGN = sys.intern(TokenType.ASSIGN.value)
+BEGIN = sys.intern(TokenType.BEGIN.value)
+COLON = sys.intern(TokenType.COLON.value)
+COMMA = sys.intern(TokenType.COMMA.value)
+DO = sys.intern(TokenType.DO.value)
+DOT = sys.intern(TokenType.DOT.value)
+DOWNTO = sys.intern(TokenType.DOWNTO.value)
+END = sys.intern(TokenType.END.value)
+EOF = sys.intern(TokenType.EOF.value)
+EQUAL = sys.intern(TokenType.EQUAL.value)
+FLOAT_DIV = sys.intern(TokenType.FLOAT_DIV.value)
+FOR = sys.intern(TokenType.FOR.value)
+GREATER_EQUAL = sys.intern(TokenType.GREATER_EQUAL.value)
+GREATER_THAN = sys.intern(TokenType.GREATER_THAN.value)
+ID = sys.intern(TokenType.ID.value)
+INTEGER = sys.intern(TokenType.INTEGER.value)
+INTEGER_CONST = sys.intern(TokenType.INTEGER_CONST.value)
+INTEGER_DIV = sys.intern(TokenType.INTEGER_DIV.value)
+LESS_EQUAL = sys.intern(TokenType.LESS_EQUAL.value)
+LESS_THAN = sys.intern(TokenType.LESS_THAN.value)
+LPAREN = sys.intern(TokenType.LPAREN.value)
+MINUS = sys.intern(TokenType.MINUS.value)
+MULTIPLY = sys.intern(TokenType.MULTIPLY.value)
+NOT = sys.intern(TokenType.NOT.value)
+NOT_EQUAL = sys.intern(TokenType.NOT_EQUAL.value)
+OR = sys.intern(TokenType.OR.value)
+PLUS = sys.intern(TokenType.PLUS.value)
+PROCEDURE = sys.intern(TokenType.PROCEDURE.value)
+PROGRAM = sys.intern(TokenType.PROGRAM.value)
+REAL = sys.intern(TokenType.REAL.value)
+REAL_CONST = sys.intern(TokenType.REAL_CONST.value)
+RPAREN = sys.intern(TokenType.RPAREN.value)
+SEMI = sys.intern(TokenType.SEMI.value)
+TO = sys.intern(TokenType.TO.value)
+VAR = sys.intern(TokenType.VAR.value)
+WHILE = sys.intern(TokenType.WHILE.value)
+
+# Static type of comparisons and AND/OR/NOT. There are no BOOLEAN
+# variables, conditions are the only place these values live.
+BOOLEAN = sys.intern("BOOLEAN")
+
+COMPARISON_OPERATORS = (EQUAL, NOT_EQUAL, LESS_THAN, LESS_EQUAL, GREATER_THAN, GREATER_EQUAL)
+
+# Bumped whenever parsed or compiled program formats change; part of the
+# cache key so stale cached programs are never loaded
+INTERPRETER_VERSION = "4"
+
+# Value of a variable slot that has not been assigned yet
+UNDEFINED = object()
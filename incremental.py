@@ -0,0 +1,349 @@
+##############################
+#                            #
+#    INCREMENTAL REPARSING   #
+#                            #
+##############################
+from bisect import bisect_left, bisect_right
+
+from ast_ import Block, Compound, For, Program, ProcedureDecl, While
+from lexer import scan_spans, text_location
+from main import SemanticAnalyzer
+from parser import Parser
+
+
+class SpanParser(Parser):
+    """Parser over a token list starting at token index `start` that
+    records the [first, end) token span of every statement, Compound,
+    Block and ProcedureDecl it builds into spans"""
+
+    def __init__(self, tokens, start, spans, starts=None, location=None) -> None:
+        self.index = start
+        self.spans = spans
+        # token start offsets, the tokens themselves carry none
+        self.starts = starts
+        super().__init__((tokens[i] for i in range(start, len(tokens))), location=location)
+
+    def offset(self):
+        return None if self.starts is None else self.starts[self.index]
+
+    def eat(self, token_type):
+        super().eat(token_type)
+        self.index += 1
+
+    def _recorded(self, build):
+        first = self.index
+        node = build()
+        self.spans[node] = (first, self.index)
+        return node
+
+    def program(self):
+        return self._recorded(super().program)
+
+    def node_start(self):
+        return self.index
+
+    def node_end(self, node, first):
+        self.spans[node] = (first, self.index)
+        return node
+
+    def compound_statement(self):
+        return self._recorded(super().compound_statement)
+
+    def statement(self):
+        return self._recorded(super().statement)
+
+
+def child_containers(node):
+    """(field, index, child) for the children of node that have spans"""
+    kind = type(node)
+    if kind is Program:
+        return [("block", None, node.block)]
+    if kind is Block:
+        children = [
+            ("declarations", index, declaration)
+            for index, declaration in enumerate(node.declarations)
+            if type(declaration) is ProcedureDecl
+        ]
+        children.append(("compound_statement", None, node.compound_statement))
+        return children
+    if kind is ProcedureDecl:
+        return [("block_node", None, node.block_node)]
+    if kind is Compound:
+        return [("children", index, child) for index, child in enumerate(node.children)]
+    if kind is While or kind is For:
+        return [("body", None, node.body)]
+    return []
+
+
+def subtree_containers(node):
+    """node and every container below it, without recursion"""
+    todo = [node]
+    while todo:
+        item = todo.pop()
+        yield item
+        todo.extend(child for _, _, child in child_containers(item))
+
+
+class IncrementalParser:
+    """Keep a parsed program up to date while its source is edited.
+
+    edit(start, end, replacement) replaces text[start:end]. Only the
+    tokens around the edit are lexed again: scanning restarts at the
+    token touching the edit and stops as soon as a token lands on the
+    shifted start of an old token behind the edit. The changed tokens
+    are then re-parsed as the innermost statement, Compound, Block or
+    ProcedureDecl that contains them and still parses to exactly its
+    new span; every other subtree is kept as it was. Token offsets and
+    spans behind the edit are shifted in one pass over plain ints.
+
+    analyze() brings the semantic results up to date: re-parsed
+    statements are re-analysed in their existing scope, from the
+    outermost enclosing FOR loop so its loop variables are known, a
+    re-parsed procedure gets a fresh scope, and only a change to the
+    program's own declarations re-analyses everything. A re-analysed procedure keeps
+    its ProcedureSymbol, refreshed in place, so calls to it elsewhere
+    stay bound; if its name or parameters changed, the scope declaring
+    it is re-analysed instead, re-checking those calls.
+    """
+
+    def __init__(self, text) -> None:
+        self.reparsed = 0
+        self._parse_all(text)
+
+    def _parse_all(self, text):
+        self.text = text
+        self.tokens = []
+        self.starts = []
+        self.ends = []
+        for token, start, end in scan_spans(text):
+            self.tokens.append(token)
+            self.starts.append(start)
+            self.ends.append(end)
+        self.spans = {}
+        self.parents = {}
+        self._analyze_all = True
+        self._dirty = {}
+        # stays None until the text parses again
+        self.tree = None
+        self.tree = SpanParser(self.tokens, 0, self.spans, self.starts, self.location).parse()
+        self._link(self.tree)
+
+    def location(self, pos):
+        """Return the 1-based (line, column) of an offset in the text"""
+        return text_location(self.text, pos)
+
+    def _link(self, node):
+        for item in subtree_containers(node):
+            for field, index, child in child_containers(item):
+                self.parents[child] = (item, field, index)
+
+    def _unlink(self, node):
+        for item in subtree_containers(node):
+            self.spans.pop(item, None)
+            self.parents.pop(item, None)
+
+    # Lexing
+
+    def _relex(self, start, end, replacement):
+        """Lex the new text around the edit. Returns the old token range
+        [first, stop) that changed and the (token, start, end) triples
+        replacing it."""
+        text = self.text[:start] + replacement + self.text[end:]
+        delta = len(replacement) - (end - start)
+        tokens, starts, ends = self.tokens, self.starts, self.ends
+        # first token ending at or after the edit, it may grow into it
+        first = bisect_left(ends, start)
+        scan_from = ends[first - 1] if first else 0
+        new = []
+        stop = len(tokens)
+        for token, token_start, token_end in scan_spans(text, scan_from):
+            old_start = token_start - delta
+            if old_start >= end:
+                index = bisect_left(starts, old_start)
+                if index < len(starts) and starts[index] == old_start:
+                    stop = index
+                    break
+            new.append((token, token_start, token_end))
+        # drop unchanged tokens at both ends of the range
+        head = 0
+        while (
+            head < len(new) and first + head < stop
+            and same_token(tokens[first + head], new[head][0])
+            and starts[first + head] == new[head][1]
+        ):
+            head += 1
+        tail = 0
+        while (
+            tail < len(new) - head and stop - tail > first + head
+            and same_token(tokens[stop - tail - 1], new[-tail - 1][0])
+            and starts[stop - tail - 1] + delta == new[-tail - 1][1]
+        ):
+            tail += 1
+        return text, delta, first + head, stop - tail, new[head:len(new) - tail]
+
+    # Editing
+
+    def edit(self, start, end, replacement):
+        """Replace text[start:end] with replacement. Returns the node
+        that was re-parsed, or None if no token changed."""
+        text, delta, first, stop, new = self._relex(start, end, replacement)
+        self.text = text
+        added = len(new) - (stop - first)
+        self.tokens[first:stop] = [token for token, _, _ in new]
+        self.starts[first:stop] = [token_start for _, token_start, _ in new]
+        self.ends[first:stop] = [token_end for _, _, token_end in new]
+        behind = first + len(new)
+        if delta:
+            starts, ends = self.starts, self.ends
+            for index in range(behind, len(starts)):
+                starts[index] += delta
+                ends[index] += delta
+        if self.tree is None:
+            self._parse_all(text)
+            self.reparsed += 1
+            return self.tree
+        if first == stop and not new:
+            return None
+
+        path = self._path(first, stop)
+        for node in reversed(path):
+            if type(node) is Program:
+                self._parse_all(text)
+                self.reparsed += 1
+                return self.tree
+            node_first, node_end = self.spans[node]
+            spans = {}
+            parser = SpanParser(self.tokens, node_first, spans, self.starts, self.location)
+            try:
+                replacement_node = self._reparse(parser, node)
+            except Exception:
+                continue
+            if parser.index == node_end + added:
+                break
+        self._replace(node, replacement_node, spans, path, stop, added)
+        self.reparsed += 1
+        return replacement_node
+
+    def _path(self, first, stop):
+        """Containers from the root down to the innermost one whose span
+        covers the old token range [first, stop)"""
+        spans = self.spans
+        node = self.tree
+        path = [node]
+        while True:
+            children = child_containers(node)
+            if type(node) is Compound and children:
+                # statements are in source order, bisect on their spans
+                at = bisect_right(children, first, key=lambda child: spans[child[2]][0])
+                children = children[max(at - 2, 0):at]
+            for _, _, child in children:
+                child_first, child_end = spans[child]
+                if child_first <= first and stop <= child_end:
+                    node = child
+                    path.append(node)
+                    break
+            else:
+                return path
+
+    def _reparse(self, parser, node):
+        kind = type(node)
+        if kind is Block:
+            return parser.block()
+        if kind is ProcedureDecl:
+            return parser.procedure_declaration()
+        if kind is Compound and self.parents[node][1] != "children":
+            return parser.compound_statement()
+        return parser.statement()
+
+    def _replace(self, old, new, new_spans, path, stop, added):
+        parent, field, index = self.parents[old]
+        self._unlink(old)
+        # shift the spans behind the edit and widen the enclosing nodes
+        if added:
+            spans = self.spans
+            enclosing = path[:path.index(old)]
+            for node in enclosing:
+                node_first, node_end = spans.pop(node)
+                spans[node] = (node_first, node_end + added)
+            for node, (node_first, node_end) in spans.items():
+                if node_first >= stop and node not in enclosing:
+                    spans[node] = (node_first + added, node_end + added)
+        self.spans.update(new_spans)
+        self.parents[new] = (parent, field, index)
+        self._link(new)
+        if index is None:
+            setattr(parent, field, new)
+        else:
+            getattr(parent, field)[index] = new
+        self._mark_dirty(new, parent, old)
+
+    # Semantic analysis
+
+    def _scope_owner(self, node):
+        while type(node) not in (Program, ProcedureDecl):
+            node = self.parents[node][0]
+        return node
+
+    def _mark_scope_dirty(self, owner):
+        if type(owner) is Program:
+            self._analyze_all = True
+        else:
+            self._dirty[owner] = self._scope_owner(self.parents[owner][0])
+
+    def _mark_dirty(self, node, parent, old):
+        if type(node) is Block:
+            self._mark_scope_dirty(self._scope_owner(parent))
+        elif type(node) is ProcedureDecl and signature(node) != signature(old):
+            self._mark_scope_dirty(self._scope_owner(parent))
+        else:
+            # the loop variables of enclosing FOR loops are only known
+            # when the outermost one is analysed
+            loop = parent
+            while type(loop) not in (Program, ProcedureDecl):
+                if type(loop) is For:
+                    node = loop
+                loop = self.parents[loop][0]
+            self._dirty[node] = loop
+
+    def analyze(self):
+        """Re-run semantic analysis where edits invalidated it and return
+        the tree"""
+        if self._analyze_all:
+            SemanticAnalyzer().visit(self.tree)
+            self._analyze_all = False
+            self._dirty.clear()
+            return self.tree
+        # procedures first, their statements are analysed with them
+        dirty = sorted(self._dirty.items(), key=lambda item: type(item[0]) is not ProcedureDecl)
+        done = set()
+        for node, owner in dirty:
+            if node not in self.spans or owner in done:
+                continue
+            analyzer = SemanticAnalyzer()
+            if type(node) is ProcedureDecl:
+                # declared again by the visit, which would otherwise
+                # take it for a duplicate
+                old_symbol = owner.scope._symbols.pop(node.proc_name, None)
+            analyzer.symtab.reopen_scope(owner.scope)
+            analyzer.visit(node)
+            if type(node) is ProcedureDecl:
+                done.add(node)
+                if old_symbol is not None:
+                    new_symbol = owner.scope._symbols[node.proc_name]
+                    old_symbol.params = new_symbol.params
+                    old_symbol.scope = new_symbol.scope
+                    old_symbol.block_ast = new_symbol.block_ast
+                    owner.scope._symbols[node.proc_name] = old_symbol
+        self._dirty.clear()
+        return self.tree
+
+
+def signature(node):
+    """Name and parameters of a ProcedureDecl, None for other nodes"""
+    if type(node) is not ProcedureDecl:
+        return None
+    return node.proc_name, [(param.var_node.value, param.type_node.value) for param in node.params]
+
+
+def same_token(left, right):
+    return left.type == right.type and left.value == right.value
@@ -3,29 +3,63 @@
 #         LEXER              #
 #                            #
 ##############################
-from constants import TokenType
+import mmap
+import os
+import re
+from bisect import bisect_left
+
+from constants import *
 from tokenizer import Token
+from tracing import TRACE, LEX
+
+NEWLINE = re.compile("\n")
+NEWLINE_BYTES = re.compile(b"\n")
 
 RESERVED_KEYWORDS = {
-    "PROGRAM": Token(TokenType.PROGRAM.value, "PROGRAM"),
-    "VAR": Token(TokenType.VAR.value, "VAR"),
-    "DIV": Token(TokenType.INTEGER_DIV.value, "DIV"),
-    "INTEGER": Token(TokenType.INTEGER.value, "INTEGER"),
-    "REAL": Token(TokenType.REAL.value, "REAL"),
-    "BEGIN": Token(TokenType.BEGIN.value, "BEGIN"),
-    "END": Token(TokenType.END.value, "END"),
-    "PROCEDURE": Token(TokenType.PROCEDURE.value, "PROCEDURE")
+    "PROGRAM": Token(PROGRAM, "PROGRAM"),
+    "VAR": Token(VAR, "VAR"),
+    "DIV": Token(INTEGER_DIV, "DIV"),
+    "INTEGER": Token(INTEGER, "INTEGER"),
+    "REAL": Token(REAL, "REAL"),
+    "BEGIN": Token(BEGIN, "BEGIN"),
+    "END": Token(END, "END"),
+    "PROCEDURE": Token(PROCEDURE, "PROCEDURE"),
+    "WHILE": Token(WHILE, "WHILE"),
+    "DO": Token(DO, "DO"),
+    "FOR": Token(FOR, "FOR"),
+    "TO": Token(TO, "TO"),
+    "DOWNTO": Token(DOWNTO, "DOWNTO"),
+    "AND": Token(AND, "AND"),
+    "OR": Token(OR, "OR"),
+    "NOT": Token(NOT, "NOT"),
 }
 
 
+def text_location(text, pos):
+    """Return the 1-based (line, column) of offset pos in text"""
+    return text.count("\n", 0, pos) + 1, pos - text.rfind("\n", 0, pos)
+
+
 class Lexer:
     def __init__(self, text) -> None:
         self.text = text
         self.pos = 0
+        # start of the token being scanned, and so of the last one returned
+        self.mark = 0
         self.current_char = self.text[self.pos]
 
+    def location(self, pos=None):
+        """Return the 1-based (line, column) of an offset, by default the
+        current character's"""
+        return text_location(self.text, self.pos if pos is None else pos)
+
+    def offset_of(self, mark):
+        """Source offset of a mark, see tokenizer.TokenStream"""
+        return mark
+
     def error(self):
-        raise Exception("Invalid character!!!!")
+        line, column = self.location()
+        raise Exception(f"Invalid character at line {line}, column {column}")
 
     def peek(self):
         peek_pos = self.pos + 1
@@ -64,10 +98,10 @@ class Lexer:
             while self.current_char is not None and self.current_char.isdigit():
                 result += self.current_char
                 self.advance()
-            token = Token("REAL_CONST", float(result))
+            token = Token(REAL_CONST, float(result))
 
         else:
-            token = Token("INTEGER_CONST", int(result))
+            token = Token(INTEGER_CONST, int(result))
 
         return token
 
@@ -77,9 +111,17 @@ class Lexer:
             result += self.current_char
             self.advance()
 
-        token = RESERVED_KEYWORDS.get(result.upper(), Token(TokenType.ID.value, result))
+        token = RESERVED_KEYWORDS.get(result.upper(), Token(ID, result))
         return token
 
+    def __iter__(self):
+        """Yield tokens up to and including EOF"""
+        while True:
+            token = self.get_next_token()
+            yield token
+            if token.type == EOF:
+                return
+
     def get_next_token(self):
         while self.current_char is not None:
             if self.current_char.isspace():
@@ -91,6 +133,7 @@ class Lexer:
                 self.skip_comment()
                 continue
 
+            self.mark = self.pos
             if self.current_char.isalpha():
                 return self._id()
 
@@ -99,53 +142,366 @@ class Lexer:
 
             if self.current_char == ",":
                 self.advance()
-                return Token(TokenType.COMMA.value, ",")
+                return Token(COMMA, ",")
             
             if self.current_char == ":" and self.peek() == "=":
                 self.advance()
                 self.advance()
-                return Token(TokenType.ASSIGN.value, ":=")
+                return Token(ASSIGN, ":=")
             
             if self.current_char == ":":
                 self.advance()
-                return Token(TokenType.COLON.value, ":")
+                return Token(COLON, ":")
             
             if self.current_char == ";":
                 self.advance()
-                return Token(TokenType.SEMI.value, ";")
+                return Token(SEMI, ";")
             
             if self.current_char == ".":
                 self.advance()
-                return Token(TokenType.DOT.value, ".")
+                return Token(DOT, ".")
             
             if self.current_char.isdigit():
-                return Token(TokenType.INTEGER.value, self.integer())
+                return Token(INTEGER, self.integer())
             
             if self.current_char == "+":
                 self.advance()
-                return Token(TokenType.PLUS.value, "+")
+                return Token(PLUS, "+")
             
             if self.current_char == "-":
                 self.advance()
-                return Token(TokenType.MINUS.value, "-")
+                return Token(MINUS, "-")
             
             if self.current_char == "/":
                 self.advance()
-                return Token(TokenType.FLOAT_DIV.value, "/")
+                return Token(FLOAT_DIV, "/")
             
             if self.current_char == "*":
                 self.advance()
-                return Token(TokenType.MULTIPLY.value, "*")
+                return Token(MULTIPLY, "*")
             
             if self.current_char == "(":
                 self.advance()
-                return Token(TokenType.LPAREN.value, "(")
+                return Token(LPAREN, "(")
             
             if self.current_char == ")":
                 self.advance()
-                return Token(TokenType.RPAREN.value, ")")
+                return Token(RPAREN, ")")
+
+            if self.current_char == "=":
+                self.advance()
+                return Token(EQUAL, "=")
+
+            if self.current_char == "<" and self.peek() == ">":
+                self.advance()
+                self.advance()
+                return Token(NOT_EQUAL, "<>")
+
+            if self.current_char == "<" and self.peek() == "=":
+                self.advance()
+                self.advance()
+                return Token(LESS_EQUAL, "<=")
+
+            if self.current_char == "<":
+                self.advance()
+                return Token(LESS_THAN, "<")
+
+            if self.current_char == ">" and self.peek() == "=":
+                self.advance()
+                self.advance()
+                return Token(GREATER_EQUAL, ">=")
+
+            if self.current_char == ">":
+                self.advance()
+                return Token(GREATER_THAN, ">")
 
             self.error()
-        print(f"Current char ({self.current_char})")
-        return Token(TokenType.EOF.value, None)
+        if TRACE.lex:
+            TRACE.emit(LEX, "Current char (%s)", self.current_char)
+        self.mark = self.pos
+        return Token(EOF, None)
+
+
+
+# Master pattern for BufferLexer. Leading whitespace and comments are
+# consumed by the same match as the token that follows them; any other
+# character lands in the "error" group and the final empty match is EOF.
+MASTER_PATTERN = re.compile(
+    r"(?:\s+|\{[^}]*\})*"
+    r"(?:(?P<id>[^\W\d_][^\W_]*)"
+    r"|(?P<real>\d+\.\d*)"
+    r"|(?P<integer>\d+)"
+    r"|(?P<symbol>:=|<>|<=|>=|[:,;.+\-/*()=<>])"
+    r"|(?P<error>.)"
+    r"|$)",
+    re.DOTALL,
+)
+
+
+def match_offset(mark):
+    """Offset of the token a master pattern match ends with, past the
+    whitespace and comments before it. Marks that are ints already are
+    offsets."""
+    if type(mark) is int:
+        return mark
+    return mark.start(mark.lastindex) if mark.lastindex else mark.end()
+
+
+# Punctuation tokens carry no per-occurrence data, so one instance is shared
+SYMBOL_TOKENS = {
+    ":=": Token(ASSIGN, ":="),
+    ":": Token(COLON, ":"),
+    ",": Token(COMMA, ","),
+    ";": Token(SEMI, ";"),
+    ".": Token(DOT, "."),
+    "+": Token(PLUS, "+"),
+    "-": Token(MINUS, "-"),
+    "/": Token(FLOAT_DIV, "/"),
+    "*": Token(MULTIPLY, "*"),
+    "(": Token(LPAREN, "("),
+    ")": Token(RPAREN, ")"),
+    "=": Token(EQUAL, "="),
+    "<>": Token(NOT_EQUAL, "<>"),
+    "<": Token(LESS_THAN, "<"),
+    "<=": Token(LESS_EQUAL, "<="),
+    ">": Token(GREATER_THAN, ">"),
+    ">=": Token(GREATER_EQUAL, ">="),
+}
+
+
+class BufferLexer:
+    """Drop-in replacement for Lexer that scans the source buffer with one
+    compiled regex per token instead of advancing character by character.
+
+    It produces the same Token stream as Lexer.get_next_token. The source
+    is either a string or a text file object; file objects are read in
+    chunks of chunk_size characters and only the unconsumed tail of the
+    current chunk is kept in memory.
+
+    The mark of a token (see tokenizer.TokenStream) is its regex match,
+    and only turned into an offset by offset_of() when a position is
+    needed. Lines are not counted while scanning either: location()
+    counts them when an error is reported, in the text or, for files,
+    in the newline offsets noted as chunks are read.
+    """
+
+    def __init__(self, source, chunk_size=1 << 16) -> None:
+        if hasattr(source, "read"):
+            self.text = None
+            self._file = source
+        else:
+            self.text = source
+            self._file = None
+        self.chunk_size = chunk_size
+        # characters read from the file so far and the offsets of their newlines
+        self._read_size = 0
+        self._newlines = []
+        self.mark = 0
+        self._tokens = self._scan()
+
+    def location(self, pos):
+        """Return the 1-based (line, column) of an offset"""
+        if self.text is not None:
+            return text_location(self.text, pos)
+        line = bisect_left(self._newlines, pos)
+        return line + 1, pos - (self._newlines[line - 1] if line else -1)
+
+    def error(self, pos):
+        line, column = self.location(pos)
+        raise Exception(f"Invalid character at line {line}, column {column}")
+
+    def offset_of(self, mark):
+        """Source offset of a mark, see tokenizer.TokenStream"""
+        return match_offset(mark)
+
+    def __iter__(self):
+        return self._tokens
+
+    def get_next_token(self):
+        token = next(self._tokens, None)
+        if token is None:
+            return Token(EOF, None)
+        return token
+
+    def _read(self):
+        chunk = self._file.read(self.chunk_size)
+        base = self._read_size
+        self._newlines.extend(base + m.start() for m in NEWLINE.finditer(chunk))
+        self._read_size += len(chunk)
+        return chunk, not chunk
+
+    def _scan(self):
+        keyword = RESERVED_KEYWORDS.get
+        symbol_token = SYMBOL_TOKENS.__getitem__
+        match = MASTER_PATTERN.match
+        if self._file is None:
+            buf, eof = self.text, True
+        else:
+            buf, eof = self._read()
+        pos = 0
+        # source offset of buf[0]
+        base = 0
+        while True:
+            m = match(buf, pos)
+            _id, real, integer, symbol, error = m.groups()
+            # A token touching the end of the buffer (or an unclosed
+            # comment) may continue in the next chunk: refill and rescan
+            if not eof and (m.end() == len(buf) or (error == "{")):
+                chunk, eof = self._read()
+                buf = buf[pos:] + chunk
+                base += pos
+                pos = 0
+                continue
+            pos = m.end()
+            # a match only gives offsets into buf, which starts at the
+            # source's start until the first refill
+            self.mark = base + match_offset(m) if base else m
+            if _id is not None:
+                yield keyword(_id.upper()) or Token(ID, _id)
+            elif symbol is not None:
+                yield symbol_token(symbol)
+            elif integer is not None:
+                yield Token(INTEGER_CONST, int(integer))
+            elif real is not None:
+                yield Token(REAL_CONST, float(real))
+            elif error is not None:
+                self.error(base + match_offset(m))
+            else:
+                yield Token(EOF, None)
+                return
+
+
+def scan_spans(text, pos=0):
+    """Yield (token, start, end) for the tokens of text from offset pos
+    on, ending with EOF. start and end are the offsets of the token
+    itself, without the whitespace and comments skipped before it."""
+    keyword = RESERVED_KEYWORDS.get
+    symbol_token = SYMBOL_TOKENS.__getitem__
+    for m in MASTER_PATTERN.finditer(text, pos):
+        _id, real, integer, symbol, error = m.groups()
+        start = match_offset(m)
+        if _id is not None:
+            yield keyword(_id.upper()) or Token(ID, _id), start, m.end()
+        elif symbol is not None:
+            yield symbol_token(symbol), start, m.end()
+        elif integer is not None:
+            yield Token(INTEGER_CONST, int(integer)), start, m.end()
+        elif real is not None:
+            yield Token(REAL_CONST, float(real)), start, m.end()
+        elif error is not None:
+            line, column = text_location(text, start)
+            raise Exception(f"Invalid character at line {line}, column {column}")
+        else:
+            break
+    yield Token(EOF, None), len(text), len(text)
+
+
+# Bytes flavour of MASTER_PATTERN for MappedLexer. Bytes with the high bit
+# set are accepted inside identifiers so UTF-8 encoded names survive.
+MASTER_BYTES_PATTERN = re.compile(
+    rb"(?:\s+|\{[^}]*\})*"
+    rb"(?:(?P<id>[A-Za-z\x80-\xff][A-Za-z0-9\x80-\xff]*)"
+    rb"|(?P<real>[0-9]+\.[0-9]*)"
+    rb"|(?P<integer>[0-9]+)"
+    rb"|(?P<symbol>:=|<>|<=|>=|[:,;.+\-/*()=<>])"
+    rb"|(?P<error>.)"
+    rb"|$)",
+    re.DOTALL,
+)
+
+RESERVED_KEYWORDS_BYTES = {name.encode(): token for name, token in RESERVED_KEYWORDS.items()}
+
+SYMBOL_TOKENS_BYTES = {symbol.encode(): token for symbol, token in SYMBOL_TOKENS.items()}
+
+
+class MappedLexer:
+    """Lexer that tokenizes bytes in place instead of a decoded str.
+
+    The source is a file path, which is memory-mapped read-only, or any
+    bytes-like object (bytes, mmap, memoryview). Identifiers and numbers
+    are decoded only when their Token is emitted. Line and column numbers
+    are derived from the byte offset on demand, so tracking them costs
+    nothing until an error is reported.
+    """
+
+    def __init__(self, source) -> None:
+        self._file = None
+        self._mmap = None
+        if isinstance(source, (str, os.PathLike)):
+            self._file = open(source, "rb")
+            try:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty files cannot be mapped
+                self._mmap = None
+            self.buffer = self._mmap if self._mmap is not None else b""
+        else:
+            self.buffer = source
+        # mark of the last token returned, see tokenizer.TokenStream
+        self.mark = 0
+        self._tokens = self._scan()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._tokens.close()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def location(self, pos=None):
+        """Return the 1-based (line, column) of a byte offset"""
+        if pos is None:
+            pos = match_offset(self.mark)
+        # mmap and memoryview have no count(), but the regex engine
+        # takes any buffer
+        line, last = 1, -1
+        for match in NEWLINE_BYTES.finditer(self.buffer, 0, pos):
+            line += 1
+            last = match.start()
+        return line, pos - last
+
+    def error(self):
+        line, column = self.location()
+        raise Exception(f"Invalid character at line {line}, column {column}")
+
+    def offset_of(self, mark):
+        """Byte offset of a mark, see tokenizer.TokenStream"""
+        return match_offset(mark)
+
+    def __iter__(self):
+        return self._tokens
+
+    def get_next_token(self):
+        token = next(self._tokens, None)
+        if token is None:
+            return Token(EOF, None)
+        return token
 
+    def _scan(self):
+        keyword = RESERVED_KEYWORDS_BYTES.get
+        symbol_token = SYMBOL_TOKENS_BYTES.__getitem__
+        for match in MASTER_BYTES_PATTERN.finditer(self.buffer):
+            _id, real, integer, symbol, error = match.groups()
+            self.mark = match
+            if _id is not None:
+                yield keyword(_id.upper()) or Token(ID, _id.decode())
+            elif symbol is not None:
+                yield symbol_token(symbol)
+            elif integer is not None:
+                yield Token(INTEGER_CONST, int(integer))
+            elif real is not None:
+                yield Token(REAL_CONST, float(real))
+            elif error is not None:
+                self.error()
+            else:
+                break
+        self.mark = len(self.buffer)
+        yield Token(EOF, None)
@@ -1,8 +1,13 @@
-from constants import TokenType
+from constants import *
 from ast_ import *
+from callstack import ActivationRecord, CallStack
 from lexer import Lexer
 from parser import Parser
-from symbol import ScopedSymbolTable, VarSymbol, ProcedureSymbol
+from optimizer import ConstantFolder
+from symbol import SymbolTable, VarSymbol, ProcedureSymbol
+from tokenizer import Token, TokenReplay
+from tracing import TRACE, SEMANTIC, EXECUTE
+from visitor import NodeVisitor
 
 ##############################
 #                            #
@@ -11,151 +16,582 @@ from symbol import ScopedSymbolTable, VarSymbol, ProcedureSymbol
 ##############################
 
 
-class NodeVisitor:
+# Work item of Interpreter.evaluate: negate the value on top of the stack
+NEGATE = object()
+# Work items for the boolean operators. AND_THEN/OR_ELSE sit between the
+# two operands of AND/OR and drop the queued right operand unevaluated
+# when the left one already decides the result.
+LOGICAL_NOT = object()
+AND_THEN = object()
+OR_ELSE = object()
+
+# Typed operations queued by Interpreter.evaluate, chosen by the static
+# result type the SemanticAnalyzer gave a BinOp. The INTEGER branches
+# are separate from the REAL ones so their arithmetic only ever sees
+# ints. DIV only exists for INTEGER and '/' only for REAL, so
+# integer division always yields an int and '/' always a float.
+INT_ADD, INT_SUB, INT_MUL, INT_DIV, REAL_ADD, REAL_SUB, REAL_MUL, REAL_DIV = range(8)
+INTEGER_OPERATIONS = {PLUS: INT_ADD, MINUS: INT_SUB, MULTIPLY: INT_MUL, INTEGER_DIV: INT_DIV}
+REAL_OPERATIONS = {PLUS: REAL_ADD, MINUS: REAL_SUB, MULTIPLY: REAL_MUL, FLOAT_DIV: REAL_DIV}
+# Comparisons of BOOLEAN BinOps, the same for INTEGER and REAL operands
+EQ, NE, LT, LE, GT, GE = range(8, 14)
+COMPARISON_OPERATIONS = {
+    EQUAL: EQ, NOT_EQUAL: NE, LESS_THAN: LT, LESS_EQUAL: LE, GREATER_THAN: GT, GREATER_EQUAL: GE,
+}
+
+# Nodes Interpreter.evaluate runs itself instead of dispatching them
+EVALUATED_NODES = frozenset((BinOp, UnaryOp, Num, Var, Hoisted))
+
+
+def binary_result_type(op, left, right):
+    """Static type of `left op right`: AND/OR take and comparisons give
+    BOOLEAN, arithmetic takes INTEGER or REAL. '/' is always REAL, DIV
+    only takes INTEGER operands, everything else is REAL as soon as one
+    side is"""
+    if op == AND or op == OR:
+        if left != BOOLEAN or right != BOOLEAN:
+            raise Exception(f"Error: {op} requires BOOLEAN operands")
+        return BOOLEAN
+    if left == BOOLEAN or right == BOOLEAN:
+        raise Exception(f"Error: {op} requires INTEGER or REAL operands, got BOOLEAN")
+    if op in COMPARISON_OPERATORS:
+        return BOOLEAN
+    if op == FLOAT_DIV:
+        return REAL
+    if op == INTEGER_DIV:
+        if left != INTEGER or right != INTEGER:
+            raise Exception("Error: DIV requires INTEGER operands")
+        return INTEGER
+    if left == INTEGER and right == INTEGER:
+        return INTEGER
+    return REAL
+
+
+def unary_result_type(op, operand):
+    """Static type of `op operand`: NOT takes BOOLEAN, +/- INTEGER or REAL"""
+    if (op == NOT) != (operand == BOOLEAN):
+        raise Exception(f"Error: Incompatible operand type {operand} for {op}")
+    return operand
+
+
+class LeaveScope:
+    """Work item queued behind a scope's children so the SemanticAnalyzer
+    closes the scope once they have all been processed"""
+
+    __slots__ = ("node",)
+
+    def __init__(self, node) -> None:
+        self.node = node
+
+
+class LeaveLoop:
+    """Work item queued behind a FOR loop's body so the SemanticAnalyzer
+    releases the loop variable once the body has been processed"""
+
+    __slots__ = ("symbol",)
+
+    def __init__(self, symbol) -> None:
+        self.symbol = symbol
 
-    def visit(self, node):
-        method_name = "visit_" + type(node).__name__
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node)
 
-    def generic_visit(self, node):
-        raise Exception(f"No visit_{type(node).__name__} method")
+class SemanticAnalyzer(NodeVisitor):
+    """Resolve names and check declarations without recursion.
 
+    visit(tree) drives an explicit work stack: each visit_* method handles
+    one node and pushes its children instead of visiting them, so deeply
+    nested procedures and expressions never touch the Python recursion
+    limit. Names are resolved through symbol.SymbolTable in O(1).
+    """
 
-class SemanticAnalyzer(NodeVisitor):
     def __init__(self) -> None:
-        self.current_scope = None
-
-        def visit_Block(self, node):
-            for declaration in node.declarations:
-                self.visit(declaration)
-            self.visit(node.compound_statement)
-
-        def visit_Program(self, node):
-            print("ENTER scope: global")
-            global_scope = ScopedSymbolTable(scope_name="global", scope_level=1, enclosing_scpe=self.current_scope)
-            self.current_scope = global_scope
-            self.visit(node.block)
-            print(global_scope)
-            self.current_scope = self.current_scope.enclosing_scope
-            print("LEAVE scope: global")
-
-        def visit_BinOp(self, node):
-            self.visit(node.left)
-            self.visit(node.right)
-
-        def visit_Num(self, node):
-            pass
-
-        def visit_UnaryOp(self, node):
-            self.visit(node.expr)
-
-        def visit_Compound(self, node):
-            for child in self.children:
-                self.visit(child)
-
-        def visit_NoOp(self, node):
-            pass
-
-        def visit_VarDecl(self, node):
-            type_name = node.type_node.value
-            type_symbol = self.current_scope.lookup(type_name)
-            var_name = node.var_node.value
-            var_symbol = VarSymbol(var_name, type_symbol)
-            if self.symtab.lookup(var_name) is not None:
-                raise Exception(f"Error: Duplicate identifier {var_name} found")
-            self.current_scope.insert(var_symbol)
-
-        def visit_Assign(self, node):
-            self.visit(node.right)
-            self.visit(node.left)
-
-        def visit_Var(self, node):
-            var_name = node.value
-            var_symbol = self.current_scope.lookup(var_name)
-            if var_symbol is None:
-                raise NameError(repr(var_name))
-
-        def visit_ProcedureDecl(self, node):
-            proc_name = node.proc_name
-            proc_symbol = ProcedureSymbol(proc_name)
-            self.current_scope.insert(proc_symbol)
-            print(f"ENTER scope: {proc_name}")
-
-            procedure_scope = ScopedSymbolTable(proc_name, self.current_scope.scope_level+1, self.current_scope    )
-            self.current_scope = procedure_scope
-
-            for param in node.params:
-                param_type = self.current_scope.lookup(param.type_node.value)
-                param_name = param.var_node.value
-                var_symbol = VarSymbol(param_name, param_type)
-                self.current_scope.insert(var_symbol)
-                proc_symbol.params.append(var_symbol)
-            
-            self.visit(node.block_node)
-            print(procedure_scope)
-            self.current_scope = self.current_scope.enclosing_scope
-            print(f"LEAVE scope: {proc_name}")
+        self.symtab = SymbolTable()
+        self._pending = []
+        # VarSymbols of the FOR loops being analysed, they can't be assigned
+        self._loop_variables = set()
+
+    @property
+    def current_scope(self):
+        return self.symtab.current_scope
+
+    def visit(self, node):
+        pending = self._pending
+        base = len(pending)
+        pending.append(node)
+        dispatch = NodeVisitor.visit
+        while len(pending) > base:
+            dispatch(self, pending.pop())
+
+    def push(self, *nodes):
+        """Queue nodes so they are processed in the given order"""
+        self._pending.extend(reversed(nodes))
+
+    def visit_LeaveScope(self, item):
+        scope = self.symtab.leave_scope()
+        item.node.scope = scope
+        if TRACE.semantic:
+            TRACE.emit(SEMANTIC, "%s", scope)
+            TRACE.emit(SEMANTIC, "LEAVE scope: %s", scope.scope_name)
+
+    def visit_Program(self, node):
+        if TRACE.semantic:
+            TRACE.emit(SEMANTIC, "ENTER scope: global")
+        self.symtab.enter_scope("global")
+        self.push(node.block, LeaveScope(node))
+
+    def visit_Block(self, node):
+        self.push(*node.declarations, node.compound_statement)
+
+    def visit_BinOp(self, node):
+        self.check_expression(node)
+
+    def visit_Num(self, node):
+        pass
+
+    def visit_UnaryOp(self, node):
+        self.check_expression(node)
+
+    def visit_Compound(self, node):
+        self.push(*node.children)
+
+    def visit_NoOp(self, node):
+        pass
+
+    def visit_VarDecl(self, node):
+        type_name = node.type_node.value
+        type_symbol = self.symtab.lookup(type_name)
+        var_name = node.var_node.value
+        var_symbol = VarSymbol(var_name, type_symbol)
+        if self.symtab.lookup(var_name, current_scope_only=True) is not None:
+            raise Exception(f"Error: Duplicate identifier {var_name} found")
+        self.symtab.insert(var_symbol)
+
+    def visit_Assign(self, node):
+        value_type = self.check_expression(node.right)
+        self.visit_Var(node.left)
+        if node.left.symbol in self._loop_variables:
+            raise Exception(f"Error: Illegal assignment to FOR loop variable {node.left.value}")
+        if value_type == BOOLEAN or (node.left.type == INTEGER and value_type == REAL):
+            raise Exception(
+                f"Error: Incompatible types in assignment to {node.left.value}: got {value_type}, expected {node.left.type}"
+            )
+
+    def visit_While(self, node):
+        if self.check_expression(node.condition) != BOOLEAN:
+            raise Exception("Error: WHILE condition must be BOOLEAN")
+        self.push(node.body)
+
+    def visit_For(self, node):
+        var = node.var
+        self.visit_Var(var)
+        if var.type != INTEGER:
+            raise Exception(f"Error: FOR loop variable {var.value} must be INTEGER")
+        if var.symbol in self._loop_variables:
+            raise Exception(f"Error: FOR loop variable {var.value} is already in use")
+        if self.check_expression(node.start) != INTEGER or self.check_expression(node.stop) != INTEGER:
+            raise Exception(f"Error: FOR loop bounds of {var.value} must be INTEGER")
+        self._loop_variables.add(var.symbol)
+        self.push(node.body, LeaveLoop(var.symbol))
+
+    def visit_LeaveLoop(self, item):
+        self._loop_variables.discard(item.symbol)
+
+    def visit_Var(self, node):
+        var_name = node.value
+        var_symbol = self.symtab.lookup(var_name)
+        if var_symbol is None:
+            raise NameError(repr(var_name))
+        if not isinstance(var_symbol, VarSymbol):
+            raise Exception(f"Error: {var_name} is not a variable")
+        node.symbol = var_symbol
+        node.type = var_symbol.type.name
+
+    def check_expression(self, node):
+        """Resolve the names of an expression and annotate every node with
+        its static type, INTEGER or REAL; returns the type of node.
+
+        Nodes are collected parent-first with an explicit stack and typed
+        in reverse, so operands are always typed before their operator.
+        """
+        order = []
+        todo = [node]
+        while todo:
+            item = todo.pop()
+            order.append(item)
+            kind = type(item)
+            if kind is BinOp:
+                todo.append(item.left)
+                todo.append(item.right)
+            elif kind is UnaryOp:
+                todo.append(item.expr)
+        for item in reversed(order):
+            kind = type(item)
+            if kind is BinOp:
+                item.type = binary_result_type(item.op.type, item.left.type, item.right.type)
+            elif kind is UnaryOp:
+                item.type = unary_result_type(item.op.type, item.expr.type)
+            elif kind is Var:
+                self.visit_Var(item)
+        return node.type
+
+    def visit_ProcedureDecl(self, node):
+        proc_name = node.proc_name
+        if self.symtab.lookup(proc_name, current_scope_only=True) is not None:
+            raise Exception(f"Error: Duplicate identifier {proc_name} found")
+        proc_symbol = ProcedureSymbol(proc_name)
+        self.symtab.insert(proc_symbol)
+        if TRACE.semantic:
+            TRACE.emit(SEMANTIC, "ENTER scope: %s", proc_name)
+        proc_symbol.scope = self.symtab.enter_scope(proc_name)
+        proc_symbol.block_ast = node.block_node
+
+        # parameters are inserted first, so they take slots 0..n-1
+        for param in node.params:
+            param_type = self.symtab.lookup(param.type_node.value)
+            param_name = param.var_node.value
+            if self.symtab.lookup(param_name, current_scope_only=True) is not None:
+                raise Exception(f"Error: Duplicate identifier {param_name} found")
+            var_symbol = VarSymbol(param_name, param_type)
+            self.symtab.insert(var_symbol)
+            proc_symbol.params.append(var_symbol)
+
+        block = node.block_node
+        if type(block) is LazyBlock:
+            # analysed by load_block on the first call, against the
+            # symbols visible here
+            block.scope = proc_symbol.scope
+            block.visible = self.symtab.visible()
+            self.push(LeaveScope(node))
+        else:
+            self.push(block, LeaveScope(node))
+
+    def visit_ProcedureCall(self, node):
+        proc_name = node.proc_name
+        proc_symbol = self.symtab.lookup(proc_name)
+        if proc_symbol is None:
+            raise NameError(repr(proc_name))
+        if not isinstance(proc_symbol, ProcedureSymbol):
+            raise Exception(f"Error: {proc_name} is not a procedure")
+        params = proc_symbol.params
+        if len(node.actual_params) != len(params):
+            raise Exception(
+                f"Error: Wrong number of arguments for {proc_name}: got {len(node.actual_params)}, expected {len(params)}"
+            )
+        for param, arg in zip(params, node.actual_params):
+            arg_type = self.check_expression(arg)
+            if arg_type == BOOLEAN or (param.type.name == INTEGER and arg_type == REAL):
+                raise Exception(
+                    f"Error: Incompatible types in argument {param.name} of {proc_name}: got {arg_type}, expected {param.type.name}"
+                )
+        node.proc_symbol = proc_symbol
+
+
+class WhileLoop:
+    """Work item of the Interpreter: a running WHILE loop, queued behind
+    each pass of its body to test the condition again"""
+
+    __slots__ = ("condition", "body")
+
+    def __init__(self, condition, body) -> None:
+        self.condition = condition
+        # the body's statements, last first, ready to be queued
+        self.body = body
+
+
+class ForLoop:
+    """Work item of the Interpreter: the counts a running FOR loop has
+    left, queued behind each pass of its body. Interpreter.visit runs
+    it inline rather than through a visit_ForLoop."""
+
+    __slots__ = ("counts", "frame", "slot", "body")
+
+    def __init__(self, counts, frame, slot, body) -> None:
+        self.counts = counts
+        self.frame = frame
+        self.slot = slot
+        self.body = body
 
 
 class Interpreter(NodeVisitor):
+    """Execute an analysed tree without recursing per statement.
+
+    visit(node) drives an explicit work stack, like the SemanticAnalyzer:
+    statements queue their children instead of visiting them, loops
+    queue a WhileLoop/ForLoop item behind each pass of their body, and a
+    procedure call queues its body followed by its ActivationRecord,
+    which leaves the call once reached. Expressions are evaluated
+    directly and visit returns their value. Deep Pascal call chains thus
+    cost list space, not Python frames, and are only bounded by
+    CallStack.max_depth.
+    """
 
     def __init__(self, parser) -> None:
         self.parser = parser
-        # SYMBOL TABLE
-        # that tracks various symbols
-        # like variable name and it's value
-        # for example, a:=3, here 'a' will be stored as key and 3 as value of the key
-        self.GLOBAL_SCOPE = {}
+        self._pending = []
+        # FRAMES
+        # variables are resolved by the SemanticAnalyzer to a fixed
+        # (scope level, slot) pair, so values live in preallocated lists
+        # indexed by slot instead of a dict keyed by the variable name.
+        # display[level] is the active frame of that scope level.
+        self.display = []
+        self.global_scope = None
+        # Activation records of the program and the running procedures;
+        # their frames are pooled and reused across calls
+        self.call_stack = CallStack()
+        # None, or a Counter that evaluate adds the type name of every
+        # expression node it evaluates to, see ProfilingInterpreter
+        self.node_visits = None
+
+    @property
+    def GLOBAL_SCOPE(self):
+        """Assigned global variables by name"""
+        if self.global_scope is None:
+            return {}
+        frame = self.display[self.global_scope.scope_level]
+        return {
+            symbol.name: frame[symbol.slot]
+            for symbol in self.global_scope.slots
+            if frame[symbol.slot] is not UNDEFINED
+        }
+
+    # Runs the visit_* method of one node or work item. Expressions are
+    # dispatched directly, they never queue work; ProfilingInterpreter
+    # wraps this to count the nodes it runs.
+    dispatch = NodeVisitor.visit
+
+    def visit(self, node):
+        pending = self._pending
+        base = len(pending)
+        dispatch = self.dispatch
+        pop = pending.pop
+        try:
+            result = dispatch(node)
+            while len(pending) > base:
+                item = pop()
+                if type(item) is ForLoop:
+                    # the next pass of a FOR loop, run inline: it is the
+                    # most frequent work item of loop-heavy programs
+                    count = next(item.counts, None)
+                    if count is not None:
+                        item.frame[item.slot] = count
+                        pending.append(item)
+                        pending.extend(item.body)
+                else:
+                    dispatch(item)
+        except BaseException:
+            self.unwind(base)
+            raise
+        return result
+
+    def unwind(self, base):
+        """Drop the work queued above base after an error, leaving the
+        procedure calls it was running innermost first"""
+        pending = self._pending
+        while len(pending) > base:
+            item = pending.pop()
+            if type(item) is ActivationRecord:
+                NodeVisitor.visit(self, item)
 
     def visit_UnaryOp(self, node):
-        op = node.op.type
-        if op == TokenType.PLUS.value:
-            return +self.visit(node.expr)
-        elif op == TokenType.MINUS.value:
-            return -self.visit(node.expr)
+        return self.evaluate(node)
 
     def visit_BinOp(self, node):
-        if node.op.type == TokenType.PLUS.value:
-            return self.visit(node.left) + self.visit(node.right)
-        elif node.op.type == TokenType.MINUS.value:
-            return self.visit(node.left) - self.visit(node.right)
-        elif node.op.type == TokenType.MULTIPLY.value:
-            return self.visit(node.left) * self.visit(node.right)
-        elif node.op.type == TokenType.INTEGER_DIV.value:
-            return self.visit(node.left) // self.visit(node.right)
-        elif node.op.type == TokenType.FLOAT_DIV.value:
-            return self.visit(node.left) / self.visti(node.right)
+        return self.evaluate(node)
+
+    def evaluate(self, node):
+        """Evaluate an expression tree with explicit stacks.
+
+        BinOp/UnaryOp nodes are expanded in place: the operator is queued
+        behind its operands and applied once their values are on the
+        value stack, so tree depth costs list space, not Python frames.
+        The operation queued for a BinOp is picked by the node's static
+        type, see INTEGER_OPERATIONS, REAL_OPERATIONS and
+        COMPARISON_OPERATIONS. AND/OR short-circuit. A Hoisted node is
+        evaluated once and then answered from its cached value.
+
+        When node_visits is set, the EVALUATED_NODES are counted into it
+        as they are evaluated; other nodes are dispatched, where
+        ProfilingInterpreter counts them.
+        """
+        values = []
+        push_value = values.append
+        pop_value = values.pop
+        todo = [node]
+        push = todo.append
+        pop = todo.pop
+        display = self.display
+        node_visits = self.node_visits
+        while todo:
+            item = pop()
+            kind = type(item)
+            if node_visits is not None and kind in EVALUATED_NODES:
+                node_visits[kind.__name__] += 1
+            if kind is BinOp:
+                node_type = item.type
+                if node_type == INTEGER:
+                    push(INTEGER_OPERATIONS[item.op.type])
+                elif node_type == REAL:
+                    push(REAL_OPERATIONS[item.op.type])
+                else:
+                    op = item.op.type
+                    if op == AND or op == OR:
+                        push(item.right)
+                        push(AND_THEN if op == AND else OR_ELSE)
+                        push(item.left)
+                        continue
+                    push(COMPARISON_OPERATIONS[op])
+                push(item.right)
+                push(item.left)
+            elif kind is Num:
+                push_value(item.value)
+            elif kind is Var:
+                symbol = item.symbol
+                val = display[symbol.scope_level][symbol.slot]
+                if val is UNDEFINED:
+                    raise NameError(repr(item.value))
+                push_value(val)
+            elif kind is UnaryOp:
+                if item.op.type == MINUS:
+                    push(NEGATE)
+                elif item.op.type == NOT:
+                    push(LOGICAL_NOT)
+                push(item.expr)
+            elif kind is Hoisted:
+                value = item.value
+                if value is UNDEFINED:
+                    value = item.value = self.evaluate(item.expr)
+                push_value(value)
+            elif item is NEGATE:
+                values[-1] = -values[-1]
+            elif item is AND_THEN:
+                if values[-1]:
+                    pop_value()
+                else:
+                    pop()
+            elif item is OR_ELSE:
+                if values[-1]:
+                    pop()
+                else:
+                    pop_value()
+            elif item is LOGICAL_NOT:
+                values[-1] = not values[-1]
+            elif kind is int:
+                right = pop_value()
+                if item < REAL_ADD:
+                    # INTEGER operands only
+                    if item == INT_ADD:
+                        values[-1] = values[-1] + right
+                    elif item == INT_SUB:
+                        values[-1] = values[-1] - right
+                    elif item == INT_MUL:
+                        values[-1] = values[-1] * right
+                    else:
+                        values[-1] = values[-1] // right
+                elif item < EQ:
+                    if item == REAL_ADD:
+                        values[-1] = values[-1] + right
+                    elif item == REAL_SUB:
+                        values[-1] = values[-1] - right
+                    elif item == REAL_MUL:
+                        values[-1] = values[-1] * right
+                    else:
+                        values[-1] = values[-1] / right
+                elif item == LT:
+                    values[-1] = values[-1] < right
+                elif item == LE:
+                    values[-1] = values[-1] <= right
+                elif item == GT:
+                    values[-1] = values[-1] > right
+                elif item == GE:
+                    values[-1] = values[-1] >= right
+                elif item == EQ:
+                    values[-1] = values[-1] == right
+                else:
+                    values[-1] = values[-1] != right
+            else:
+                push_value(self.dispatch(item))
+        return values[0]
+
+    def visit_Hoisted(self, node):
+        value = node.value
+        if value is UNDEFINED:
+            value = node.value = self.evaluate(node.expr)
+        return value
 
     def visit_Num(self, node):
         return node.value
 
     def visit_Compound(self, node):
-        for child in node.children:
-            self.visit(child)
+        self._pending.extend(reversed(node.children))
 
     def visit_NoOp(self, node):
         pass
 
+    def visit_While(self, node):
+        for hoisted in node.hoisted:
+            hoisted.value = UNDEFINED
+        # the statements of a BEGIN ... END body are queued directly,
+        # without a visit_Compound per pass
+        body = node.body.children if type(node.body) is Compound else [node.body]
+        self._pending.append(WhileLoop(node.condition, body[::-1]))
+
+    def visit_WhileLoop(self, loop):
+        if self.evaluate(loop.condition):
+            pending = self._pending
+            pending.append(loop)
+            pending.extend(loop.body)
+
+    def visit_For(self, node):
+        for hoisted in node.hoisted:
+            hoisted.value = UNDEFINED
+        symbol = node.var.symbol
+        start = self.dispatch(node.start)
+        stop = self.dispatch(node.stop)
+        # The loop variable can't be assigned in the body, so the count
+        # lives in the ForLoop and is only stored for the body to read
+        frame = self.display[symbol.scope_level]
+        frame[symbol.slot] = start
+        if node.down:
+            counts = range(start, stop - 1, -1)
+        else:
+            counts = range(start, stop + 1)
+        body = node.body.children if type(node.body) is Compound else [node.body]
+        self._pending.append(ForLoop(iter(counts), frame, symbol.slot, body[::-1]))
+
     def visit_Assign(self, node):
-        var_name = node.left.value
-        self.GLOBAL_SCOPE[var_name] = self.visit(node.right)
+        symbol = node.left.symbol
+        value = self.dispatch(node.right)
+        if node.right.type != node.left.type:
+            # INTEGER value into a REAL variable
+            value = self.to_real(value)
+        self.display[symbol.scope_level][symbol.slot] = value
+        if TRACE.execute:
+            TRACE.emit(EXECUTE, "Assign: %s := %r", symbol.name, value)
 
     def visit_Var(self, node):
-        var_name = node.value
-        val = self.GLOBAL_SCOPE.get(var_name)
-        if val is None:
-            raise NameError(repr(var_name))
-        else:
-            return val
+        symbol = node.symbol
+        val = self.display[symbol.scope_level][symbol.slot]
+        if val is UNDEFINED:
+            raise NameError(repr(node.value))
+        return val
+
+    def to_real(self, value):
+        """Convert an INTEGER value stored into a REAL variable"""
+        return float(value)
 
     def visit_Program(self, node):
+        scope = node.scope
+        self.global_scope = scope
+        self.display = [None] * (scope.scope_level + 1)
+        self.call_stack.reset()
+        # The program's record stays at the bottom of the stack after the
+        # run, its frame holds the globals GLOBAL_SCOPE reads
+        self.call_stack.push(scope, self.display)
         self.visit(node.block)
 
     def visit_Block(self, node):
         for declaration in node.declarations:
             self.visit(declaration)
-        self.visit(node.compound_statement)
+        self._pending.append(node.compound_statement)
 
     def visit_VarDecl(self, node):
         pass
@@ -166,11 +602,60 @@ class Interpreter(NodeVisitor):
     def visit_ProcedureDecl(self, node):
         pass
 
+    def visit_ProcedureCall(self, node):
+        proc_symbol = node.proc_symbol
+        args = node.actual_params
+        # arguments are evaluated before the callee's frame is installed
+        values = [self.dispatch(arg) for arg in args]
+        if type(proc_symbol.block_ast) is LazyBlock:
+            # before the push, loading the body can add slots to its scope
+            proc_symbol.block_ast = load_block(proc_symbol.block_ast)
+        display = self.display
+        record = self.call_stack.push(proc_symbol.scope, display)
+        if TRACE.execute:
+            TRACE.emit(EXECUTE, "ENTER: %s", record)
+        frame = record.frame
+        for param, arg, value in zip(proc_symbol.params, args, values):
+            if arg.type != param.type.name:
+                value = self.to_real(value)
+            frame[param.slot] = value
+        # declarations hold no code, run the body directly; the record
+        # is reached once the body has run and leaves the call
+        pending = self._pending
+        pending.append(record)
+        pending.append(proc_symbol.block_ast.compound_statement)
+
+    def visit_ActivationRecord(self, record):
+        if TRACE.execute:
+            TRACE.emit(EXECUTE, "LEAVE: %s", record)
+        self.call_stack.pop(self.display)
+
     def interpret(self):
         tree = self.parser.parse()
+        SemanticAnalyzer().visit(tree)
+        folder = ConstantFolder()
+        tree = folder.fold(tree)
+        if TRACE.semantic:
+            TRACE.emit(SEMANTIC, "Constant folding removed %d nodes", folder.removed)
         return self.visit(tree)
 
 
+def load_block(lazy):
+    """Parse, analyse and fold the body of a lazily parsed procedure.
+    The Block is memoised in the LazyBlock, so this only happens once."""
+    if lazy.block is None:
+        replay = TokenReplay(lazy.tokens + [Token(EOF, None)], lazy.offsets + [None])
+        parser = Parser(replay, lazy=True, location=lazy.location)
+        block = parser.block()
+        if parser.current_token.type != EOF:
+            parser.error(EOF)
+        analyzer = SemanticAnalyzer()
+        analyzer.symtab.reopen_scope(lazy.scope, lazy.visible)
+        analyzer.visit(block)
+        lazy.block = ConstantFolder().fold(block)
+    return lazy.block
+
+
 def main():
     while True:
         try:
@@ -0,0 +1,359 @@
+##############################
+#                            #
+#         OPTIMIZER          #
+#                            #
+##############################
+from constants import *
+from ast_ import Assign, BinOp, Block, Compound, For, Hoisted, Num, ProcedureCall, ProcedureDecl, UnaryOp, Var, While
+from tokenizer import Token
+from visitor import NodeVisitor
+
+FOLDABLE_OPS = {
+    PLUS: lambda left, right: left + right,
+    MINUS: lambda left, right: left - right,
+    MULTIPLY: lambda left, right: left * right,
+    INTEGER_DIV: lambda left, right: left // right,
+    FLOAT_DIV: lambda left, right: left / right,
+}
+
+
+def make_num(value):
+    """Build a Num node whose token type matches the Python type of value"""
+    if isinstance(value, int):
+        return Num(Token(INTEGER_CONST, value))
+    return Num(Token(REAL_CONST, value))
+
+
+def nested_blocks(block):
+    """block and the Blocks of the procedures declared in it at any
+    depth, without recursing once per level. Lazily parsed bodies are
+    left out, main.load_block optimizes them when they are loaded."""
+    todo = [block]
+    while todo:
+        block = todo.pop()
+        yield block
+        todo.extend(
+            declaration.block_node
+            for declaration in block.declarations
+            if type(declaration) is ProcedureDecl and type(declaration.block_node) is Block
+        )
+
+
+def is_const(node, value):
+    # Only INTEGER constants are neutral for both INTEGER and REAL operands:
+    # x * 1.0 would turn an INTEGER x into a REAL
+    return isinstance(node, Num) and type(node.value) is int and node.value == value
+
+
+class ConstantFolder(NodeVisitor):
+    """Fold constant BinOp/UnaryOp subtrees into Num nodes and simplify
+    x*1, 1*x, x+0, 0+x, x-0, +x, --x and NOT NOT x.
+
+    Each visit_* method returns the (possibly replaced) node; expressions
+    go through fold_UnaryOp/fold_BinOp with their children already folded. Operations
+    are folded with the same Python operators the Interpreter uses, so
+    INTEGER DIV stays an int and '/' always yields a REAL. Divisions by
+    a constant zero are left alone to fail at run time as before.
+    BOOLEAN expressions have no constant node and are never folded.
+
+    fold() finishes with a LoopHoister pass over the folded tree.
+    """
+
+    def __init__(self) -> None:
+        self.removed = 0
+        self.hoisted = 0
+
+    def fold(self, tree):
+        tree = self.visit(tree)
+        hoister = LoopHoister()
+        hoister.hoist(tree)
+        self.hoisted += hoister.hoisted
+        return tree
+
+    def visit_Program(self, node):
+        node.block = self.visit(node.block)
+        return node
+
+    def visit_Block(self, node):
+        # declarations are not replaced, only the statements are folded
+        for block in nested_blocks(node):
+            block.compound_statement = self.visit(block.compound_statement)
+        return node
+
+    def visit_VarDecl(self, node):
+        return node
+
+    def visit_ProcedureDecl(self, node):
+        node.block_node = self.visit(node.block_node)
+        return node
+
+    def visit_LazyBlock(self, node):
+        # folded by main.load_block when it is loaded
+        return node
+
+    def visit_ProcedureCall(self, node):
+        node.actual_params = [self.visit(arg) for arg in node.actual_params]
+        return node
+
+    def visit_Compound(self, node):
+        node.children = [self.visit(child) for child in node.children]
+        return node
+
+    def visit_NoOp(self, node):
+        return node
+
+    def visit_Assign(self, node):
+        node.right = self.visit(node.right)
+        return node
+
+    def visit_While(self, node):
+        node.condition = self.visit(node.condition)
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_For(self, node):
+        node.start = self.visit(node.start)
+        node.stop = self.visit(node.stop)
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_Var(self, node):
+        return node
+
+    def visit_Num(self, node):
+        return node
+
+    def visit_UnaryOp(self, node):
+        return self.fold_expression(node)
+
+    def visit_BinOp(self, node):
+        return self.fold_expression(node)
+
+    def fold_expression(self, node):
+        """Fold an expression bottom-up with an explicit stack, so deep
+        trees don't recurse once per level"""
+        results = []
+        todo = [(node, False)]
+        while todo:
+            item, expanded = todo.pop()
+            kind = type(item)
+            if kind is BinOp:
+                if expanded:
+                    right = results.pop()
+                    results.append(self.fold_BinOp(item, results.pop(), right))
+                else:
+                    todo.append((item, True))
+                    todo.append((item.right, False))
+                    todo.append((item.left, False))
+            elif kind is UnaryOp:
+                if expanded:
+                    results.append(self.fold_UnaryOp(item, results.pop()))
+                else:
+                    todo.append((item, True))
+                    todo.append((item.expr, False))
+            else:
+                results.append(self.visit(item))
+        return results.pop()
+
+    def fold_UnaryOp(self, node, expr):
+        op = node.op.type
+        if op == PLUS:
+            self.removed += 1
+            return expr
+        if isinstance(expr, Num):
+            self.removed += 1
+            return make_num(-expr.value)
+        if isinstance(expr, UnaryOp) and expr.op.type == op:
+            self.removed += 2
+            return expr.expr
+        node.expr = expr
+        return node
+
+    def fold_BinOp(self, node, left, right):
+        op = node.op.type
+
+        if node.type == BOOLEAN:
+            node.left = left
+            node.right = right
+            return node
+
+        if isinstance(left, Num) and isinstance(right, Num):
+            divides = op in (INTEGER_DIV, FLOAT_DIV)
+            if not (divides and right.value == 0):
+                self.removed += 2
+                return make_num(FOLDABLE_OPS[op](left.value, right.value))
+
+        if op == MULTIPLY:
+            if is_const(right, 1):
+                self.removed += 2
+                return left
+            if is_const(left, 1):
+                self.removed += 2
+                return right
+        elif op == PLUS:
+            if is_const(right, 0):
+                self.removed += 2
+                return left
+            if is_const(left, 0):
+                self.removed += 2
+                return right
+        elif op == MINUS:
+            if is_const(right, 0):
+                self.removed += 2
+                return left
+
+        node.left = left
+        node.right = right
+        return node
+
+
+def loop_assignments(loop):
+    """VarSymbols assigned anywhere in a loop, the FOR variable included,
+    or None when the loop calls procedures"""
+    assigned = set()
+    todo = [loop]
+    while todo:
+        node = todo.pop()
+        kind = type(node)
+        if kind is Assign:
+            assigned.add(node.left.symbol)
+        elif kind is Compound:
+            todo.extend(node.children)
+        elif kind is While:
+            todo.append(node.body)
+        elif kind is For:
+            assigned.add(node.var.symbol)
+            todo.append(node.body)
+        elif kind is ProcedureCall:
+            return None
+    return assigned
+
+
+class LoopHoister(NodeVisitor):
+    """Hoist loop-invariant expressions out of WHILE and FOR loops.
+
+    An expression in a loop is invariant when the loop assigns none of
+    its variables and calls no procedures, which could assign anything
+    they can see. Each largest invariant BinOp/UnaryOp is wrapped in a
+    Hoisted node and added to the outermost loop it is invariant in. The
+    Interpreter resets a loop's Hoisted nodes whenever it enters the
+    loop and evaluates each one at most once per entry, on first use, so
+    an expression the loop never reaches still never runs and errors
+    such as a division by zero surface where they did before.
+    """
+
+    def __init__(self) -> None:
+        self.hoisted = 0
+        # (loop, assigned VarSymbols or None) from the outermost loop in
+        self._loops = []
+
+    def hoist(self, tree):
+        self.visit(tree)
+        return tree
+
+    def visit_Program(self, node):
+        self.visit(node.block)
+
+    def visit_Block(self, node):
+        for block in nested_blocks(node):
+            self.visit(block.compound_statement)
+
+    def visit_VarDecl(self, node):
+        pass
+
+    def visit_ProcedureDecl(self, node):
+        self.visit(node.block_node)
+
+    def visit_LazyBlock(self, node):
+        pass
+
+    def visit_Compound(self, node):
+        for child in node.children:
+            self.visit(child)
+
+    def visit_NoOp(self, node):
+        pass
+
+    def visit_Assign(self, node):
+        node.right = self.expression(node.right)
+
+    def visit_ProcedureCall(self, node):
+        node.actual_params = [self.expression(arg) for arg in node.actual_params]
+
+    def visit_While(self, node):
+        self._loops.append((node, loop_assignments(node)))
+        node.condition = self.expression(node.condition)
+        self.visit(node.body)
+        self._loops.pop()
+
+    def visit_For(self, node):
+        # the bounds are evaluated once, before the loop is entered
+        node.start = self.expression(node.start)
+        node.stop = self.expression(node.stop)
+        self._loops.append((node, loop_assignments(node)))
+        self.visit(node.body)
+        self._loops.pop()
+
+    def invariance(self, node):
+        """Map every node of an expression to the index of the outermost
+        loop it is invariant in, len(self._loops) when there is none"""
+        loops = self._loops
+        order = []
+        todo = [node]
+        while todo:
+            item = todo.pop()
+            order.append(item)
+            kind = type(item)
+            if kind is BinOp:
+                todo.append(item.left)
+                todo.append(item.right)
+            elif kind is UnaryOp:
+                todo.append(item.expr)
+        levels = {}
+        for item in reversed(order):
+            kind = type(item)
+            if kind is BinOp:
+                levels[item] = max(levels[item.left], levels[item.right])
+            elif kind is UnaryOp:
+                levels[item] = levels[item.expr]
+            elif kind is Var:
+                level = 0
+                for index, (_, assigned) in enumerate(loops):
+                    if assigned is None or item.symbol in assigned:
+                        level = index + 1
+                levels[item] = level
+            else:
+                levels[item] = 0
+        return levels
+
+    def expression(self, node):
+        loops = self._loops
+        if not loops:
+            return node
+        levels = self.invariance(node)
+
+        def wrap(item, limit):
+            """item, or a Hoisted for it when it is invariant in a loop
+            further out than limit; returns it with the new limit"""
+            level = levels[item]
+            if level < limit and type(item) in (BinOp, UnaryOp):
+                hoisted = Hoisted(item)
+                loops[level][0].hoisted.append(hoisted)
+                self.hoisted += 1
+                return hoisted, level
+            return item, limit
+
+        root, limit = wrap(node, len(loops))
+        todo = [(node, limit)]
+        while todo:
+            item, limit = todo.pop()
+            kind = type(item)
+            if kind is BinOp:
+                item.left, left_limit = wrap(item.left, limit)
+                item.right, right_limit = wrap(item.right, limit)
+                todo.append((item.left.expr if type(item.left) is Hoisted else item.left, left_limit))
+                todo.append((item.right.expr if type(item.right) is Hoisted else item.right, right_limit))
+            elif kind is UnaryOp:
+                item.expr, expr_limit = wrap(item.expr, limit)
+                todo.append((item.expr.expr if type(item.expr) is Hoisted else item.expr, expr_limit))
+        return root
@@ -4,234 +4,526 @@
 #           PARSER           #
 #                            #
 ##############################
-from constants import TokenType
-from ast_ import *
+import ast_
+from constants import *
+from tokenizer import TokenStream
+from tracing import TRACE, PARSE
+
+BINARY_PRECEDENCE = {
+    OR: 1,
+    AND: 2,
+    EQUAL: 4,
+    NOT_EQUAL: 4,
+    LESS_THAN: 4,
+    LESS_EQUAL: 4,
+    GREATER_THAN: 4,
+    GREATER_EQUAL: 4,
+    PLUS: 5,
+    MINUS: 5,
+    MULTIPLY: 6,
+    INTEGER_DIV: 6,
+    FLOAT_DIV: 6,
+}
+# NOT covers a whole comparison, `NOT a < b` is NOT (a < b)
+NOT_PRECEDENCE = 3
+# Prefix PLUS/MINUS apply to a single factor, so they bind tightest
+UNARY_PRECEDENCE = 7
+PREFIX_PRECEDENCE = {PLUS: UNARY_PRECEDENCE, MINUS: UNARY_PRECEDENCE, NOT: NOT_PRECEDENCE}
+
+
+class ParseError(Exception):
+    """Every syntax error found by one parse, as messages in source order"""
+
+    def __init__(self, errors) -> None:
+        super().__init__("\n".join(errors))
+        self.errors = errors
+
 
 class Parser:
-    def __init__(self, lexer) -> None:
+    def __init__(self, lexer, lookahead=2, nodes=ast_, lazy=False, location=None) -> None:
         self.lexer = lexer
-        self.current_token = self.lexer.get_next_token()
-
-    def error(self):
-        raise Exception("Error parsing Input")
+        # Node factory: anything with the ast_ class names as constructors,
+        # e.g. an arena.Arena to emit the flat representation directly
+        self.nodes = nodes
+        # Skip procedure bodies and keep their tokens in LazyBlock nodes
+        self.lazy = lazy
+        # Maps a token offset to its (line, column) for error messages
+        self.location = location or getattr(lexer, "location", None)
+        # Syntax errors so far while parse() recovers from them, else None,
+        # and whether one of them was at the end of the input
+        self.errors = None
+        self.ended = False
+        self.tokens = TokenStream(lexer, lookahead)
+        self.current_token = self.tokens.next()
+
+    def offset(self):
+        """Source offset of current_token, None if unknown"""
+        return self.tokens.offset()
+
+    def error(self, expected=None, offset=None):
+        """Raise a ParseError at current_token, or at offset when the
+        token reported is not the one last taken from the stream"""
+        token = self.current_token
+        message = "Error parsing Input"
+        if offset is None:
+            offset = self.offset()
+        if offset is not None and self.location is not None:
+            line, column = self.location(offset)
+            message += f" at line {line}, column {column}"
+        if token.type == EOF:
+            message += ": unexpected end of input"
+        else:
+            message += f": unexpected {token.value!r}"
+        if expected is not None:
+            message += f", expected {expected}"
+        raise ParseError([message])
+
+    def recover(self, production):
+        """Run production. While parse() collects errors, a syntax error
+        is recorded and the tokens up to the next SEMI or END are skipped
+        instead, and None is returned."""
+        if self.errors is None:
+            return production()
+        try:
+            return production()
+        except ParseError as e:
+            self.record(e)
+        self.synchronize()
+        return None
+
+    def record(self, error):
+        # Once the input ran out every enclosing production fails on the
+        # same EOF, only the first of those errors is worth reporting
+        if self.current_token.type == EOF:
+            if self.ended:
+                return
+            self.ended = True
+        self.errors.extend(error.errors)
+
+    def synchronize(self):
+        """Skip to the SEMI or END after a broken statement, stepping over
+        whole BEGIN ... END blocks"""
+        depth = 0
+        while True:
+            kind = self.current_token.type
+            if kind == EOF or (not depth and (kind == SEMI or kind == END)):
+                return
+            if kind == BEGIN:
+                depth += 1
+            elif kind == END:
+                depth -= 1
+            self.eat(kind)
+
+    def peek(self, n=1):
+        """Return the token n positions after current_token"""
+        return self.tokens.peek(n - 1)
 
     def eat(self, token_type):
-        print(f"Current token: {self.current_token}, Expected: {token_type}")
+        if TRACE.parse:
+            TRACE.emit(PARSE, "Current token: %s, Expected: %s", self.current_token, token_type)
         if self.current_token.type == token_type:
-            self.current_token = self.lexer.get_next_token()
+            self.current_token = self.tokens.next()
         else:
-            print("SORRY BROTHER NO TOKEN MATCHED!!")
-            self.error()
+            if TRACE.parse:
+                TRACE.emit(PARSE, "SORRY BROTHER NO TOKEN MATCHED!!")
+            self.error(token_type)
 
     def program(self):
         """program: PROGRAM variable SEMI block DOT"""
-        self.eat(TokenType.PROGRAM.value)
-        var_node = self.variable()
-        prog_name = var_node.value
-        self.eat(TokenType.SEMI.value)
+        self.eat(PROGRAM)
+        prog_name = self.current_token.value
+        self.eat(ID)
+        self.eat(SEMI)
         block_node = self.block()
-        program_node = Program(prog_name, block_node)
-        self.eat(TokenType.DOT.value)
+        program_node = self.nodes.Program(prog_name, block_node)
+        self.eat(DOT)
         return program_node
 
     def block(self):
-        """block: declarations compound_statement"""
-        declaration_nodes = self.declarations()
-        compound_statement_node = self.compound_statement()
-        node = Block(declaration_nodes, compound_statement_node)
-        return node
+        """block: declarations compound_statement
 
-    def declarations(self):
+        Procedures declared in the block are parsed with an explicit
+        stack of the blocks still open around them instead of recursion,
+        so procedures nested any number of levels deep cost list space,
+        not Python frames.
+        """
+        return self.nested_block(None, None)
+
+    def declarations(self, declarations):
         """declarations: VAR (variable declaration SEMI)+ | 
-        (PROCEDURE ID (LPAREN formal_parameter_list RPAREN)? SEMI block SEMI)* | empty"""
+        (PROCEDURE ID (LPAREN formal_parameter_list RPAREN)? SEMI block SEMI)* | empty
+
+        Append the variable declarations up to the next PROCEDURE or the
+        end of the declarations; nested_block parses the procedures."""
+        while self.current_token.type == VAR:
+            self.eat(VAR)
+            while self.current_token.type == ID:
+                var_decl = self.recover(self.variable_declaration)
+                if var_decl is not None:
+                    declarations.extend(var_decl)
+                self.eat(SEMI)
+
+    def procedure_declaration(self):
+        """procedure_declaration: PROCEDURE ID (LPAREN formal_parameter_list RPAREN)? SEMI block SEMI"""
+        start = self.node_start()
+        return self.nested_block(self.procedure_heading(), start)
+
+    def procedure_heading(self):
+        """PROCEDURE ID (LPAREN formal_parameter_list RPAREN)? SEMI, returns
+        the name and the parameters"""
+        self.eat(PROCEDURE)
+        proc_name = self.current_token.value
+        self.eat(ID)
+        params = []
+        if self.current_token.type == LPAREN:
+            self.eat(LPAREN)
+            params = self.formal_parameter_list()
+            self.eat(RPAREN)
+        self.eat(SEMI)
+        return proc_name, params
+
+    def nested_block(self, heading, start):
+        """Parse a block and the procedures nested in it. With a heading,
+        the block is the body of that procedure, whose first token was at
+        start, and the ProcedureDecl is returned instead of the Block."""
+        # (heading, start, block start, declarations) of the enclosing
+        # blocks whose declarations are still being parsed
+        enclosing = []
+        block_start = self.node_start()
         declarations = []
-
         while True:
-            if self.current_token.type == TokenType.VAR.value:
-                self.eat(TokenType.VAR.value)
-                while self.current_token.type == TokenType.ID.value:
-                    var_decl = self.variable_declaration()
-                    declarations.extend(var_decl)
-                    self.eat(TokenType.SEMI.value)
-
-            elif self.current_token.type == TokenType.PROCEDURE.value:
-                self.eat(TokenType.PROCEDURE.value)
-                proc_name = self.current_token.value
-                self.eat(TokenType.ID.value)
-                self.eat(TokenType.SEMI.value)
-                block_node = self.block()
-                proc_decl = ProcedureDecl(proc_name, block_node)
-                declarations.append(proc_decl)
-                self.eat(TokenType.SEMI.value)
-            
-            else:
-                break
+            self.declarations(declarations)
+            if self.current_token.type == PROCEDURE:
+                proc_start = self.node_start()
+                proc_heading = self.procedure_heading()
+                if self.lazy:
+                    tokens, offsets = self.skip_block()
+                    block_node = self.nodes.LazyBlock(tokens, offsets, self.location)
+                    declarations.append(self.procedure(proc_heading, block_node, proc_start))
+                    continue
+                enclosing.append((heading, start, block_start, declarations))
+                heading, start = proc_heading, proc_start
+                block_start = self.node_start()
+                declarations = []
+                continue
+            compound_statement_node = self.compound_statement()
+            node = self.nodes.Block(declarations, compound_statement_node)
+            node = self.node_end(node, block_start)
+            if heading is not None:
+                node = self.procedure(heading, node, start)
+            if not enclosing:
+                return node
+            heading, start, block_start, declarations = enclosing.pop()
+            declarations.append(node)
+
+    def procedure(self, heading, block_node, start):
+        """The ProcedureDecl of a heading and its block, eats its final SEMI"""
+        proc_name, params = heading
+        proc_decl = self.nodes.ProcedureDecl(proc_name, params, block_node)
+        self.eat(SEMI)
+        return self.node_end(proc_decl, start)
+
+    # Called with the first token of a Block or ProcedureDecl current,
+    # and with the node once all of its tokens have been eaten; for
+    # subclasses that keep track of where nodes are in the source
+    def node_start(self):
+        return None
+
+    def node_end(self, node, start):
+        return node
 
-        return declarations
+    def skip_block(self):
+        """Consume the tokens of a block without parsing them and return
+        them with their source offsets. The block ends with the END that
+        closes its BEGIN at depth 0, after one such END for every
+        procedure it declares."""
+        tokens = []
+        marks = []
+        depth = 0
+        procedures = 0
+        token = self.current_token
+        stream = self.tokens
+        next_token = stream.next
+        while True:
+            kind = token.type
+            if kind == EOF:
+                self.current_token = token
+                self.error(END)
+            tokens.append(token)
+            marks.append(stream.mark)
+            token = next_token()
+            if kind == BEGIN:
+                depth += 1
+            elif kind == END:
+                depth -= 1
+                if depth < 0:
+                    self.current_token = tokens[-1]
+                    self.error(offset=stream.offset(marks[-1]))
+                if depth == 0:
+                    if not procedures:
+                        self.current_token = token
+                        # plain ints instead of marks, a body can be kept
+                        # for the whole run and regex matches are tracked
+                        # by the garbage collector
+                        if stream.lexer is None:
+                            return tokens, marks
+                        return tokens, list(map(stream.lexer.offset_of, marks))
+                    procedures -= 1
+            elif kind == PROCEDURE and depth == 0:
+                procedures += 1
 
     def formal_parameter_list(self):
         """formal_parameter_list: formal_parameters | formal_parameters SEMI formal_parameter_list """
-        pass
+        param_nodes = self.formal_parameters()
+        while self.current_token.type == SEMI:
+            self.eat(SEMI)
+            param_nodes.extend(self.formal_parameters())
+        return param_nodes
 
     def formal_parameters(self):
         """formal_parameters: ID (COMMA ID)* COLON type_spec"""
-        param_nodes = []
-        
+        param_tokens = [self.current_token]
+        self.eat(ID)
+        while self.current_token.type == COMMA:
+            self.eat(COMMA)
+            param_tokens.append(self.current_token)
+            self.eat(ID)
+        self.eat(COLON)
+
+        type_node = self.type_spec()
+        return [self.nodes.Param(self.nodes.Var(token), type_node) for token in param_tokens]
+
     def variable_declaration(self):
         """variable_declaration: ID (COMMA ID)* COLON type_spec"""
     
-        var_nodes = [Var(self.current_token)]
-        self.eat(TokenType.ID.value)
+        var_nodes = [self.nodes.Var(self.current_token)]
+        self.eat(ID)
 
-        while self.current_token.type == TokenType.COMMA.value:
-            self.eat(TokenType.COMMA.value)
-            var_nodes.append(Var(self.current_token))
-            self.eat(TokenType.ID.value)
-        self.eat(TokenType.COLON.value)
+        while self.current_token.type == COMMA:
+            self.eat(COMMA)
+            var_nodes.append(self.nodes.Var(self.current_token))
+            self.eat(ID)
+        self.eat(COLON)
 
         type_node = self.type_spec()
-        var_declarations = [VarDecl(var_node, type_node) for var_node in var_nodes]
+        var_declarations = [self.nodes.VarDecl(var_node, type_node) for var_node in var_nodes]
         return var_declarations
     
     def type_spec(self):
         """type_spec: INTEGER | REAL"""
         token = self.current_token
-        if self.current_token.type == TokenType.INTEGER.value:
-            self.eat(TokenType.INTEGER.value)
+        if self.current_token.type == INTEGER:
+            self.eat(INTEGER)
         else:
-            self.eat(TokenType.REAL.value)
-        node = Type(token)
+            self.eat(REAL)
+        node = self.nodes.Type(token)
         return node
 
     def compound_statement(self):
         """compound_statement: BEGIN statement_list END"""
-        self.eat(TokenType.BEGIN.value)
+        self.eat(BEGIN)
         nodes = self.statement_list()
-        self.eat(TokenType.END.value)
-
-        root = Compound()
-        for node in nodes:
-            root.children.append(node)
+        self.eat(END)
 
+        root = self.nodes.Compound(nodes)
         return root
 
     def statement_list(self):
         """
         statement_list: statement | statement SEMI statement_list
         """
-        node = self.statement()
-        results = [node]
-
-        while self.current_token.type == TokenType.SEMI.value:
-            self.eat(TokenType.SEMI.value)
-            results.append(self.statement())
+        results = [self.statement_or_skip()]
 
+        while True:
+            if self.current_token.type == SEMI:
+                self.eat(SEMI)
+                results.append(self.statement_or_skip())
+            elif self.errors is not None and self.current_token.type not in (END, EOF):
+                # a missing SEMI or stray tokens after a statement
+                self.recover(lambda: self.error(SEMI))
+            else:
+                break
 
         return results
 
+    def statement_or_skip(self):
+        node = self.recover(self.statement)
+        return self.empty() if node is None else node
+
     def statement(self):
         """
-        statement: compound_statement | assignment_statement | empty
+        statement: compound_statement | proccall_statement | assignment_statement
+                 | while_statement | for_statement | empty
         """
-        if self.current_token.type == TokenType.BEGIN.value:
+        if self.current_token.type == BEGIN:
             node = self.compound_statement()
-        elif self.current_token.type == TokenType.ID.value:
-            node = self.assginment_statement()
+        elif self.current_token.type == ID:
+            if self.peek().type == ASSIGN:
+                node = self.assginment_statement()
+            else:
+                node = self.proccall_statement()
+        elif self.current_token.type == WHILE:
+            node = self.while_statement()
+        elif self.current_token.type == FOR:
+            node = self.for_statement()
         else:
             node = self.empty()
 
         return node
 
+    def while_statement(self):
+        """while_statement: WHILE expr DO statement"""
+        self.eat(WHILE)
+        condition = self.expr()
+        self.eat(DO)
+        body = self.statement()
+        return self.nodes.While(condition, body)
+
+    def for_statement(self):
+        """for_statement: FOR variable ASSIGN expr (TO | DOWNTO) expr DO statement"""
+        self.eat(FOR)
+        var = self.variable()
+        self.eat(ASSIGN)
+        start = self.expr()
+        down = self.current_token.type == DOWNTO
+        self.eat(DOWNTO if down else TO)
+        stop = self.expr()
+        self.eat(DO)
+        body = self.statement()
+        return self.nodes.For(var, start, stop, down, body)
+
+    def proccall_statement(self):
+        """proccall_statement: ID (LPAREN (expr (COMMA expr)*)? RPAREN)?"""
+        token = self.current_token
+        proc_name = token.value
+        self.eat(ID)
+        actual_params = []
+        if self.current_token.type == LPAREN:
+            self.eat(LPAREN)
+            if self.current_token.type != RPAREN:
+                actual_params.append(self.expr())
+                while self.current_token.type == COMMA:
+                    self.eat(COMMA)
+                    actual_params.append(self.expr())
+            self.eat(RPAREN)
+        return self.nodes.ProcedureCall(proc_name, actual_params, token)
+
     def assginment_statement(self):
         """assignment: variable ASSIGN expr"""
         left = self.variable()
         token = self.current_token
-        self.eat(TokenType.ASSIGN.value)
+        self.eat(ASSIGN)
         right = self.expr()
-        node = Assign(left, token, right)
+        node = self.nodes.Assign(left, token, right)
         return node
 
     def variable(self):
         """variable: ID"""
-        node = Var(self.current_token)
-        self.eat(TokenType.ID.value)
+        node = self.nodes.Var(self.current_token)
+        self.eat(ID)
         return node
 
     def empty(self):
         """An empty production rule"""
-        return NoOp()
-
-    def factor(self):
-        """factor: PLUS factor
-                 | MINUS factor
-                 | INTEGER_CONST
-                 | REAL_CONST
-                 | LPAREN expr RPAREN
-                 | variable
-        """
-        token = self.current_token
-        if token.type == TokenType.PLUS.value:
-            self.eat(TokenType.PLUS.value)
-            node = UnaryOp(token, self.factor())
-            return node
-        elif token.type == TokenType.MINUS.value:
-            self.eat(TokenType.MINUS.value)
-            node = UnaryOp(token, self.factor())
-            return node
-        elif token.type == TokenType.INTEGER_CONST.value:
-            self.eat(TokenType.INTEGER_CONST.value)
-            return Num(token)
-        elif token.type == TokenType.REAL_CONST.value:
-            self.eat(TokenType.REAL_CONST.value)
-            return Num(token)
-        elif token.type == TokenType.LPAREN.value:
-            self.eat(TokenType.LPAREN.value)
-            node = self.expr()
-            self.eat(TokenType.RPAREN.value)
-            return node
-        else:
-            node = self.variable()
-            return node
+        return self.nodes.NoOp()
 
-    def term(self):
-        """term: factor ((MUL | INTEGER_DIV | FLOAT_DIV) factor)*"""
-        node = self.factor()
+    def expr(self):
+        """expr: disjunction
+        disjunction: conjunction (OR conjunction)*
+        conjunction: negation (AND negation)*
+        negation: NOT negation | comparison
+        comparison: sum ((EQUAL | NOT_EQUAL | LESS_THAN | LESS_EQUAL | GREATER_THAN | GREATER_EQUAL) sum)*
+        sum: term ((PLUS | MINUS) term)*
+        term: factor ((MUL | INTEGER_DIV | FLOAT_DIV) factor)*
+        factor: PLUS factor
+              | MINUS factor
+              | INTEGER_CONST
+              | REAL_CONST
+              | LPAREN expr RPAREN
+              | variable
+
+        Parsed with explicit operand and operator stacks (operator
+        precedence) instead of one recursive call per nesting level, so
+        deeply parenthesized or prefixed expressions only grow the lists.
+        The resulting tree is the same as the recursive grammar gives.
+        """
+        nodes = self.nodes
+        operands = []
+        # (precedence, token); LPAREN is kept with precedence 0
+        operators = []
+        open_parens = 0
+
+        def reduce():
+            precedence, token = operators.pop()
+            if precedence == UNARY_PRECEDENCE or precedence == NOT_PRECEDENCE:
+                operands.append(nodes.UnaryOp(token, operands.pop()))
+            else:
+                right = operands.pop()
+                operands.append(nodes.BinOp(left=operands.pop(), op=token, right=right))
 
-        while self.current_token.type in (TokenType.MULTIPLY.value, TokenType.INTEGER_DIV.value, TokenType.FLOAT_DIV.value):
+        while True:
+            # operand position: prefix operators and open parentheses
             token = self.current_token
-            if token.type == TokenType.MULTIPLY.value:
-                self.eat(TokenType.MULTIPLY.value)
-            elif token.type == TokenType.INTEGER_DIV:
-                self.eat(TokenType.INTEGER_DIV)
-            elif token.type == TokenType.FLOAT_DIV.value:
-                self.eat(TokenType.FLOAT_DIV.value)
-
-            node = BinOp(left=node, op=token, right=self.factor())
-
-        return node
+            while token.type in (PLUS, MINUS, NOT, LPAREN):
+                self.eat(token.type)
+                if token.type == LPAREN:
+                    operators.append((0, token))
+                    open_parens += 1
+                else:
+                    operators.append((PREFIX_PRECEDENCE[token.type], token))
+                token = self.current_token
+
+            if token.type == INTEGER_CONST:
+                self.eat(INTEGER_CONST)
+                operands.append(nodes.Num(token))
+            elif token.type == REAL_CONST:
+                self.eat(REAL_CONST)
+                operands.append(nodes.Num(token))
+            else:
+                operands.append(self.variable())
 
-    def expr(self):
-        """Parser/Interpreter
+            # operator position: close parentheses, then a binary operator
+            while open_parens and self.current_token.type == RPAREN:
+                while operators[-1][0] != 0:
+                    reduce()
+                operators.pop()
+                open_parens -= 1
+                self.eat(RPAREN)
 
-        expr: term((PLUS | MINUS) term)*
-        term: factor((MUL | DIV) factor)*
-        factor: INTEGER
-        """
-        node = self.term()
-        while self.current_token.type in (TokenType.PLUS.value, TokenType.MINUS.value):
             token = self.current_token
-            if token.type == TokenType.PLUS.value:
-                self.eat(TokenType.PLUS.value)
-            elif token.type == TokenType.MINUS.value:
-                self.eat(TokenType.MINUS.value)
+            precedence = BINARY_PRECEDENCE.get(token.type)
+            if precedence is None:
+                break
+            while operators and operators[-1][0] >= precedence:
+                reduce()
+            self.eat(token.type)
+            operators.append((precedence, token))
 
-            node = BinOp(left=node, op=token, right=self.term())
-
-        return node
+        if open_parens:
+            self.eat(RPAREN)
+        while operators:
+            reduce()
+        return operands.pop()
 
     def parse(self):
-        node = self.program()
-        if self.current_token.type != TokenType.EOF.value:
-            self.error()
-
+        """Parse a whole program. Syntax errors do not stop the parse:
+        each is recorded, the parser resynchronizes at the next SEMI or
+        END and goes on, and all of them are raised together at the end
+        as one ParseError."""
+        self.errors = []
+        self.ended = False
+        node = None
+        try:
+            node = self.program()
+            if self.current_token.type != EOF:
+                self.error(EOF)
+        except ParseError as e:
+            self.record(e)
+        except Exception as e:
+            # the lexer cannot go on after an invalid character
+            if not self.errors:
+                raise
+            raise ParseError(self.errors + [str(e)]) from e
+        if self.errors:
+            raise ParseError(self.errors)
         return node
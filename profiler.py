@@ -0,0 +1,197 @@
+##############################
+#                            #
+#          PROFILER          #
+#                            #
+##############################
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+from ast_ import AST, BinOp, UnaryOp
+from lexer import BufferLexer
+from main import Interpreter, SemanticAnalyzer
+from optimizer import ConstantFolder
+from parser import Parser
+
+
+class Profiler:
+    """Collect where a program run spends its time.
+
+    Records, for one or more runs:
+      phases      wall time and allocated/peak bytes of lex, parse,
+                  semantic and execute
+      node_visits how many AST nodes of each type were evaluated; an
+                  AND/OR operand that is skipped is not counted
+      statements  hits and time per Assign
+      procedures  hits and inclusive time per executing block (the
+                  program itself and each procedure activation)
+      stacks      self time per call stack, for flamegraph output
+    """
+
+    def __init__(self, track_allocations=True) -> None:
+        self.track_allocations = track_allocations
+        self.phases = {}
+        self.node_visits = Counter()
+        self.statements = {}
+        self.procedures = {}
+        self.stacks = Counter()
+
+    @contextmanager
+    def phase(self, name):
+        tracing = self.track_allocations and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if self.track_allocations:
+            tracemalloc.reset_peak()
+            start_bytes = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            stats = self.phases.setdefault(name, {"wall_s": 0.0, "allocated_bytes": 0, "peak_bytes": 0})
+            stats["wall_s"] += wall
+            if self.track_allocations:
+                current, peak = tracemalloc.get_traced_memory()
+                stats["allocated_bytes"] += current - start_bytes
+                stats["peak_bytes"] = max(stats["peak_bytes"], peak - start_bytes)
+            if tracing:
+                tracemalloc.stop()
+
+    def run(self, text):
+        """Run text through every phase and return the interpreter"""
+        with self.phase("lex"):
+            tokens = list(BufferLexer(text))
+        with self.phase("parse"):
+            tree = Parser(tokens).parse()
+        with self.phase("semantic"):
+            SemanticAnalyzer().visit(tree)
+            tree = ConstantFolder().fold(tree)
+        interpreter = ProfilingInterpreter(self)
+        with self.phase("execute"):
+            interpreter.visit(tree)
+        return interpreter
+
+    def to_dict(self):
+        return {
+            "phases": self.phases,
+            "node_visits": dict(self.node_visits.most_common()),
+            "statements": [
+                {"statement": label, "hits": hits, "time_ns": time_ns}
+                for label, (hits, time_ns) in sorted(self.statements.items(), key=lambda item: -item[1][1])
+            ],
+            "procedures": {
+                name: {"hits": hits, "time_ns": time_ns}
+                for name, (hits, time_ns) in self.procedures.items()
+            },
+        }
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def collapsed_stacks(self):
+        """Lines in the collapsed-stack format read by flamegraph.pl and
+        speedscope: frames joined by ';', then the self time in ns"""
+        return [f"{';'.join(stack)} {time_ns}" for stack, time_ns in self.stacks.items() if time_ns > 0]
+
+    def write_collapsed(self, path):
+        with open(path, "w") as f:
+            for line in self.collapsed_stacks():
+                f.write(line + "\n")
+
+
+class ProfilingInterpreter(Interpreter):
+    """Interpreter that reports into a Profiler as it executes"""
+
+    def __init__(self, profiler) -> None:
+        super().__init__(None)
+        self.profiler = profiler
+        # evaluate counts the expression nodes it runs itself, so WHILE
+        # conditions count once per test, AND/OR operands they skip not
+        # at all, and a Hoisted expression only when it is computed
+        self.node_visits = profiler.node_visits
+        # [name, start_ns, child_ns] per executing block
+        self._frames = []
+        self._labels = {}
+
+    def dispatch(self, node):
+        kind = type(node)
+        # visit_BinOp/visit_UnaryOp hand their node to evaluate, which
+        # counts it; work items are not nodes
+        if kind is not BinOp and kind is not UnaryOp and isinstance(node, AST):
+            self.profiler.node_visits[kind.__name__] += 1
+        return super().dispatch(node)
+
+    def enter_frame(self, name):
+        self._frames.append([name, time.perf_counter_ns(), 0])
+
+    def leave_frame(self):
+        name, start, child_ns = self._frames.pop()
+        elapsed = time.perf_counter_ns() - start
+        stack = tuple(frame[0] for frame in self._frames) + (name,)
+        self.profiler.stacks[stack] += elapsed - child_ns
+        if self._frames:
+            self._frames[-1][2] += elapsed
+        hits, time_ns = self.profiler.procedures.get(name, (0, 0))
+        self.profiler.procedures[name] = (hits + 1, time_ns + elapsed)
+
+    def visit_Program(self, node):
+        self.enter_frame(node.name)
+        try:
+            super().visit_Program(node)
+        finally:
+            self.leave_frame()
+
+    def visit_ProcedureCall(self, node):
+        self.enter_frame(node.proc_name)
+        super().visit_ProcedureCall(node)
+
+    def visit_ActivationRecord(self, record):
+        # the call's body has run, or an error is unwinding it
+        super().visit_ActivationRecord(record)
+        self.leave_frame()
+
+    def visit_Assign(self, node):
+        label = self._labels.get(node)
+        if label is None:
+            label = f"assign#{len(self._labels) + 1}:{node.left.value}"
+            self._labels[node] = label
+        start = time.perf_counter_ns()
+        super().visit_Assign(node)
+        elapsed = time.perf_counter_ns() - start
+
+        profiler = self.profiler
+        hits, time_ns = profiler.statements.get(label, (0, 0))
+        profiler.statements[label] = (hits + 1, time_ns + elapsed)
+        stack = tuple(frame[0] for frame in self._frames) + (label,)
+        profiler.stacks[stack] += elapsed
+        self._frames[-1][2] += elapsed
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Profile one run of a .pas program, printing the profile as JSON unless it is written to a file")
+    parser.add_argument("program")
+    parser.add_argument("--json", metavar="OUT.json")
+    parser.add_argument("--collapsed", metavar="OUT.folded")
+    args = parser.parse_args(argv)
+
+    with open(args.program) as f:
+        text = f.read()
+    profiler = Profiler()
+    profiler.run(text)
+    if args.json:
+        profiler.write_json(args.json)
+    if args.collapsed:
+        profiler.write_collapsed(args.collapsed)
+    if not args.json and not args.collapsed:
+        print(json.dumps(profiler.to_dict(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,235 @@
+##############################
+#                            #
+#     INTERPRETER SERVER     #
+#                            #
+##############################
+import asyncio
+import json
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import ProgramCache, source_key
+from main import Interpreter, SemanticAnalyzer
+from optimizer import ConstantFolder
+from vm import VM
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class InterpreterServer:
+    """Resident interpreter speaking JSON lines.
+
+    Requests (one JSON object per line, "id" is echoed back):
+      {"op": "run", "source": "..."}             run a program
+      {"op": "run", "handle": "...", "engine": "vm"}     engines: tree, vm, python
+      {"op": "compile", "source": "...", "engine": "vm"} -> {"handle": "..."}
+      {"op": "stats"}                            -> request latency percentiles
+    The engine defaults to "tree", the only one that runs every program:
+    the VM rejects procedure calls and the Python backend very deep
+    nesting. compile prepares the program for the given engine. Every
+    run gets a fresh frame (or a fresh tree for the "tree" engine), so
+    no state leaks between requests. Parses, compiled
+    CodeObjects and transpiled Python programs are reused through a
+    ProgramCache, and compiled handles stay resident in an LRU of
+    max_handles entries.
+
+    At most max_inflight requests are admitted at a time; a connection
+    stops reading new lines until a slot frees up, so clients that send
+    faster than programs run are pushed back through the socket/pipe.
+    """
+
+    # Requests execute on a single worker thread by default: the caches
+    # are not locked, and the GIL gives no speedup for more threads anyway
+    def __init__(self, cache=None, max_inflight=64, max_handles=1024, workers=1, latency_window=10000) -> None:
+        self.cache = cache if cache is not None else ProgramCache()
+        self.max_handles = max_handles
+        self.handles = OrderedDict()
+        self.latencies = deque(maxlen=latency_window)
+        self.requests = 0
+        self.errors = 0
+        self._max_inflight = max_inflight
+        self._inflight = None
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    # Request handling (runs in the executor thread)
+
+    def _resolve(self, request):
+        if "handle" in request:
+            key = request["handle"]
+            source = self.handles.get(key)
+            if source is None:
+                raise KeyError(f"Unknown handle {key}")
+            self.handles.move_to_end(key)
+            return source
+        return request["source"]
+
+    def _remember(self, source):
+        key = source_key(source)
+        self.handles[key] = source
+        self.handles.move_to_end(key)
+        while len(self.handles) > self.max_handles:
+            self.handles.popitem(last=False)
+        return key
+
+    def handle(self, request):
+        op = request.get("op", "run")
+        if op == "compile":
+            source = request["source"]
+            engine = request.get("engine", "tree")
+            if engine == "tree":
+                self.cache.parse(source)
+            elif engine == "python":
+                self.cache.transpile(source)
+            elif engine == "vm":
+                self.cache.compile(source)
+            else:
+                raise ValueError(f"Unknown engine {engine!r}")
+            return {"handle": self._remember(source)}
+        if op == "run":
+            source = self._resolve(request)
+            engine = request.get("engine", "tree")
+            if engine == "tree":
+                tree = self.cache.parse(source)
+                SemanticAnalyzer().visit(tree)
+                interpreter = Interpreter(None)
+                interpreter.visit(ConstantFolder().fold(tree))
+                return {"scope": interpreter.GLOBAL_SCOPE}
+            if engine == "python":
+                return {"scope": self.cache.transpile(source).run()}
+            if engine == "vm":
+                return {"scope": VM().run(self.cache.compile(source))}
+            raise ValueError(f"Unknown engine {engine!r}")
+        if op == "stats":
+            return {"stats": self.stats()}
+        raise ValueError(f"Unknown op {op!r}")
+
+    def stats(self):
+        ordered = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "latency_ms": {
+                name: None if value is None else value * 1000
+                for name, value in (
+                    ("p50", percentile(ordered, 0.50)),
+                    ("p90", percentile(ordered, 0.90)),
+                    ("p99", percentile(ordered, 0.99)),
+                    ("max", ordered[-1] if ordered else None),
+                )
+            },
+        }
+
+    # Transport
+
+    async def _process(self, line, writer, write_lock):
+        start = time.perf_counter()
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self._executor, self.handle, request)
+        except Exception as e:
+            self.errors += 1
+            response = {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            self._inflight.release()
+        self.requests += 1
+        self.latencies.append(time.perf_counter() - start)
+        response["id"] = request_id
+        async with write_lock:
+            writer.write((json.dumps(response) + "\n").encode())
+            await writer.drain()
+
+    async def serve_connection(self, reader, writer):
+        if self._inflight is None:
+            self._inflight = asyncio.Semaphore(self._max_inflight)
+        write_lock = asyncio.Lock()
+        tasks = set()
+        while True:
+            await self._inflight.acquire()
+            line = await reader.readline()
+            if not line:
+                self._inflight.release()
+                break
+            if not line.strip():
+                self._inflight.release()
+                continue
+            task = asyncio.create_task(self._process(line, writer, write_lock))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def serve_unix(self, path):
+        server = await asyncio.start_unix_server(self._serve_and_close, path=path)
+        async with server:
+            await server.serve_forever()
+
+    async def _serve_and_close(self, reader, writer):
+        try:
+            await self.serve_connection(reader, writer)
+        finally:
+            writer.close()
+
+    async def serve_stdio(self):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        try:
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        except ValueError:
+            # regular files can't be polled, feed the reader from a thread
+            loop.run_in_executor(None, _pump_stdin, loop, reader)
+        try:
+            transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout)
+            writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+        except ValueError:
+            writer = _FileWriter(sys.stdout.buffer)
+        await self.serve_connection(reader, writer)
+
+
+def _pump_stdin(loop, reader):
+    for line in sys.stdin.buffer:
+        loop.call_soon_threadsafe(reader.feed_data, line)
+    loop.call_soon_threadsafe(reader.feed_eof)
+
+
+class _FileWriter:
+    """Minimal StreamWriter stand-in for stdout redirected to a file"""
+
+    def __init__(self, stream) -> None:
+        self.stream = stream
+
+    def write(self, data):
+        self.stream.write(data)
+
+    async def drain(self):
+        self.stream.flush()
+
+
+def main(argv):
+    """python server.py (--stdio | --socket PATH) [--max-inflight N]"""
+    args = [arg for arg in argv if arg != "--stdio"]
+    options = dict(zip(args[::2], args[1::2]))
+    server = InterpreterServer(max_inflight=int(options.get("--max-inflight", 64)))
+    if "--stdio" in argv:
+        asyncio.run(server.serve_stdio())
+    elif "--socket" in options:
+        asyncio.run(server.serve_unix(options["--socket"]))
+    else:
+        print(main.__doc__)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
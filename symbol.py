@@ -1,10 +1,19 @@
+from itertools import islice
+
+from tracing import TRACE, SEMANTIC
+
+
 class Symbol:
+    __slots__ = ("name", "type")
+
     def __init__(self, name, type=None) -> None:
         self.name = name
         self.type = type
 
 
 class BuiltinTypeSymbol(Symbol):
+    __slots__ = ()
+
     def __init__(self, name) -> None:
         super().__init__(name)
 
@@ -16,8 +25,14 @@ class BuiltinTypeSymbol(Symbol):
 
 
 class VarSymbol(Symbol):
+    __slots__ = ("scope_level", "slot")
+
     def __init__(self, name, type) -> None:
         super().__init__(name, type)
+        # Fixed storage location, assigned when the symbol is inserted
+        # into a ScopedSymbolTable: frame of scope_level, index slot
+        self.scope_level = None
+        self.slot = None
 
     def __str__(self) -> str:
         return f"<{self.__class__.__name__}(name={self.name}:type={self.type})>"
@@ -25,42 +40,161 @@ class VarSymbol(Symbol):
     __repr__ = __str__
 
 
+# Builtin type symbols, shared by every symbol table
+BUILTIN_TYPES = {
+    "INTEGER": BuiltinTypeSymbol("INTEGER"),
+    "REAL": BuiltinTypeSymbol("REAL"),
+}
+
+
 class ScopedSymbolTable:
     def __init__(self, scope_name, scope_level, enclosing_scpe=None) -> None:
         self._symbols = {}
         self.scope_name = scope_name
         self.scope_level = scope_level
         self.enclosing_scope = enclosing_scpe
-        self._init_builtins()
+        # VarSymbols of this scope indexed by their slot
+        self.slots = []
+        # Only the outermost scope holds the builtins, inner scopes
+        # reach them through enclosing_scope
+        if enclosing_scpe is None:
+            self._init_builtins()
+
+    def _init_builtins(self):
+        for symbol in BUILTIN_TYPES.values():
+            self.insert(symbol)
 
-        def _init_builtins(self):
-            self.define(BuiltinTypeSymbol("INTEGER"))
-            self.define(BuiltinTypeSymbol("REAL"))
+    def __str__(self):
+        return f"Symbols: {[value for value in self._symbols.values()]}"
+    
+    __repr__ = __str__
 
-        def __str__(self):
-            return f"Symbols: {[value for value in self._symbols.values()]}"
-        
-        __repr__ = __str__
+    @property
+    def frame_size(self):
+        return len(self.slots)
 
-        def insert(self, symbol):
-            print(f"Define: {symbol}" )
-            self._symbols[symbol.name] = symbol
+    def insert(self, symbol):
+        if TRACE.semantic:
+            TRACE.emit(SEMANTIC, "Define: %s", symbol)
+        if isinstance(symbol, VarSymbol):
+            symbol.scope_level = self.scope_level
+            symbol.slot = len(self.slots)
+            self.slots.append(symbol)
+        self._symbols[symbol.name] = symbol
 
-        def lookup(self, name):
-            print(f"Lookup: {name}, (Scope name: {self.scope_name})")
-            symbol = self._symbols.get(name)
-            if symbol is not None:
+    def lookup(self, name, current_scope_only=False):
+        if TRACE.semantic:
+            TRACE.emit(SEMANTIC, "Lookup: %s, (Scope name: %s)", name, self.scope_name)
+        scope = self
+        while scope is not None:
+            symbol = scope._symbols.get(name)
+            if symbol is not None or current_scope_only:
                 return symbol
-            if self.enclosing_scope is not None:
-                return self.enclosing_scope.lookup(name)
-        
+            scope = scope.enclosing_scope
+
+
+class SymbolTable:
+    """Symbol table over all open scopes with O(1) lookup.
+
+    Every name maps to a stack of bindings, innermost last. Each open
+    scope keeps an undo log of the names it bound, and leaving the scope
+    pops exactly those bindings again. The ScopedSymbolTable of each
+    scope is still built (it assigns the slots and is what the AST keeps)
+    but lookups never walk the enclosing_scope chain.
+    """
+
+    def __init__(self) -> None:
+        self.current_scope = None
+        self._bindings = {name: [symbol] for name, symbol in BUILTIN_TYPES.items()}
+        self._undo_logs = []
+        # how many of its symbols each open scope has bound
+        self._visible = []
+
+    def enter_scope(self, scope_name):
+        if self.current_scope is None:
+            scope_level = 1
+        else:
+            scope_level = self.current_scope.scope_level + 1
+        scope = ScopedSymbolTable(scope_name, scope_level, self.current_scope)
+        self.current_scope = scope
+        self._undo_logs.append([])
+        self._visible.append(len(scope._symbols))
+        return scope
+
+    def visible(self):
+        """Number of bound symbols in each open scope, outermost first"""
+        return list(self._visible)
+
+    def reopen_scope(self, scope, visible=None):
+        """Enter an already analysed scope, and the scopes enclosing it,
+        again without creating new symbols, so code inside it can be
+        re-analysed against the existing slots. With the counts of an
+        earlier visible() only the symbols declared by then are bound."""
+        chain = []
+        while scope is not None:
+            chain.append(scope)
+            scope = scope.enclosing_scope
+        chain.reverse()
+        bindings = self._bindings
+        for level, scope in enumerate(chain):
+            self.current_scope = scope
+            undo_log = []
+            symbols = scope._symbols.items()
+            if visible is not None:
+                symbols = islice(symbols, visible[level])
+            for name, symbol in symbols:
+                bindings.setdefault(name, []).append(symbol)
+                undo_log.append(name)
+            self._undo_logs.append(undo_log)
+            self._visible.append(len(undo_log))
+        return self.current_scope
+
+    def leave_scope(self):
+        bindings = self._bindings
+        self._visible.pop()
+        for name in reversed(self._undo_logs.pop()):
+            stack = bindings[name]
+            stack.pop()
+            if not stack:
+                del bindings[name]
+        scope = self.current_scope
+        self.current_scope = scope.enclosing_scope
+        return scope
+
+    def insert(self, symbol):
+        self.current_scope.insert(symbol)
+        stack = self._bindings.get(symbol.name)
+        if stack is None:
+            self._bindings[symbol.name] = [symbol]
+        else:
+            stack.append(symbol)
+        self._undo_logs[-1].append(symbol.name)
+        self._visible[-1] += 1
+
+    def lookup(self, name, current_scope_only=False):
+        if TRACE.semantic:
+            TRACE.emit(SEMANTIC, "Lookup: %s, (Scope name: %s)", name, self.current_scope.scope_name)
+        if current_scope_only:
+            return self.current_scope._symbols.get(name)
+        stack = self._bindings.get(name)
+        if stack:
+            return stack[-1]
+        return None
+
 
 class ProcedureSymbol(Symbol):
+    __slots__ = ("params", "scope", "block_ast")
+
     def __init__(self, name, params=None) -> None:
         super(ProcedureSymbol, self).__init__(name)
         self.params = params if params is not None else []
+        # ScopedSymbolTable of the procedure and its Block (a LazyBlock
+        # until the first call loads it), what a call needs to run it;
+        # set by the SemanticAnalyzer
+        self.scope = None
+        self.block_ast = None
 
-        def __str__(self):
-            return f"<{self.__class__.__name__}(name={self.name}, parameters={self.params})>"
-        
-        __repr__ = __str__
\ No newline at end of file
+    def __str__(self):
+        return f"<{self.__class__.__name__}(name={self.name}, parameters={self.params})>"
+    
+    __repr__ = __str__
@@ -0,0 +1,55 @@
+import pytest
+
+from arena import Arena, ArenaInterpreter, ArenaSemanticAnalyzer
+from lexer import BufferLexer
+from parser import Parser
+
+HEADER = "PROGRAM p; VAR a : INTEGER; r : REAL; PROCEDURE q(x : REAL); BEGIN r := x END;\n"
+
+
+def run(body):
+    arena = Arena()
+    Parser(BufferLexer(HEADER + "BEGIN " + body + " END."), nodes=arena).parse()
+    ArenaSemanticAnalyzer().analyze(arena)
+    interpreter = ArenaInterpreter()
+    interpreter.interpret(arena)
+    return interpreter.GLOBAL_SCOPE
+
+
+def test_integer_stored_into_real_is_converted():
+    result = run("r := 1")
+    assert result == {"r": 1.0} and type(result["r"]) is float
+
+
+@pytest.mark.parametrize("body, message", [
+    ("a := 1.5", "Incompatible types in assignment to a"),
+    ("a := 1 < 2", "Incompatible types in assignment to a"),
+    ("WHILE a DO a := 1", "WHILE condition must be BOOLEAN"),
+    ("q(1 < 2)", "Incompatible types in argument x of q"),
+])
+def test_type_errors_are_rejected(body, message):
+    with pytest.raises(Exception, match=message):
+        run(body)
+
+
+def test_integer_argument_to_real_parameter_is_converted():
+    result = run("q(3)")
+    assert result == {"r": 3.0} and type(result["r"]) is float
+
+
+def test_lazy_parsing_is_rejected():
+    with pytest.raises(Exception, match="not supported by the Arena"):
+        Parser(BufferLexer(HEADER + "BEGIN q(1) END."), nodes=Arena(), lazy=True).parse()
+
+
+@pytest.mark.parametrize("body", ["q := 1", "a := q + 1", "FOR q := 1 TO 2 DO a := 1"])
+def test_non_variables_are_rejected(body):
+    with pytest.raises(Exception, match="q is not a variable"):
+        run(body)
+
+
+def test_duplicate_procedure_identifiers_are_rejected():
+    arena = Arena()
+    Parser(BufferLexer("PROGRAM p; VAR i : INTEGER; PROCEDURE i; BEGIN END; BEGIN END."), nodes=arena).parse()
+    with pytest.raises(Exception, match="Duplicate identifier i"):
+        ArenaSemanticAnalyzer().analyze(arena)
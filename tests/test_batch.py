@@ -0,0 +1,36 @@
+import multiprocessing
+import os
+
+import pytest
+
+import batch
+
+ASSIGN = "PROGRAM p; VAR a : INTEGER; BEGIN a := {} END."
+CRASH = "crash"
+run_program = batch.run_program
+
+
+def crashing_run_program(text):
+    if text == CRASH:
+        os._exit(1)
+    return run_program(text)
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="workers must inherit the patched run_program")
+def test_dead_worker_fails_its_chunk_and_the_batch_goes_on(monkeypatch):
+    monkeypatch.setattr(batch, "run_program", crashing_run_program)
+    sources = [ASSIGN.format(1), CRASH, ASSIGN.format(3), ASSIGN.format(4), ASSIGN.format(5)]
+
+    results = list(batch.run_batch(sources, workers=1, chunk_size=2, max_pending=1))
+
+    assert [result.index for result in results] == [0, 1, 2, 3, 4]
+    assert [result.ok for result in results] == [False, False, True, True, True]
+    assert results[1].error.startswith("BrokenProcessPool")
+    assert [result.scope for result in results[2:]] == [{"a": 3}, {"a": 4}, {"a": 5}]
+
+
+@pytest.mark.parametrize("argv", [["programs", "--jobs", "2"], ["programs", "--timeout"]])
+def test_main_rejects_bad_options(argv):
+    with pytest.raises(SystemExit) as exc_info:
+        batch.main(argv)
+    assert exc_info.value.code == 2
@@ -0,0 +1,20 @@
+from cache import ProgramCache
+from vm import VM
+
+# Deeper than the default recursion limit at every stage of the pipeline
+DEEP = (
+    "PROGRAM deep; VAR a, b, c : INTEGER; BEGIN a := 1; "
+    "b := " + " + ".join(["a"] * 5000) + "; "
+    "c := " + "(" * 3000 + "a" + " + 1)" * 3000 + " END."
+)
+
+
+def test_deep_expressions_compile_and_transpile():
+    expected = {"a": 1, "b": 5000, "c": 3001}
+    cache = ProgramCache()
+    vm = VM()
+    # parses and encodes the Arena
+    vm.run(cache.compile(DEEP))
+    assert vm.GLOBAL_SCOPE == expected
+    # decodes the cached Arena
+    assert cache.transpile(DEEP).run() == expected
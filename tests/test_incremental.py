@@ -0,0 +1,143 @@
+import pytest
+
+from ast_ import AST, Assign, Block, Compound, ProcedureDecl
+from incremental import IncrementalParser
+from lexer import BufferLexer
+from main import Interpreter
+from parser import Parser
+from tokenizer import Token
+
+TEXT = """PROGRAM p;
+VAR a, b : INTEGER;
+PROCEDURE q(n : INTEGER);
+  VAR c : INTEGER;
+  PROCEDURE r;
+  BEGIN
+    c := c * 2;
+    a := a + c
+  END;
+BEGIN
+  c := n;
+  r;
+  b := c
+END;
+PROCEDURE s;
+BEGIN
+  b := b + 1
+END;
+BEGIN
+  a := 1;
+  q(3);
+  s
+END.
+"""
+
+# filled in by the SemanticAnalyzer, not by the parser
+ANALYSED = {"symbol", "proc_symbol", "scope", "type", "hoisted"}
+
+
+def dump(node):
+    """Everything the parser builds below node, as nested tuples"""
+    if isinstance(node, list):
+        return [dump(item) for item in node]
+    if isinstance(node, Token):
+        return node.type, node.value
+    if isinstance(node, AST):
+        fields = [name for name in type(node).__slots__ if name not in ANALYSED]
+        return type(node).__name__, tuple((name, dump(getattr(node, name))) for name in fields)
+    return node
+
+
+def run(tree):
+    interpreter = Interpreter(None)
+    interpreter.visit(tree)
+    return interpreter.GLOBAL_SCOPE
+
+
+def edit(parser, old, new):
+    """Replace the first old in parser.text by new and check the tree
+    and its run against a full parse of the new text. Returns the node
+    that was re-parsed."""
+    at = parser.text.index(old)
+    node = parser.edit(at, at + len(old), new)
+    full = Parser(BufferLexer(parser.text)).parse()
+    assert dump(parser.tree) == dump(full)
+    expected = Interpreter(Parser(BufferLexer(parser.text)))
+    expected.interpret()
+    assert run(parser.analyze()) == expected.GLOBAL_SCOPE
+    return node
+
+
+def analysed(text=TEXT):
+    parser = IncrementalParser(text)
+    parser.analyze()
+    return parser
+
+
+def procedures(block):
+    return {node.proc_name: node for node in block.declarations if type(node) is ProcedureDecl}
+
+
+def test_edit_inside_a_nested_procedure_reparses_the_statement():
+    parser = IncrementalParser(TEXT)
+    q = procedures(parser.tree.block)["q"]
+    r = procedures(q.block_node)["r"]
+    body = r.block_node.compound_statement
+    second = body.children[1]
+    at = TEXT.index("c * 2")
+    node = parser.edit(at, at + len("c * 2"), "c * 5")
+    assert type(node) is Assign
+    assert body.children == [node, second]
+    # every enclosing container is kept
+    assert procedures(parser.tree.block)["q"] is q
+    assert procedures(q.block_node)["r"] is r
+    assert r.block_node.compound_statement is body
+    assert parser.reparsed == 1
+
+
+@pytest.mark.parametrize("old, new, kind", [
+    ("c * 2", "c * 5", Assign),
+    ("    a := a + c\n", "    a := a + c;\n    b := 7\n", Compound),
+    ("b := b + 1", "b := b + 2; a := 0", Compound),
+    ("VAR c : INTEGER;", "VAR c, d : INTEGER;", Block),
+    ("PROCEDURE r;", "PROCEDURE r; VAR d : INTEGER;", Block),
+])
+def test_edits_inside_procedure_bodies_match_a_full_parse(old, new, kind):
+    assert type(edit(analysed(), old, new)) is kind
+
+
+def test_signature_change_reanalyses_the_callers():
+    text = TEXT.replace("PROCEDURE r;", "PROCEDURE r(m : INTEGER);").replace("  r;\n", "  r(n);\n")
+    parser = analysed(text)
+    assert run(parser.tree) == {"a": 7, "b": 7}
+    at = text.index("PROCEDURE r(m : INTEGER);")
+    node = parser.edit(at, at + len("PROCEDURE r(m : INTEGER);"), "PROCEDURE r;")
+    assert type(node) is ProcedureDecl
+    with pytest.raises(Exception, match="Wrong number of arguments for r"):
+        parser.analyze()
+
+
+def test_edit_across_procedure_bodies_reparses_their_common_block():
+    parser = analysed()
+    old = "b := c\nEND;\nPROCEDURE s;\nBEGIN\n  b := b + 1"
+    node = edit(parser, old, "b := c + 1\nEND;\nPROCEDURE s;\nBEGIN\n  b := 2")
+    # the edit spans the bodies of q and s, both declared in the program
+    assert node is parser.tree.block
+
+
+def test_edit_across_nested_procedure_bodies_keeps_the_outer_ones():
+    parser = analysed()
+    s = procedures(parser.tree.block)["s"]
+    old = "    a := a + c\n  END;\nBEGIN\n  c := n;"
+    node = edit(parser, old, "    a := a - c\n  END;\nBEGIN\n  c := n + 1;")
+    # the edit spans the bodies of r and q, q's Block is the innermost
+    # container of both
+    assert node is procedures(parser.tree.block)["q"].block_node
+    assert procedures(parser.tree.block)["s"] is s
+
+
+def test_reanalysed_procedure_is_not_a_duplicate_of_itself():
+    text = "PROGRAM p; VAR a : INTEGER; PROCEDURE q; PROCEDURE r; BEGIN a := 1 END; BEGIN r END; BEGIN q END."
+    parser = analysed(text)
+    edit(parser, "PROCEDURE r;", "PROCEDURE r; VAR b : INTEGER;")
+    assert run(parser.tree) == {"a": 1}
@@ -0,0 +1,116 @@
+import pytest
+
+from benchmarks.workloads import deep_calls
+from callstack import CallStack
+from lexer import BufferLexer
+from main import Interpreter, SemanticAnalyzer
+from optimizer import ConstantFolder
+from parser import Parser
+
+# r(n) recurses n levels deep, the WHILE runs at most once
+RECURSIVE = """PROGRAM p; VAR s, z : INTEGER;
+PROCEDURE r(n : INTEGER);
+BEGIN
+  s := s + 1;
+  WHILE n > 0 DO BEGIN r(n - 1); n := 0 END;
+  s := s + 10 DIV z
+END;
+BEGIN s := 0; z := %d; r(%d) END."""
+
+
+def interpreter_for(text, call_stack=None):
+    interpreter = Interpreter(Parser(BufferLexer(text)))
+    if call_stack is not None:
+        interpreter.call_stack = call_stack
+    return interpreter
+
+
+def test_recursion_deeper_than_the_python_stack():
+    interpreter = interpreter_for(RECURSIVE % (10, 5000))
+    interpreter.interpret()
+    assert interpreter.GLOBAL_SCOPE == {"s": 5001 * 2, "z": 10}
+    assert len(interpreter.call_stack) == 1
+
+
+def test_deep_call_chains_of_nested_procedures():
+    interpreter = interpreter_for(deep_calls(300))
+    interpreter.interpret()
+    assert interpreter.GLOBAL_SCOPE == {"g": 300 * 300}
+
+
+def test_runaway_recursion_exceeds_the_call_depth():
+    interpreter = interpreter_for("PROGRAM p; PROCEDURE r; BEGIN r END; BEGIN r END.", CallStack(max_depth=1000))
+    with pytest.raises(RecursionError, match="call depth exceeded 1000"):
+        interpreter.interpret()
+    assert len(interpreter.call_stack) == 1
+    assert interpreter._pending == []
+
+
+def test_error_in_a_deep_call_leaves_every_call():
+    interpreter = interpreter_for(RECURSIVE % (0, 500))
+    with pytest.raises(ZeroDivisionError):
+        interpreter.interpret()
+    assert len(interpreter.call_stack) == 1
+    assert interpreter._pending == []
+
+
+def results(text, fold=True):
+    """GLOBAL_SCOPE of text run with or without the ConstantFolder and
+    its loop hoisting"""
+    tree = Parser(BufferLexer(text)).parse()
+    SemanticAnalyzer().visit(tree)
+    folder = ConstantFolder()
+    if fold:
+        tree = folder.fold(tree)
+    interpreter = Interpreter(None)
+    interpreter.visit(tree)
+    return interpreter.GLOBAL_SCOPE, folder.hoisted
+
+
+LOOPS = "PROGRAM p; VAR i, j, n, s : INTEGER; x : REAL;\nBEGIN n := 3; s := 0; x := 0.0; %s END."
+
+
+@pytest.mark.parametrize("body, expected", [
+    ("FOR i := 1 TO n DO s := s + i", {"i": 3, "s": 6}),
+    ("FOR i := n DOWNTO 1 DO s := s * 10 + i", {"i": 1, "s": 321}),
+    # an empty range leaves the variable at its start value
+    ("FOR i := n TO 1 DO s := 1", {"i": 3, "s": 0}),
+    ("FOR i := 1 TO n DO FOR j := i TO n DO s := s + 1", {"i": 3, "j": 3, "s": 6}),
+    ("i := 0; WHILE i < n DO BEGIN i := i + 1; s := s + i END", {"i": 3, "s": 6}),
+    ("i := 5; WHILE i < n DO i := i + 1", {"i": 5}),
+    ("i := 0; WHILE (i < 10) AND (s < 4) DO BEGIN i := i + 1; s := s + 2 END", {"i": 2, "s": 4}),
+    ("FOR i := 1 TO n DO BEGIN j := 0; WHILE j < i DO j := j + 1; s := s + j END", {"i": 3, "j": 3, "s": 6}),
+])
+def test_loops(body, expected):
+    scope, _ = results(LOOPS % body)
+    assert scope == {"n": 3, "s": 0, "x": 0.0, **expected}
+
+
+@pytest.mark.parametrize("body, hoisted", [
+    ("FOR i := 1 TO n DO x := x + n * 2.5", 1),
+    # i changes in the loop, n * i is not invariant
+    ("FOR i := 1 TO n DO s := s + n * i", 0),
+    # invariant in the inner loop only, recomputed for every i
+    ("FOR i := 1 TO n DO FOR j := 1 TO n DO s := s + (i + 1) * n", 1),
+    ("i := 0; WHILE i < n * 2 DO BEGIN i := i + 1; s := s + (n - 1) * 2 END", 2),
+    # a call could assign anything, nothing is hoisted
+    ("FOR i := 1 TO n DO BEGIN q; s := s + n * 2 END", 0),
+])
+def test_hoisted_loops_give_the_unhoisted_results(body, hoisted):
+    text = LOOPS.replace("BEGIN n", "PROCEDURE q; BEGIN n := n END; BEGIN n") % body
+    scope, count = results(text)
+    assert count == hoisted
+    assert scope == results(text, fold=False)[0]
+
+
+def test_hoisted_expressions_run_only_when_reached():
+    # the division by zero is invariant but the loop never runs it
+    text = LOOPS % "j := 0; FOR i := 1 TO n DO WHILE j > 0 DO s := s + n DIV j"
+    assert results(text)[0] == {"i": 3, "j": 0, "n": 3, "s": 0, "x": 0.0}
+    with pytest.raises(ZeroDivisionError):
+        results(LOOPS % "j := 0; FOR i := 1 TO n DO s := s + n DIV j")
+
+
+def test_assigning_the_loop_variable_is_rejected():
+    with pytest.raises(Exception, match="Illegal assignment to FOR loop variable i"):
+        results(LOOPS % "FOR i := 1 TO n DO i := 2")
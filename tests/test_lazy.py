@@ -0,0 +1,64 @@
+import pytest
+
+from ast_ import LazyBlock, ProcedureDecl
+from benchmarks.workloads import WORKLOADS
+from lexer import BufferLexer
+import main
+from main import Interpreter, SemanticAnalyzer
+from parser import Parser
+
+TEXT = """PROGRAM p; VAR a : INTEGER; r : REAL;
+PROCEDURE used(n : INTEGER);
+  VAR local : INTEGER;
+  PROCEDURE inner; BEGIN a := a + local END;
+BEGIN local := n * 2; inner; inner END;
+PROCEDURE unused;
+BEGIN a := undeclared + 1.5 END;
+BEGIN a := 1; used(3); used(4); r := a END.
+"""
+
+
+def run(text, lazy):
+    interpreter = Interpreter(Parser(BufferLexer(text), lazy=lazy))
+    interpreter.interpret()
+    return interpreter
+
+
+def procedures(tree_or_block):
+    return {node.proc_name: node for node in tree_or_block.declarations if type(node) is ProcedureDecl}
+
+
+@pytest.mark.parametrize("name", list(WORKLOADS))
+def test_lazy_runs_match_eager_runs(name):
+    generate, size = WORKLOADS[name]
+    text = generate(max(1, min(size, 30)))
+    assert run(text, lazy=True).GLOBAL_SCOPE == run(text, lazy=False).GLOBAL_SCOPE
+
+
+def test_only_called_bodies_are_loaded(monkeypatch):
+    loaded = []
+    load_block = main.load_block
+    monkeypatch.setattr(main, "load_block", lambda lazy: loaded.append(lazy) or load_block(lazy))
+    tree = Parser(BufferLexer(TEXT), lazy=True).parse()
+    declared = procedures(tree.block)
+    assert all(type(node.block_node) is LazyBlock for node in declared.values())
+    interpreter = Interpreter(None)
+    SemanticAnalyzer().visit(tree)
+    interpreter.visit(tree)
+    # the broken body was never needed
+    assert interpreter.GLOBAL_SCOPE == {"a": 29, "r": 29.0}
+    assert declared["unused"].block_node.block is None
+    # each called body is loaded on its first call and kept
+    used = declared["used"].block_node
+    inner = procedures(used.block)["inner"].block_node
+    assert loaded == [used, inner]
+
+
+def test_errors_in_a_body_surface_on_its_first_call():
+    with pytest.raises(NameError, match="undeclared"):
+        run(TEXT, lazy=False)
+    interpreter = Interpreter(Parser(BufferLexer(TEXT.replace("r := a", "unused")), lazy=True))
+    with pytest.raises(NameError, match="undeclared"):
+        interpreter.interpret()
+    # everything before the call ran
+    assert interpreter.GLOBAL_SCOPE == {"a": 29}
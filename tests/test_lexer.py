@@ -0,0 +1,52 @@
+import io
+
+import pytest
+
+from benchmarks.workloads import WORKLOADS
+from lexer import BufferLexer, Lexer, MappedLexer, scan_spans
+
+TRICKY = """PROGRAM Test1; { a comment
+spanning lines }
+var x1, Y : integer; z : Real;{}
+begin x1:=3;z := 3.; z := 10.25/2; Y := x1 DIV 2;
+  WHILE (x1<>0)AND NOT(x1<=-1) DO x1 := x1 - 1 END.
+"""
+
+LEXERS = {
+    "BufferLexer": BufferLexer,
+    "chunked": lambda text: BufferLexer(io.StringIO(text), chunk_size=3),
+    "MappedLexer": lambda text: MappedLexer(text.encode()),
+}
+
+
+def stream(lexer):
+    """type, value, value type and offset of every token up to EOF"""
+    return [
+        (token.type, token.value, type(token.value), lexer.offset_of(lexer.mark))
+        for token in lexer
+    ]
+
+
+def sources():
+    for name, (generate, size) in WORKLOADS.items():
+        yield name, generate(max(1, min(size, 30)))
+    yield "tricky", TRICKY
+
+
+@pytest.mark.parametrize("lexer", list(LEXERS))
+@pytest.mark.parametrize("name, text", list(sources()))
+def test_same_tokens_and_offsets_as_lexer(lexer, name, text):
+    assert stream(LEXERS[lexer](text)) == stream(Lexer(text))
+
+
+def test_scan_spans_gives_the_token_offsets():
+    expected = stream(Lexer(TRICKY))
+    spans = list(scan_spans(TRICKY))
+    assert [(token.type, token.value) for token, _, _ in spans] == [item[:2] for item in expected]
+    assert [start for _, start, _ in spans] == [item[3] for item in expected]
+
+
+@pytest.mark.parametrize("lexer", [Lexer, *LEXERS.values()])
+def test_invalid_characters_are_reported_with_their_position(lexer):
+    with pytest.raises(Exception, match="Invalid character at line 2, column 8"):
+        list(lexer("BEGIN\n  a := ?\nEND."))
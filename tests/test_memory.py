@@ -0,0 +1,7 @@
+from benchmarks.memory import MAX_BYTES_PER_NODE, bytes_per_node, reference_program
+
+
+def test_bytes_per_node_within_limit():
+    per_node, nodes = bytes_per_node(reference_program(500))
+    assert nodes > 9000
+    assert per_node <= MAX_BYTES_PER_NODE, f"{per_node:.1f} bytes per AST node, limit {MAX_BYTES_PER_NODE}"
@@ -0,0 +1,87 @@
+import pytest
+
+from ast_ import BinOp, Num, UnaryOp, Var, While
+from benchmarks.workloads import WORKLOADS
+from lexer import BufferLexer
+from main import Interpreter, SemanticAnalyzer
+from optimizer import ConstantFolder
+from parser import Parser
+
+PROGRAM = "PROGRAM p; VAR x, a : INTEGER; r : REAL;\nBEGIN x := 5; r := 2.5; %s END."
+
+
+def folded(statement):
+    """The right hand side or the condition of statement after folding,
+    and the folder"""
+    tree = Parser(BufferLexer(PROGRAM % statement)).parse()
+    SemanticAnalyzer().visit(tree)
+    folder = ConstantFolder()
+    tree = folder.fold(tree)
+    node = tree.block.compound_statement.children[2]
+    return node.condition if type(node) is While else node.right, folder
+
+
+def run(text, fold):
+    tree = Parser(BufferLexer(text)).parse()
+    SemanticAnalyzer().visit(tree)
+    if fold:
+        tree = ConstantFolder().fold(tree)
+    interpreter = Interpreter(None)
+    interpreter.visit(tree)
+    return interpreter.GLOBAL_SCOPE
+
+
+@pytest.mark.parametrize("statement, value", [
+    ("a := 2 * 3 + 4", 10),
+    ("a := 7 DIV 2", 3),
+    ("a := -(2 - 5)", 3),
+    ("r := 7 / 2", 3.5),
+    ("r := 1 + 0.5", 1.5),
+    ("r := 4 / 2", 2.0),
+])
+def test_constant_expressions_become_numbers(statement, value):
+    node, folder = folded(statement)
+    assert type(node) is Num
+    assert node.value == value and type(node.value) is type(value)
+    assert folder.removed > 0
+
+
+@pytest.mark.parametrize("statement", [
+    "a := x * 1", "a := 1 * x", "a := x + 0", "a := 0 + x", "a := x - 0",
+    "a := +x", "a := - -x", "a := (x + 0) * 1",
+])
+def test_neutral_operations_are_removed(statement):
+    node, _ = folded(statement)
+    assert type(node) is Var and node.value == "x"
+
+
+def test_double_not_is_removed():
+    node, _ = folded("WHILE NOT NOT (x < 3) DO x := x + 1")
+    assert type(node) is BinOp and node.op.value == "<"
+
+
+@pytest.mark.parametrize("statement", [
+    # 1.0 would make the INTEGER x a REAL
+    "r := x * 1.0",
+    "r := x + 0.0",
+    # left to fail at run time
+    "a := x DIV 0",
+    # BOOLEAN expressions have no constant node
+    "WHILE 1 < x DO x := 1",
+])
+def test_expressions_that_are_not_simplified(statement):
+    node, folder = folded(statement)
+    assert type(node) in (BinOp, UnaryOp)
+    assert folder.removed == 0
+
+
+def test_division_by_a_constant_zero_fails_at_run_time():
+    with pytest.raises(ZeroDivisionError):
+        run(PROGRAM % "a := 1 DIV 0", fold=True)
+
+
+@pytest.mark.parametrize("name", list(WORKLOADS))
+def test_folded_programs_give_the_unfolded_results(name):
+    generate, size = WORKLOADS[name]
+    text = generate(max(1, min(size, 30)))
+    assert run(text, fold=True) == run(text, fold=False)
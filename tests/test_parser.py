@@ -0,0 +1,72 @@
+import io
+
+import pytest
+
+from benchmarks.workloads import nested_procedures
+from lexer import BufferLexer, Lexer, MappedLexer
+from main import Interpreter
+from parser import ParseError, Parser
+
+BROKEN = """PROGRAM p;
+VAR a, b : INTEGER;
+BEGIN
+  a := 1 +;
+  b := a 2;
+  BEGIN a := * END
+END.
+"""
+
+ERRORS = [
+    "Error parsing Input at line 4, column 11: unexpected ';', expected ID",
+    "Error parsing Input at line 5, column 10: unexpected 2, expected SEMI",
+    "Error parsing Input at line 6, column 14: unexpected '*', expected ID",
+]
+
+
+@pytest.mark.parametrize("make_lexer", [Lexer, BufferLexer, lambda text: MappedLexer(text.encode())])
+def test_all_errors_reported_with_positions(make_lexer):
+    with pytest.raises(ParseError) as info:
+        Parser(make_lexer(BROKEN)).parse()
+    assert info.value.errors == ERRORS
+
+
+def test_mapped_file_raises_parse_error(tmp_path):
+    path = tmp_path / "broken.pas"
+    path.write_text(BROKEN)
+    with MappedLexer(path) as lexer:
+        with pytest.raises(ParseError) as info:
+            Parser(lexer).parse()
+    assert info.value.errors == ERRORS
+
+
+def test_mapped_memoryview_invalid_character():
+    lexer = MappedLexer(memoryview(b"PROGRAM p;\nBEGIN\n  a := 1 ?\nEND.\n"))
+    with pytest.raises(Exception, match="line 3, column 10"):
+        Parser(lexer).parse()
+
+
+def test_chunked_file_reports_positions_past_the_first_chunk():
+    with pytest.raises(ParseError) as info:
+        Parser(BufferLexer(io.StringIO(BROKEN), chunk_size=8)).parse()
+    assert info.value.errors == ERRORS
+
+
+def test_lazy_body_errors_keep_their_positions():
+    text = "PROGRAM p;\nVAR a : INTEGER;\nPROCEDURE q;\nBEGIN\n  a := 1 +\nEND;\nBEGIN q END.\n"
+    interpreter = Interpreter(Parser(BufferLexer(text), lazy=True))
+    with pytest.raises(ParseError, match="line 6, column 1: unexpected 'END', expected ID"):
+        interpreter.interpret()
+
+
+def test_keyword_and_symbol_tokens_are_shared():
+    tokens = list(BufferLexer("BEGIN a := 1; b := 2 END"))
+    assert tokens[2] is tokens[6]
+    assert tokens[0] is list(BufferLexer("BEGIN END"))[0]
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_deeply_nested_procedures_do_not_recurse(lazy):
+    # far deeper than the Python frames one level used to take allow
+    interpreter = Interpreter(Parser(BufferLexer(nested_procedures(400)), lazy=lazy))
+    interpreter.interpret()
+    assert interpreter.GLOBAL_SCOPE == {"g": 1}
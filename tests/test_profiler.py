@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from profiler import Profiler, main
+
+PROGRAM = """PROGRAM p; VAR a, b, i : INTEGER; PROCEDURE q(n : INTEGER); BEGIN a := n END;
+BEGIN a := 0; b := 5;
+  WHILE a < 3 DO a := a + 1;
+  WHILE (a > 100) AND (b * 2 = 10) DO a := 0;
+  FOR i := 1 TO b + 1 DO b := b;
+  q(b - 1)
+END."""
+
+
+def test_node_visits_count_evaluated_nodes():
+    profiler = Profiler(track_allocations=False)
+    interpreter = profiler.run(PROGRAM)
+    assert interpreter.GLOBAL_SCOPE == {"a": 4, "b": 5, "i": 6}
+    visits = profiler.node_visits
+    # the WHILE test runs 4 times, the AND's right operand never, the
+    # FOR bound and the call argument once each
+    assert visits["BinOp"] == 4 + 3 + 2 + 1 + 1
+    assert visits["Var"] == 4 + 3 + 1 + 1 + 6 + 1 + 1
+    assert visits["Num"] == 2 + 4 + 3 + 1 + 1 + 1 + 1
+    assert visits["Assign"] == 12
+
+
+def test_main_writes_the_requested_files(tmp_path, capsys):
+    program = tmp_path / "p.pas"
+    program.write_text(PROGRAM)
+    out_json, out_folded = tmp_path / "p.json", tmp_path / "p.folded"
+    assert main([str(program), "--json", str(out_json), "--collapsed", str(out_folded)]) == 0
+    assert capsys.readouterr().out == ""
+    assert json.loads(out_json.read_text())["node_visits"]["Assign"] == 12
+    assert out_folded.read_text().startswith("p")
+
+
+def test_main_prints_json_without_outputs(tmp_path, capsys):
+    program = tmp_path / "p.pas"
+    program.write_text(PROGRAM)
+    assert main([str(program)]) == 0
+    assert "node_visits" in json.loads(capsys.readouterr().out)
+
+
+@pytest.mark.parametrize("argv", [[], ["p.pas", "--jsn", "out.json"], ["p.pas", "--json"]])
+def test_main_rejects_bad_arguments(argv, capsys):
+    with pytest.raises(SystemExit) as raised:
+        main(argv)
+    assert raised.value.code == 2
+    assert "usage:" in capsys.readouterr().err
@@ -0,0 +1,28 @@
+import pytest
+
+from lexer import BufferLexer
+from main import SemanticAnalyzer
+from parser import Parser
+
+HEADER = "PROGRAM p; VAR a : INTEGER; PROCEDURE q; BEGIN a := 1 END;\n"
+
+
+def analyze(text):
+    SemanticAnalyzer().visit(Parser(BufferLexer(text)).parse())
+
+
+@pytest.mark.parametrize("body", ["q := 1", "a := q + 1", "FOR q := 1 TO 2 DO a := 1"])
+def test_non_variables_are_rejected(body):
+    with pytest.raises(Exception, match="is not a variable"):
+        analyze(HEADER + "BEGIN " + body + " END.")
+
+
+@pytest.mark.parametrize("declarations", [
+    "VAR i : INTEGER; PROCEDURE i; BEGIN END;",
+    "PROCEDURE i; BEGIN END; VAR i : INTEGER;",
+    "PROCEDURE i; BEGIN END; PROCEDURE i; BEGIN END;",
+    "PROCEDURE q(i : INTEGER); PROCEDURE i; BEGIN END; BEGIN END;",
+])
+def test_duplicate_procedure_identifiers_are_rejected(declarations):
+    with pytest.raises(Exception, match="Duplicate identifier i"):
+        analyze(f"PROGRAM p; {declarations} BEGIN END.")
@@ -0,0 +1,17 @@
+from server import InterpreterServer
+
+CALLS = "PROGRAM p; VAR a : INTEGER; PROCEDURE q(n : INTEGER); BEGIN a := n END; BEGIN q(2) END."
+
+
+def test_default_engine_runs_procedure_calls():
+    server = InterpreterServer()
+    assert server.handle({"op": "run", "source": CALLS}) == {"scope": {"a": 2}}
+    handle = server.handle({"op": "compile", "source": CALLS})["handle"]
+    assert server.handle({"op": "run", "handle": handle}) == {"scope": {"a": 2}}
+
+
+def test_vm_engine_on_request():
+    server = InterpreterServer()
+    source = "PROGRAM p; VAR a : INTEGER; BEGIN a := 1 + 2 END."
+    handle = server.handle({"op": "compile", "source": source, "engine": "vm"})["handle"]
+    assert server.handle({"op": "run", "handle": handle, "engine": "vm"}) == {"scope": {"a": 3}}
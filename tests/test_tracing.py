@@ -0,0 +1,90 @@
+import io
+
+import pytest
+
+from lexer import Lexer
+from main import Interpreter
+from parser import Parser
+from tracing import EXECUTE, LEX, PARSE, SEMANTIC, TRACE, Tracer
+
+PROGRAM = """PROGRAM p; VAR a, z : INTEGER;
+PROCEDURE q(n : INTEGER);
+BEGIN a := n DIV z END;
+BEGIN z := %d; q(3) END."""
+
+
+@pytest.fixture
+def sink():
+    sink = io.StringIO()
+    yield sink
+    TRACE.disable()
+    TRACE.sink = None
+    TRACE.buffer_size = Tracer().buffer_size
+
+
+def run(text):
+    Interpreter(Parser(Lexer(text))).interpret()
+
+
+def traced_lines(sink):
+    TRACE.flush()
+    return sink.getvalue().splitlines()
+
+
+def test_nothing_is_emitted_while_tracing_is_off(sink):
+    TRACE.enable(sink=sink)
+    TRACE.disable()
+    run(PROGRAM % 1)
+    assert traced_lines(sink) == []
+
+
+def test_execute_traces_calls_and_assignments(sink):
+    TRACE.enable(EXECUTE, sink=sink)
+    run(PROGRAM % 1)
+    lines = traced_lines(sink)
+    assert lines == [
+        "[execute] Assign: z := 1",
+        "[execute] ENTER: 2: q {}",
+        "[execute] Assign: a := 3",
+        "[execute] LEAVE: 2: q {'n': 3}",
+    ]
+
+
+def test_an_error_still_traces_the_calls_it_leaves(sink):
+    TRACE.enable(EXECUTE, sink=sink)
+    with pytest.raises(ZeroDivisionError):
+        run(PROGRAM % 0)
+    assert traced_lines(sink)[-2:] == ["[execute] ENTER: 2: q {}", "[execute] LEAVE: 2: q {'n': 3}"]
+
+
+@pytest.mark.parametrize("phase", [LEX, PARSE, SEMANTIC])
+def test_only_enabled_phases_are_traced(sink, phase):
+    TRACE.enable(phase, sink=sink)
+    run(PROGRAM % 1)
+    lines = traced_lines(sink)
+    assert lines
+    assert all(line.startswith(f"[{phase}] ") for line in lines)
+
+
+def test_semantic_traces_scopes(sink):
+    TRACE.enable(SEMANTIC, sink=sink)
+    run(PROGRAM % 1)
+    lines = traced_lines(sink)
+    assert "[semantic] ENTER scope: global" in lines
+    assert lines.index("[semantic] ENTER scope: q") < lines.index("[semantic] LEAVE scope: q")
+
+
+def test_unknown_phase():
+    with pytest.raises(ValueError, match="Unknown trace phase 'typo'"):
+        TRACE.enable("typo")
+
+
+def test_lines_are_written_in_batches(sink):
+    TRACE.enable(EXECUTE, sink=sink, buffer_size=2)
+    TRACE.emit(EXECUTE, "one")
+    assert sink.getvalue() == ""
+    TRACE.emit(EXECUTE, "%s", "two")
+    assert sink.getvalue() == "[execute] one\n[execute] two\n"
+    TRACE.emit(EXECUTE, "three")
+    TRACE.disable()
+    assert sink.getvalue().endswith("[execute] three\n")
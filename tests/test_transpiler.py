@@ -0,0 +1,88 @@
+import pytest
+
+from benchmarks.workloads import WORKLOADS
+from lexer import BufferLexer
+from main import Interpreter, SemanticAnalyzer
+from optimizer import ConstantFolder
+from parser import Parser
+from transpiler import PythonProgram, transpile
+
+PROGRAMS = {
+    "real_conversions": """PROGRAM p; VAR a : INTEGER; r, s : REAL;
+        PROCEDURE q(x : REAL; n : INTEGER); BEGIN s := x / n END;
+        BEGIN a := 7 DIV 2; r := a; q(a, 2); s := s + -r * 1.5 END.""",
+    "short_circuit": """PROGRAM p; VAR a, b, i : INTEGER;
+        BEGIN a := 0; b := 0;
+          WHILE (a < 5) AND ((b = 0) OR (10 DIV b > 1)) DO BEGIN a := a + 1; b := b + 2 END;
+          i := 0
+        END.""",
+    "nested_scopes": """PROGRAM p; VAR g : INTEGER;
+        PROCEDURE outer(n : INTEGER); VAR g : INTEGER;
+          PROCEDURE inner; BEGIN g := g + n END;
+        BEGIN g := 1; inner; inner END;
+        BEGIN g := 5; outer(3) END.""",
+    "hoisted_loops": """PROGRAM p; VAR i, j, n, s : INTEGER;
+        BEGIN n := 4; s := 0;
+          FOR i := n DOWNTO 1 DO FOR j := 1 TO i DO s := s + (n * 2 - 1) * j;
+          WHILE NOT (s < 10) DO s := s DIV 2
+        END.""",
+}
+
+
+def analysed(text):
+    tree = Parser(BufferLexer(text)).parse()
+    SemanticAnalyzer().visit(tree)
+    return ConstantFolder().fold(tree)
+
+
+def reference(text):
+    interpreter = Interpreter(Parser(BufferLexer(text)))
+    interpreter.interpret()
+    return interpreter.GLOBAL_SCOPE
+
+
+def sources():
+    for name, (generate, size) in WORKLOADS.items():
+        yield name, generate(max(1, min(size, 30)))
+    yield from PROGRAMS.items()
+
+
+@pytest.mark.parametrize("name, text", list(sources()))
+def test_transpiled_programs_match_the_interpreter(name, text):
+    result = transpile(analysed(text)).run()
+    expected = reference(text)
+    assert result == expected
+    assert [type(value) for value in result.values()] == [type(value) for value in expected.values()]
+
+
+def test_runs_start_afresh():
+    program = transpile(analysed(PROGRAMS["nested_scopes"]))
+    assert program.run() == program.run() == {"g": 5}
+
+
+def test_round_trip_through_bytes():
+    program = transpile(analysed(PROGRAMS["real_conversions"]))
+    loaded = PythonProgram.from_bytes(program.to_bytes())
+    assert loaded.source == program.source
+    assert loaded.run() == reference(PROGRAMS["real_conversions"])
+
+
+def test_deep_expressions_are_split():
+    # far deeper than CPython's compiler accepts in one expression
+    text = WORKLOADS["deep_expressions"][0](2000)
+    assert transpile(analysed(text)).run() == reference(text)
+
+
+def test_runtime_errors_match_the_interpreter():
+    text = "PROGRAM p; VAR a, b : INTEGER; BEGIN b := 0; a := 1 DIV b END."
+    with pytest.raises(ZeroDivisionError):
+        transpile(analysed(text)).run()
+    with pytest.raises(NameError):
+        transpile(analysed("PROGRAM p; VAR a, b : INTEGER; BEGIN a := b END.")).run()
+
+
+def test_lazily_parsed_procedures_are_loaded():
+    text = PROGRAMS["nested_scopes"]
+    tree = Parser(BufferLexer(text), lazy=True).parse()
+    SemanticAnalyzer().visit(tree)
+    assert transpile(ConstantFolder().fold(tree)).run() == reference(text)
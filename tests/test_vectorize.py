@@ -0,0 +1,74 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from benchmarks.vectorised import SeededInterpreter
+from lexer import BufferLexer
+from main import SemanticAnalyzer
+from optimizer import ConstantFolder
+from parser import Parser
+from vectorize import VectorInterpreter
+
+PROGRAM = """PROGRAM p; VAR a, b, i, s : INTEGER; x : REAL;
+PROCEDURE scale(f : REAL); BEGIN x := x * f END;
+BEGIN
+  s := 0; x := a;
+  FOR i := 1 TO 4 DO s := s + a * i - b DIV 3;
+  scale(b); x := x / 2 + s
+END."""
+
+
+def vector_run(inputs, text=PROGRAM, size=None):
+    return VectorInterpreter(Parser(BufferLexer(text))).interpret(inputs, size)
+
+
+def test_empty_columns_take_the_declared_type():
+    result = vector_run({"a": [], "b": []})
+    assert result["s"].dtype == np.int64 and result["s"].size == 0
+    assert result["x"].dtype == np.float64 and result["x"].size == 0
+
+
+def reference_runs(inputs, text=PROGRAM):
+    """GLOBAL_SCOPE of one Interpreter run per set of inputs"""
+    tree = Parser(BufferLexer(text)).parse()
+    SemanticAnalyzer().visit(tree)
+    tree = ConstantFolder().fold(tree)
+    names = list(inputs)
+    runs = []
+    for values in zip(*inputs.values()):
+        interpreter = SeededInterpreter(dict(zip(names, values)))
+        interpreter.visit(tree)
+        runs.append(interpreter.GLOBAL_SCOPE)
+    return runs
+
+
+def test_columns_match_one_interpreter_run_per_row():
+    inputs = {"a": [-5, -1, 0, 2, 7], "b": [1, 4, 9, -3, 6]}
+    result = vector_run(inputs)
+    expected = reference_runs(inputs)
+    assert result["s"].dtype == np.int64 and result["x"].dtype == np.float64
+    for row, scope in enumerate(expected):
+        assert result["a"][row] == scope["a"] and result["i"][row] == scope["i"]
+        assert result["s"][row] == scope["s"]
+        assert result["x"][row] == pytest.approx(scope["x"])
+
+
+def test_constant_program_needs_a_size():
+    result = vector_run({}, "PROGRAM p; VAR s : INTEGER; r : REAL; BEGIN s := 7 DIV 2; r := s / 2 END.", size=3)
+    assert result["s"].tolist() == [3, 3, 3]
+    assert result["r"].tolist() == [1.5, 1.5, 1.5]
+
+
+@pytest.mark.parametrize("inputs, text, error, message", [
+    ({"a": [1, 2]}, "PROGRAM p; VAR a : INTEGER; BEGIN WHILE a > 0 DO a := a - 1 END.",
+     Exception, "WHILE loops are not supported"),
+    ({"a": [1, 2]}, "PROGRAM p; VAR a, i : INTEGER; BEGIN FOR i := 1 TO a DO a := a END.",
+     Exception, "FOR loop bounds must be the same in every run"),
+    ({"a": [1.5, 2.0]}, PROGRAM, TypeError, "Input column a must be INTEGER"),
+    ({"a": [1, 2], "c": [1, 2]}, PROGRAM, NameError, "undeclared variables: \\['c'\\]"),
+    ({"a": [1, 2], "b": [1]}, PROGRAM, ValueError, "same length"),
+    ({"a": [1, 2], "b": [0, 3]}, PROGRAM.replace("b DIV 3", "3 DIV b"), ZeroDivisionError, "divide by zero"),
+])
+def test_rejected_programs_and_inputs(inputs, text, error, message):
+    with pytest.raises(error, match=message):
+        vector_run(inputs, text)
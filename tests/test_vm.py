@@ -0,0 +1,80 @@
+import pytest
+
+from benchmarks.workloads import WORKLOADS
+from compiler import CodeObject, Compiler, disassemble
+from lexer import BufferLexer
+from main import Interpreter, SemanticAnalyzer
+from optimizer import ConstantFolder
+from parser import Parser
+from vm import VM
+
+PROGRAMS = {
+    "conversions": """PROGRAM p; VAR a, b : INTEGER; r, s : REAL;
+        BEGIN a := 7 DIV 2; b := -a * 3; r := a; s := r / 4 + b - 0.5 END.""",
+    "short_circuit": """PROGRAM p; VAR a, b : INTEGER;
+        BEGIN a := 0; b := 0;
+          WHILE (a < 5) AND ((b = 0) OR (10 DIV b > 1)) DO BEGIN a := a + 1; b := b + 2 END;
+          WHILE NOT (a <= 0) DO a := a - 2
+        END.""",
+    "loops": """PROGRAM p; VAR i, j, n, s : INTEGER; x : REAL;
+        BEGIN n := 4; s := 0; x := 0.0;
+          FOR i := n DOWNTO 1 DO FOR j := 1 TO i DO s := s + (n * 2 - 1) * j;
+          FOR i := 3 TO 1 DO s := 0;
+          FOR i := 1 TO n DO x := x + n / 3
+        END.""",
+}
+
+# the workloads without procedure calls
+CALL_FREE = ["wide_vars", "long_statements", "deep_expressions", "nested_procedures", "real_arithmetic", "loop_kernel"]
+
+
+def analysed(text):
+    tree = Parser(BufferLexer(text)).parse()
+    SemanticAnalyzer().visit(tree)
+    return ConstantFolder().fold(tree)
+
+
+def reference(text):
+    interpreter = Interpreter(Parser(BufferLexer(text)))
+    interpreter.interpret()
+    return interpreter.GLOBAL_SCOPE
+
+
+def sources():
+    for name in CALL_FREE:
+        generate, size = WORKLOADS[name]
+        yield name, generate(max(1, min(size, 30)))
+    yield from PROGRAMS.items()
+
+
+@pytest.mark.parametrize("name, text", list(sources()))
+def test_vm_matches_the_interpreter(name, text):
+    result = VM().run(Compiler().compile(analysed(text)))
+    expected = reference(text)
+    assert result == expected
+    assert [type(value) for value in result.values()] == [type(value) for value in expected.values()]
+
+
+def test_procedure_calls_are_rejected():
+    text = "PROGRAM p; VAR a : INTEGER; PROCEDURE q; BEGIN a := 1 END; BEGIN q END."
+    with pytest.raises(Exception, match="Procedure calls are not supported by the compiler: q"):
+        Compiler().compile(analysed(text))
+
+
+def test_code_objects_round_trip_through_bytes():
+    code_obj = Compiler().compile(analysed(PROGRAMS["loops"]))
+    loaded = CodeObject.from_bytes(code_obj.to_bytes())
+    assert disassemble(loaded) == disassemble(code_obj)
+    assert VM().run(loaded) == reference(PROGRAMS["loops"])
+
+
+@pytest.mark.parametrize("statement, error", [
+    ("a := b", NameError),
+    ("b := 0; a := 1 DIV b", ZeroDivisionError),
+])
+def test_runtime_errors_match_the_interpreter(statement, error):
+    text = f"PROGRAM p; VAR a, b : INTEGER; BEGIN {statement} END."
+    with pytest.raises(error):
+        VM().run(Compiler().compile(analysed(text)))
+    with pytest.raises(error):
+        reference(text)
@@ -1,4 +1,9 @@
+from collections import deque
+
+
 class Token:
+    __slots__ = ("type", "value")
+
     def __init__(self, type, value) -> None:
         self.type = type
         self.value = value
@@ -8,3 +13,85 @@ class Token:
 
     def __repr__(self) -> str:
         return self.__str__()
+
+
+
+class TokenStream:
+    """Iterate a lexer with a bounded lookahead buffer of up to k tokens.
+
+    Tokens are pulled from the lexer only when consumed or peeked at, so
+    memory stays constant however long the input is. Once the lexer is
+    exhausted the last token (EOF) is returned forever.
+
+    Keywords and punctuation are shared Token instances, so positions
+    are not stored in the tokens. A lexer with a `mark` attribute sets it
+    for each token it yields and turns it into a source offset with
+    offset_of(mark) when one is needed; the stream keeps the marks in a
+    lookahead buffer parallel to the tokens.
+    """
+
+    def __init__(self, lexer, k=2) -> None:
+        self._tokens = iter(lexer)
+        self.lexer = lexer if hasattr(lexer, "mark") else None
+        self._buffer = deque(maxlen=k)
+        self._marks = deque(maxlen=k)
+        self.k = k
+        self._last = None
+        self._last_mark = None
+        # mark of the token last returned by next()
+        self.mark = None
+
+    def _pull(self):
+        token = next(self._tokens, None)
+        if token is None:
+            return self._last
+        self._last = token
+        if self.lexer is not None:
+            self._last_mark = self.lexer.mark
+        return token
+
+    def next(self):
+        """Consume and return the next token"""
+        if self._buffer:
+            self.mark = self._marks.popleft()
+            return self._buffer.popleft()
+        token = self._pull()
+        self.mark = self._last_mark
+        return token
+
+    def peek(self, n=0):
+        """Return the n-th upcoming token (0 is the next one) without consuming it"""
+        if n >= self.k:
+            raise Exception(f"Lookahead of {n + 1} tokens exceeds buffer of {self.k}")
+        while len(self._buffer) <= n:
+            self._buffer.append(self._pull())
+            self._marks.append(self._last_mark)
+        return self._buffer[n]
+
+    def offset(self, mark=None):
+        """Source offset of a mark, by default that of the token last
+        returned by next(); None if the lexer tracks none"""
+        if mark is None:
+            mark = self.mark
+        if mark is None:
+            return None
+        return self.lexer.offset_of(mark)
+
+
+class TokenReplay:
+    """Lexer over tokens saved with their source offsets, which serve as
+    their marks, so a later parse of them still reports positions"""
+
+    def __init__(self, tokens, offsets) -> None:
+        self.tokens = tokens
+        self.offsets = offsets
+        self.mark = None
+
+    def offset_of(self, mark):
+        return mark
+
+    def __iter__(self):
+        offsets = self.offsets
+        for index, token in enumerate(self.tokens):
+            self.mark = offsets[index]
+            yield token
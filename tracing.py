@@ -0,0 +1,77 @@
+##############################
+#                            #
+#          TRACING           #
+#                            #
+##############################
+import atexit
+import os
+import sys
+
+LEX = "lex"
+PARSE = "parse"
+SEMANTIC = "semantic"
+EXECUTE = "execute"
+PHASES = (LEX, PARSE, SEMANTIC, EXECUTE)
+
+
+class Tracer:
+    """Per-phase debug tracing.
+
+    Each phase is a plain bool attribute, so call sites guard with
+
+        if TRACE.parse:
+            TRACE.emit(PARSE, "Current token: %s", token)
+
+    and pay a single attribute load when tracing is off; the message is
+    only formatted inside emit. Lines are collected in memory and written
+    to the sink in batches of buffer_size lines (and at exit).
+    """
+
+    __slots__ = PHASES + ("sink", "buffer_size", "_lines")
+
+    def __init__(self) -> None:
+        for phase in PHASES:
+            setattr(self, phase, False)
+        self.sink = None
+        self.buffer_size = 4096
+        self._lines = []
+
+    def enable(self, *phases, sink=None, buffer_size=None):
+        """Switch on the given phases (all of them when none are given)"""
+        for phase in phases or PHASES:
+            if phase not in PHASES:
+                raise ValueError(f"Unknown trace phase {phase!r}")
+            setattr(self, phase, True)
+        if sink is not None:
+            self.flush()
+            self.sink = sink
+        if buffer_size is not None:
+            self.buffer_size = buffer_size
+
+    def disable(self, *phases):
+        for phase in phases or PHASES:
+            setattr(self, phase, False)
+        self.flush()
+
+    def emit(self, phase, message, *args):
+        if args:
+            message = message % args
+        self._lines.append(f"[{phase}] {message}\n")
+        if len(self._lines) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self._lines:
+            return
+        sink = self.sink if self.sink is not None else sys.stderr
+        sink.write("".join(self._lines))
+        self._lines.clear()
+
+
+TRACE = Tracer()
+atexit.register(TRACE.flush)
+
+# e.g. PASCAL_TRACE=parse,semantic  or  PASCAL_TRACE=all
+_env_phases = os.environ.get("PASCAL_TRACE", "")
+if _env_phases:
+    TRACE.enable(*(() if _env_phases == "all" else _env_phases.split(",")))
@@ -0,0 +1,410 @@
+##############################
+#                            #
+#     PYTHON TRANSPILER      #
+#                            #
+##############################
+import marshal
+import math
+import sys
+
+from ast_ import BinOp, Hoisted, LazyBlock, Num, UnaryOp
+from constants import *
+from main import load_block
+from visitor import NodeVisitor
+
+# Python spelling of the Pascal operators. Every operation is wrapped in
+# parentheses, so comparisons never chain the way Python's do.
+BINARY_OPERATORS = {
+    PLUS: "+",
+    MINUS: "-",
+    MULTIPLY: "*",
+    INTEGER_DIV: "//",
+    FLOAT_DIV: "/",
+    EQUAL: "==",
+    NOT_EQUAL: "!=",
+    LESS_THAN: "<",
+    LESS_EQUAL: "<=",
+    GREATER_THAN: ">",
+    GREATER_EQUAL: ">=",
+}
+UNARY_OPERATORS = {PLUS: "+", MINUS: "-", NOT: "not "}
+
+# CPython's parser and compiler recurse once per nesting level, deeper
+# expressions are split into temporaries
+MAX_EXPRESSION_DEPTH = 50
+
+INDENT = "    "
+
+# Work items of Transpiler.expression, queued behind the operands
+BINARY = object()
+UNARY = object()
+# Start and finish an operand that only runs conditionally: the right
+# operand of AND/OR and the expression of a Hoisted node
+CONDITIONAL = object()
+SHORT_CIRCUIT = object()
+HOIST = object()
+
+
+def python_name(prefix, name):
+    """Python identifier for a Pascal name. The prefix keeps names apart
+    from Python keywords, builtins and the transpiler's temporaries."""
+    identifier = prefix + name
+    if identifier.isidentifier():
+        return identifier
+    # letters and digits Python doesn't accept in identifiers
+    return "u" + prefix + name.encode().hex()
+
+
+def variable_name(name):
+    return python_name("v_", name)
+
+
+def procedure_name(name):
+    return python_name("p_", name)
+
+
+def literal(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return f"float({str(value)!r})"
+    return repr(value)
+
+
+class PythonProgram:
+    """A transpiled program: its Python source and the code object
+    compiled from it once.
+
+    The source defines program(), which runs the Pascal program with its
+    variables as Python locals and returns locals(), and VARIABLES, the
+    names of the global Pascal variables. run() calls program() afresh,
+    so no state is kept between runs.
+    """
+
+    __slots__ = ("name", "source", "code", "_program", "_variables")
+
+    def __init__(self, name, source, code=None) -> None:
+        self.name = name
+        self.source = source
+        if code is None:
+            try:
+                code = compile(source, f"<pascal {name}>", "exec")
+            except (SyntaxError, RecursionError, MemoryError) as e:
+                raise Exception(f"Program {name} is too complex for the Python backend: {e}") from None
+        self.code = code
+        self._program = None
+        self._variables = None
+
+    def run(self):
+        """Run the program, return the assigned global variables by name"""
+        if self._program is None:
+            namespace = {}
+            exec(self.code, namespace)
+            self._program = namespace["program"]
+            self._variables = [(name, variable_name(name)) for name in namespace["VARIABLES"]]
+        scope = self._program()
+        return {name: scope[local] for name, local in self._variables if local in scope}
+
+    def to_bytes(self):
+        # code objects only load on the Python version that wrote them,
+        # anywhere else the source is compiled again
+        return marshal.dumps((sys.implementation.cache_tag, self.name, self.source, marshal.dumps(self.code)))
+
+    @classmethod
+    def from_bytes(cls, data):
+        cache_tag, name, source, code = marshal.loads(data)
+        if cache_tag != sys.implementation.cache_tag:
+            return cls(name, source)
+        return cls(name, source, marshal.loads(code))
+
+    def __str__(self) -> str:
+        return f"PythonProgram({self.name}, {self.source.count(chr(10))} lines)"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class Transpiler(NodeVisitor):
+    """Translate a checked Program AST into Python source.
+
+    Every scope becomes a Python function nested like the Pascal scopes,
+    its variables and parameters become locals of that function, and
+    procedures assigning variables of enclosing scopes declare them
+    nonlocal. Reading a variable before it is assigned raises a
+    NameError (UnboundLocalError) as in the Interpreter. DIV is // and
+    '/' is true division, INTEGER values stored into REAL variables or
+    parameters go through float(), and AND/OR short-circuit.
+
+    A loop's Hoisted expressions are cached in locals that are reset
+    whenever the loop is entered, like the Interpreter does. Expressions
+    nested deeper than MAX_EXPRESSION_DEPTH are computed into temporaries
+    first; since expressions have no side effects this only changes
+    which error is raised when more than one operand would fail.
+    Tracing is not supported, and CPython's limit of 100 indentation
+    levels rejects programs nesting scopes and loops about that deep.
+    """
+
+    def __init__(self) -> None:
+        # (indent, text) of the function being written
+        self.lines = []
+        self.indent = 0
+        # lines of the enclosing conditional operands, see expression()
+        self._buffers = []
+        self._temporaries = 0
+        self._hoisted = {}
+        # scope level of the function being written and the names it
+        # assigns in enclosing scopes
+        self._level = 0
+        self._nonlocals = set()
+
+    def transpile(self, tree):
+        source = self.visit(tree)
+        return PythonProgram(tree.name, source)
+
+    def line(self, text):
+        self.lines.append((self.indent, text))
+
+    def temporary(self, prefix="_t"):
+        self._temporaries += 1
+        return f"{prefix}{self._temporaries}"
+
+    def source(self, lines):
+        return "\n".join(INDENT * indent + text for indent, text in lines) + "\n"
+
+    # Scopes
+
+    def visit_Program(self, node):
+        variables = tuple(symbol.name for symbol in node.scope.slots)
+        lines = [(0, f"# PROGRAM {node.name}"), (0, f"VARIABLES = {variables!r}"), (0, "")]
+        lines.extend(self.function("program", (), node.scope, node.block, "locals()"))
+        return self.source(lines)
+
+    def visit_ProcedureDecl(self, node):
+        params = [variable_name(param.var_node.value) for param in node.params]
+        block = node.block_node
+        if type(block) is LazyBlock:
+            # the whole program is translated up front
+            block = load_block(block)
+        self.lines.extend(
+            (self.indent + indent, text)
+            for indent, text in self.function(procedure_name(node.proc_name), params, node.scope, block)
+        )
+
+    def function(self, name, params, scope, block, result=""):
+        """Lines of the Python function for one scope, at indent 0"""
+        outer = (self.lines, self.indent, self._level, self._nonlocals)
+        self.lines, self.indent = [], 1
+        self._level, self._nonlocals = scope.scope_level, set()
+        for declaration in block.declarations:
+            self.visit(declaration)
+        self.visit(block.compound_statement)
+        self.line(f"return {result}".rstrip())
+        # never runs, makes every variable of the scope a local of the
+        # function even if only nested procedures assign it
+        local_names = [variable_name(symbol.name) for symbol in scope.slots]
+        local_names = [local for local in local_names if local not in params]
+        if local_names:
+            self.line(" = ".join(local_names) + " = None")
+        body, nonlocals = self.lines, self._nonlocals
+        self.lines, self.indent, self._level, self._nonlocals = outer
+
+        lines = [(0, f"def {name}({', '.join(params)}):")]
+        if nonlocals:
+            lines.append((1, f"nonlocal {', '.join(sorted(nonlocals))}"))
+        lines.extend(body)
+        return lines
+
+    def visit_VarDecl(self, node):
+        pass
+
+    def store(self, var):
+        """Python name to assign var to, declared nonlocal if needed"""
+        symbol = var.symbol
+        name = variable_name(symbol.name)
+        if symbol.scope_level != self._level:
+            self._nonlocals.add(name)
+        return name
+
+    # Statements
+
+    def visit_Compound(self, node):
+        for child in node.children:
+            self.visit(child)
+
+    def visit_NoOp(self, node):
+        pass
+
+    def converted(self, node, type_name):
+        """Source of an expression stored as type_name, INTEGER values
+        become REAL"""
+        if node.type == type_name:
+            return self.expression(node)
+        if type(node) is Num:
+            return literal(float(node.value))
+        return f"float({self.expression(node)})"
+
+    def visit_Assign(self, node):
+        value = self.converted(node.right, node.left.type)
+        self.line(f"{self.store(node.left)} = {value}")
+
+    def visit_ProcedureCall(self, node):
+        args = [
+            self.converted(arg, param.type.name)
+            for param, arg in zip(node.proc_symbol.params, node.actual_params)
+        ]
+        self.line(f"{procedure_name(node.proc_name)}({', '.join(args)})")
+
+    def block(self, statement):
+        """Indented lines of a loop body"""
+        self.indent += 1
+        start = len(self.lines)
+        self.visit(statement)
+        if len(self.lines) == start:
+            self.line("pass")
+        self.indent -= 1
+
+    def reset_hoisted(self, loop):
+        if loop.hoisted:
+            names = [self.hoisted_name(hoisted) for hoisted in loop.hoisted]
+            self.line(" = ".join(names) + " = None")
+
+    def hoisted_name(self, node):
+        name = self._hoisted.get(node)
+        if name is None:
+            name = self._hoisted[node] = self.temporary("_h")
+        return name
+
+    def visit_While(self, node):
+        self.reset_hoisted(node)
+        start = len(self.lines)
+        self.indent += 1
+        condition = self.expression(node.condition)
+        self.indent -= 1
+        if len(self.lines) == start:
+            self.line(f"while {condition}:")
+        else:
+            # the condition needs statements, run them on every iteration
+            prelude = self.lines[start:]
+            del self.lines[start:]
+            self.line("while True:")
+            self.lines.extend(prelude)
+            self.indent += 1
+            self.line(f"if not {condition}:")
+            self.line(INDENT + "break")
+            self.indent -= 1
+        self.block(node.body)
+
+    def visit_For(self, node):
+        self.reset_hoisted(node)
+        var = self.store(node.var)
+        start = self.expression(node.start)
+        stop = self.expression(node.stop)
+        # both bounds are evaluated before the variable is set
+        limit = self.temporary()
+        self.line(f"{var}, {limit} = {start}, {stop}")
+        if node.down:
+            self.line(f"for {var} in range({var}, {limit} - 1, -1):")
+        else:
+            self.line(f"for {var} in range({var}, {limit} + 1):")
+        self.block(node.body)
+
+    # Expressions
+
+    def visit_Var(self, node):
+        return variable_name(node.symbol.name)
+
+    def visit_Num(self, node):
+        return literal(node.value)
+
+    def expression(self, node):
+        """Python source of an expression, built with an explicit stack.
+        Temporaries it needs are assigned by lines added before it.
+
+        The lines of a conditional operand are collected separately;
+        when there are none the operand stays inline, otherwise it is
+        turned into an if statement that only runs them when needed."""
+        operands = []
+        todo = [node]
+        while todo:
+            item = todo.pop()
+            kind = type(item)
+            if kind is BinOp:
+                op = item.op.type
+                if op == AND or op == OR:
+                    todo.append((SHORT_CIRCUIT, op))
+                    todo.append(item.right)
+                    todo.append((CONDITIONAL, None))
+                else:
+                    todo.append((BINARY, BINARY_OPERATORS[op]))
+                    todo.append(item.right)
+                todo.append(item.left)
+            elif kind is UnaryOp:
+                todo.append((UNARY, UNARY_OPERATORS[item.op.type]))
+                todo.append(item.expr)
+            elif kind is Hoisted:
+                todo.append((HOIST, item))
+                todo.append(item.expr)
+                todo.append((CONDITIONAL, None))
+            elif kind is tuple:
+                work, arg = item
+                if work is BINARY:
+                    right, right_depth = operands.pop()
+                    left, left_depth = operands.pop()
+                    self.operand(operands, f"({left} {arg} {right})", max(left_depth, right_depth) + 1)
+                elif work is UNARY:
+                    value, depth = operands.pop()
+                    self.operand(operands, f"({arg}{value})", depth + 1)
+                elif work is CONDITIONAL:
+                    self._buffers.append(self.lines)
+                    self.lines = []
+                elif work is SHORT_CIRCUIT:
+                    self.short_circuit(operands, arg)
+                else:
+                    self.hoist(operands, arg)
+            else:
+                operands.append((self.visit(item), 0))
+        return operands.pop()[0]
+
+    def operand(self, operands, text, depth):
+        if depth > MAX_EXPRESSION_DEPTH:
+            name = self.temporary()
+            self.line(f"{name} = {text}")
+            text, depth = name, 0
+        operands.append((text, depth))
+
+    def conditional_lines(self):
+        """Lines of the conditional operand just finished, indented one
+        level deeper"""
+        lines = self.lines
+        self.lines = self._buffers.pop()
+        return [(indent + 1, text) for indent, text in lines]
+
+    def short_circuit(self, operands, op):
+        right, right_depth = operands.pop()
+        left, left_depth = operands.pop()
+        lines = self.conditional_lines()
+        if not lines:
+            keyword = "and" if op == AND else "or"
+            self.operand(operands, f"({left} {keyword} {right})", max(left_depth, right_depth) + 1)
+            return
+        name = self.temporary()
+        self.line(f"{name} = {left}")
+        self.line(f"if {'' if op == AND else 'not '}{name}:")
+        self.lines.extend(lines)
+        self.line(f"{INDENT}{name} = {right}")
+        operands.append((name, 0))
+
+    def hoist(self, operands, node):
+        value, depth = operands.pop()
+        name = self.hoisted_name(node)
+        lines = self.conditional_lines()
+        if not lines:
+            self.operand(operands, f"({name} if {name} is not None else ({name} := {value}))", depth + 1)
+            return
+        self.line(f"if {name} is None:")
+        self.lines.extend(lines)
+        self.line(f"{INDENT}{name} = {value}")
+        operands.append((name, 0))
+
+
+def transpile(tree):
+    """Transpile an analysed (and optionally folded) Program AST"""
+    return Transpiler().transpile(tree)
@@ -0,0 +1,130 @@
+##############################
+#                            #
+#   VECTORISED INTERPRETER   #
+#                            #
+##############################
+try:
+    import numpy as np
+except ImportError:  # optional, only VectorInterpreter needs it
+    np = None
+
+from constants import *
+from main import Interpreter, SemanticAnalyzer
+from optimizer import ConstantFolder
+from tracing import TRACE, EXECUTE
+
+# Column dtype of each Pascal type
+DTYPES = {INTEGER: "int64", REAL: "float64"}
+
+
+class VectorInterpreter(Interpreter):
+    """Run one program over many sets of initial values at once.
+
+    Every variable holds a NumPy column with one entry per run, so the
+    straight-line Compound bodies are walked once and each BinOp/UnaryOp
+    becomes a single array operation. evaluate() is the Interpreter's own,
+    the arithmetic operators apply element-wise to the columns: INTEGER
+    columns are int64 and DIV is floor_divide like Python's //, REAL
+    columns are float64. Procedure calls also run once for all runs, with
+    their arguments as columns. Unlike Python ints, int64 columns wrap
+    around on overflow. Division by zero in any run raises ZeroDivisionError.
+    FOR loops run once for all runs and need bounds that are the same in
+    every run; WHILE loops are rejected.
+
+        VectorInterpreter().run(tree, {"a": [1, 2, 3]})
+        -> {"a": array([1, 2, 3]), "b": array([...]), ...}
+    """
+
+    def __init__(self, parser=None) -> None:
+        if np is None:
+            raise ImportError("VectorInterpreter requires numpy")
+        super().__init__(parser)
+        self.size = None
+        self.inputs = {}
+
+    def interpret(self, inputs, size=None):
+        """Parse, analyse and run the parser's program over inputs"""
+        tree = self.parser.parse()
+        SemanticAnalyzer().visit(tree)
+        return self.run(ConstantFolder().fold(tree), inputs, size)
+
+    def run(self, tree, inputs, size=None):
+        """Run an analysed Program. inputs maps global variable names to
+        equally long sequences of initial values; size is the number of
+        runs and only needed when no inputs are given."""
+        columns = {name: np.asarray(values) for name, values in inputs.items()}
+        sizes = {len(column) for column in columns.values()}
+        if size is not None:
+            sizes.add(size)
+        if len(sizes) != 1:
+            raise ValueError(f"Input columns must all have the same length, got {sorted(sizes)}")
+        self.size = sizes.pop()
+        self.inputs = columns
+        with np.errstate(divide="raise", invalid="raise"):
+            try:
+                self.visit(tree)
+            except FloatingPointError as e:
+                raise ZeroDivisionError(str(e)) from None
+        return self.GLOBAL_SCOPE
+
+    def visit_Program(self, node):
+        scope = node.scope
+        self.global_scope = scope
+        self.display = [None] * (scope.scope_level + 1)
+        frame = self.display[scope.scope_level] = [UNDEFINED] * scope.frame_size
+        unknown = set(self.inputs)
+        for symbol in scope.slots:
+            column = self.inputs.get(symbol.name)
+            if column is None:
+                continue
+            unknown.discard(symbol.name)
+            # an empty column is float64 whatever it was meant to hold,
+            # it has no values to check and takes the declared type
+            if symbol.type.name == INTEGER and column.size and column.dtype.kind not in "biu":
+                raise TypeError(f"Input column {symbol.name} must be INTEGER, got {column.dtype}")
+            frame[symbol.slot] = column.astype(DTYPES[symbol.type.name])
+        if unknown:
+            raise NameError(f"Inputs for undeclared variables: {sorted(unknown)}")
+        self.visit(node.block)
+
+    def to_real(self, value):
+        return np.asarray(value, dtype="float64")
+
+    def visit_Assign(self, node):
+        symbol = node.left.symbol
+        value = self.visit(node.right)
+        dtype = DTYPES[symbol.type.name]
+        if np.ndim(value) == 0:
+            # constant right hand side
+            value = np.full(self.size, value, dtype=dtype)
+        else:
+            # INTEGER columns assigned to a REAL variable become float64
+            value = value.astype(dtype, copy=False)
+        self.display[symbol.scope_level][symbol.slot] = value
+        if TRACE.execute:
+            TRACE.emit(EXECUTE, "Assign: %s := %r", symbol.name, value)
+
+    def visit_While(self, node):
+        # the runs may need different numbers of iterations
+        raise Exception("WHILE loops are not supported by the VectorInterpreter")
+
+    def loop_bound(self, value):
+        """A FOR bound as a Python int, it must be the same in every run"""
+        if np.ndim(value) == 0:
+            return int(value)
+        if value.size and (value != value[0]).any():
+            raise Exception("FOR loop bounds must be the same in every run")
+        return int(value[0]) if value.size else 0
+
+    def visit_For(self, node):
+        for hoisted in node.hoisted:
+            hoisted.value = UNDEFINED
+        symbol = node.var.symbol
+        start = self.loop_bound(self.visit(node.start))
+        stop = self.loop_bound(self.visit(node.stop))
+        frame = self.display[symbol.scope_level]
+        frame[symbol.slot] = np.full(self.size, start, dtype=DTYPES[INTEGER])
+        counts = range(start, stop - 1, -1) if node.down else range(start, stop + 1)
+        for count in counts:
+            frame[symbol.slot] = np.full(self.size, count, dtype=DTYPES[INTEGER])
+            self.visit(node.body)
@@ -0,0 +1,53 @@
+##############################
+#                            #
+#         NODE VISITOR       #
+#                            #
+##############################
+
+
+class VisitorMeta(type):
+    """Give every visitor class its own dispatch table keyed by node type.
+
+    The table is filled lazily on the first visit of each node type and is
+    cleared for the class and all of its subclasses whenever a visit_*
+    method is added, replaced or removed after class creation.
+    """
+
+    def __init__(cls, name, bases, namespace) -> None:
+        super().__init__(name, bases, namespace)
+        cls._dispatch = {}
+
+    def __setattr__(cls, name, value):
+        super().__setattr__(name, value)
+        if name.startswith("visit_") or name == "generic_visit":
+            cls._invalidate_dispatch()
+
+    def __delattr__(cls, name):
+        super().__delattr__(name)
+        if name.startswith("visit_") or name == "generic_visit":
+            cls._invalidate_dispatch()
+
+    def _invalidate_dispatch(cls):
+        pending = [cls]
+        while pending:
+            klass = pending.pop()
+            klass._dispatch.clear()
+            pending.extend(klass.__subclasses__())
+
+
+class NodeVisitor(metaclass=VisitorMeta):
+
+    def visit(self, node):
+        method = self._dispatch.get(type(node))
+        if method is None:
+            method = self._resolve_visitor(type(node))
+        return method(self, node)
+
+    @classmethod
+    def _resolve_visitor(cls, node_type):
+        method = getattr(cls, "visit_" + node_type.__name__, cls.generic_visit)
+        cls._dispatch[node_type] = method
+        return method
+
+    def generic_visit(self, node):
+        raise Exception(f"No visit_{type(node).__name__} method")
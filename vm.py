@@ -0,0 +1,108 @@
+##############################
+#                            #
+#       VIRTUAL MACHINE      #
+#                            #
+##############################
+from compiler import (
+    LOAD_CONST, LOAD_VAR, STORE_VAR, ADD, SUB, MUL, INT_DIV, FLOAT_DIV, NEG, TO_REAL,
+    EQ, NE, LT, LE, GT, GE, NOT, DUP_TOP, POP_TOP,
+    JUMP, POP_JUMP_IF_FALSE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP,
+)
+from constants import UNDEFINED
+
+
+class VM:
+    """Stack machine executing a CodeObject produced by the Compiler"""
+
+    def __init__(self) -> None:
+        self.GLOBAL_SCOPE = {}
+
+    def run(self, code_obj):
+        code = code_obj.code
+        consts = code_obj.consts
+        varnames = code_obj.varnames
+        frame = [UNDEFINED] * len(varnames)
+        stack = []
+        push = stack.append
+        pop = stack.pop
+
+        pc = 0
+        end = len(code)
+        while pc < end:
+            op = code[pc]
+            arg = code[pc + 1]
+            pc += 2
+            if op == LOAD_VAR:
+                value = frame[arg]
+                if value is UNDEFINED:
+                    raise NameError(repr(varnames[arg]))
+                push(value)
+            elif op == LOAD_CONST:
+                push(consts[arg])
+            elif op == STORE_VAR:
+                frame[arg] = pop()
+            elif op == ADD:
+                right = pop()
+                stack[-1] = stack[-1] + right
+            elif op == SUB:
+                right = pop()
+                stack[-1] = stack[-1] - right
+            elif op == MUL:
+                right = pop()
+                stack[-1] = stack[-1] * right
+            elif op == INT_DIV:
+                right = pop()
+                stack[-1] = stack[-1] // right
+            elif op == FLOAT_DIV:
+                right = pop()
+                stack[-1] = stack[-1] / right
+            elif op == NEG:
+                stack[-1] = -stack[-1]
+            elif op == TO_REAL:
+                stack[-1] = float(stack[-1])
+            elif op == POP_JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op == DUP_TOP:
+                push(stack[-1])
+            elif op == LT:
+                right = pop()
+                stack[-1] = stack[-1] < right
+            elif op == LE:
+                right = pop()
+                stack[-1] = stack[-1] <= right
+            elif op == GT:
+                right = pop()
+                stack[-1] = stack[-1] > right
+            elif op == GE:
+                right = pop()
+                stack[-1] = stack[-1] >= right
+            elif op == EQ:
+                right = pop()
+                stack[-1] = stack[-1] == right
+            elif op == NE:
+                right = pop()
+                stack[-1] = stack[-1] != right
+            elif op == NOT:
+                stack[-1] = not stack[-1]
+            elif op == JUMP_IF_FALSE_OR_POP:
+                if stack[-1]:
+                    pop()
+                else:
+                    pc = arg
+            elif op == JUMP_IF_TRUE_OR_POP:
+                if stack[-1]:
+                    pc = arg
+                else:
+                    pop()
+            elif op == POP_TOP:
+                pop()
+            else:
+                raise Exception(f"Unknown opcode {op}")
+
+        self.GLOBAL_SCOPE = {
+            name: value for name, value in zip(varnames, frame) if value is not UNDEFINED
+        }
+        return self.GLOBAL_SCOPE